@@ -0,0 +1,418 @@
+########################################################################################################################
+# Destroyer - a small boat shooter game.                                                                               #
+# Copyright (C) 2018 by Hendrik Braun                                                                                  #
+#                                                                                                                      #
+# This program is free software: you can redistribute it and/or modify it under the terms of the                       #
+# GNU General Public License as published by the Free Software Foundation, either version 3 of the License, or         #
+# (at your option) any later version.                                                                                  #
+#                                                                                                                      #
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied   #
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more        #
+# details.                                                                                                             #
+#                                                                                                                      #
+# You should have received a copy of the GNU General Public License along with this program.                           #
+# If not, see <http://www.gnu.org/licenses/>.                                                                          #
+########################################################################################################################
+
+import os
+import pygame
+from collections import OrderedDict
+
+
+class Asset_cache(object):
+
+    def __init__(self):
+        """
+        Process wide registry for image assets. Every file is decoded from disk only once and converted to the pixel
+        format of the display, if a display has been set up already. The surfaces handed out are shared between all
+        game objects and have to be treated as read only. Anything that wants to modify an image has to work on a copy
+        or on the result of a pygame.transform call, which always returns a new surface.
+        """
+
+        self.__images = {}
+        self.__rotated = {}
+        self.__animations = {}
+
+    def __key(self, path):
+        return os.path.normpath(path)
+
+    def get_image(self, path):
+
+        """
+        Returns the shared surface for the image at path. The image is loaded on the first request.
+
+        :param path : path to the image file
+        :type path  : string
+
+        :returns: pygame.Surface
+        """
+
+        key = self.__key(path)
+        image = self.__images.get(key)
+        if image is None:
+            image = pygame.image.load(path)
+            if pygame.display.get_surface() is not None:
+                image = image.convert_alpha()
+            self.__images[key] = image
+        return image
+
+    def get_rotated(self, path, angle):
+
+        """
+        Returns the shared surface for the image at path rotated by angle degrees (counter clockwise, as in
+        pygame.transform.rotate). Used for the fixed orientations of the ship and torpedo images.
+
+        :param path     : path to the image file
+        :param angle    : rotation in degrees
+        :type path      : string
+        :type angle     : int
+
+        :returns: pygame.Surface
+        """
+
+        key = self.__key(path), angle
+        image = self.__rotated.get(key)
+        if image is None:
+            image = pygame.transform.rotate(self.get_image(path), angle)
+            self.__rotated[key] = image
+        return image
+
+    def get_animation(self, path_pattern, frame_count):
+
+        """
+        Returns the shared animation for a numbered frame sequence, e.g. "./media/explosion/frame_{}.png" with frames
+        numbered from 1 to frame_count.
+
+        :param path_pattern : path of the frame images with {} as placeholder for the frame number
+        :param frame_count  : number of frames
+        :type path_pattern  : string
+        :type frame_count   : int
+
+        :returns: Animation
+        """
+
+        key = self.__key(path_pattern), frame_count
+        animation = self.__animations.get(key)
+        if animation is None:
+            animation = Animation([self.get_image(path_pattern.format(i)) for i in range(1, frame_count + 1)])
+            self.__animations[key] = animation
+        return animation
+
+    def preload(self, directory):
+
+        """
+        Loads all png files below directory into the cache, so no image has to be decoded while the game is running.
+
+        :param directory    : media directory
+        :type directory     : string
+
+        :returns: number of images in the cache
+        """
+
+        for root, dirs, files in os.walk(directory):
+            for f in sorted(files):
+                if f.lower().endswith(".png"):
+                    self.get_image(os.path.join(root, f))
+        return len(self.__images)
+
+    def clear(self):
+        self.__images = {}
+        self.__rotated = {}
+        self.__animations = {}
+
+
+class Animation(object):
+
+    def __init__(self, frames):
+        """
+        Read only animation resource. The frames are packed side by side into one sprite sheet and handed out as
+        subsurfaces of that sheet, so all users of the animation share the same pixel data. Instances are created and
+        shared through Asset_cache.get_animation.
+
+        :param frames   : frame images in playing order
+        :type frames    : list of pygame.Surface
+        """
+
+        self.__frame_size = (max(f.get_width() for f in frames), max(f.get_height() for f in frames))
+        self.__sheet = pygame.Surface((self.__frame_size[0] * len(frames), self.__frame_size[1]), pygame.SRCALPHA)
+        if pygame.display.get_surface() is not None:
+            self.__sheet = self.__sheet.convert_alpha()
+        self.__sheet.fill((0, 0, 0, 0))
+
+        #BLEND_RGBA_MAX onto the cleared sheet copies the pixels including alpha instead of blending them
+        self.__frames = []
+        for i, f in enumerate(frames):
+            x = i * self.__frame_size[0]
+            self.__sheet.blit(f, (x, 0), special_flags=pygame.BLEND_RGBA_MAX)
+            self.__frames.append(self.__sheet.subsurface((x, 0, f.get_width(), f.get_height())))
+
+    def get_frame(self, index):
+        return self.__frames[index]
+
+    def get_frame_count(self):
+        return len(self.__frames)
+
+    def get_frame_size(self):
+        return self.__frame_size
+
+    def get_sheet(self):
+        return self.__sheet
+
+
+class Lru_cache(object):
+
+    def __init__(self, max_entries=None, max_bytes=None, size_of=None):
+        """
+        Small least recently used cache. Entries are dropped in least recently used order as soon as either the
+        number of entries exceeds max_entries or the summed size of the entries exceeds max_bytes. The size of an entry
+        is determined by the size_of function, which is required when max_bytes is used.
+
+        :param max_entries  : maximum number of entries, None for no limit
+        :param max_bytes    : maximum summed size of all entries, None for no limit
+        :param size_of      : function returning the size of a value in bytes
+        :type max_entries   : int
+        :type max_bytes     : int
+        :type size_of       : function
+        """
+
+        self.__entries = OrderedDict()
+        self.__max_entries = max_entries
+        self.__max_bytes = max_bytes
+        self.__size_of = size_of
+        self.__bytes = 0
+        self.__hits = 0
+        self.__misses = 0
+
+    def get(self, key):
+        value = self.__entries.pop(key, None)
+        if value is None:
+            self.__misses += 1
+            return None
+        self.__entries[key] = value
+        self.__hits += 1
+        return value
+
+    def put(self, key, value):
+        old = self.__entries.pop(key, None)
+        if old is not None and self.__size_of is not None:
+            self.__bytes -= self.__size_of(old)
+        self.__entries[key] = value
+        if self.__size_of is not None:
+            self.__bytes += self.__size_of(value)
+
+        while len(self.__entries) > 1 and \
+                ((self.__max_entries is not None and len(self.__entries) > self.__max_entries) or
+                 (self.__max_bytes is not None and self.__bytes > self.__max_bytes)):
+            dropped = self.__entries.popitem(last=False)[1]
+            if self.__size_of is not None:
+                self.__bytes -= self.__size_of(dropped)
+
+    def clear(self):
+        self.__entries = OrderedDict()
+        self.__bytes = 0
+
+    def get_bytes(self):
+        return self.__bytes
+
+    def get_stats(self):
+        return {"entries": len(self.__entries), "bytes": self.__bytes, "hits": self.__hits, "misses": self.__misses}
+
+    def __len__(self):
+        return len(self.__entries)
+
+
+def surface_bytes(surface):
+    return surface.get_width() * surface.get_height() * surface.get_bytesize()
+
+
+class Rotation_table(object):
+
+    def __init__(self, image, center=(0, 0), resolution=1, max_bytes=None, prebuild=False):
+        """
+        Table of pre rotated versions of an image, e.g. the destroyer tower. Bearings are quantized to the angular
+        resolution, so with a resolution of 1 degree there are at most 360 entries. Each entry holds the rotated
+        surface and its rectangle centered on center. Entries are built on first use or all at once with build(). If
+        max_bytes is set, the least recently used entries are dropped to stay within that memory bound and rebuilt
+        when needed again.
+
+        :param image        : image pointing north (bearing 0)
+        :param center       : center the rectangles are anchored to as x,y
+        :param resolution   : angular resolution in degrees
+        :param max_bytes    : memory bound for the rotated surfaces in bytes, None for no limit
+        :param prebuild     : build all entries right away
+        :type image         : pygame.Surface
+        :type center        : set
+        :type resolution    : float
+        :type max_bytes     : int
+        :type prebuild      : bool
+        """
+
+        self.__image = image
+        self.__center = center
+        self.__resolution = resolution
+        self.__steps = int(round(360.0 / resolution))
+        self.__table = Lru_cache(max_bytes=max_bytes, size_of=lambda entry: surface_bytes(entry[0]))
+        if prebuild:
+            self.build()
+
+    def __step(self, bearing):
+        return int(round(bearing / float(self.__resolution))) % self.__steps
+
+    def get(self, bearing):
+
+        """
+        Returns the rotated image and its center anchored rectangle for a bearing in degrees, 0 being north and
+        turning clockwise. The rectangle is shared and must not be modified.
+
+        :returns: pygame.Surface, pygame.Rect
+        """
+
+        step = self.__step(bearing)
+        entry = self.__table.get(step)
+        if entry is None:
+            image = pygame.transform.rotate(self.__image, -step * self.__resolution)
+            entry = image, image.get_rect(center=self.__center)
+            self.__table.put(step, entry)
+        return entry
+
+    def build(self):
+        for step in range(self.__steps):
+            self.get(step * self.__resolution)
+
+    def get_resolution(self):
+        return self.__resolution
+
+    def get_bytes(self):
+        return self.__table.get_bytes()
+
+    def __len__(self):
+        return len(self.__table)
+
+
+class Digit_strip(object):
+
+    _chars = "+-0123456789"
+
+    def __init__(self, font, color):
+        """
+        Pre rendered glyphs of the characters used in score popups like "+100" or "-10" for one font and color.
+        Strings made of these characters are composed by blitting the glyphs next to each other, which is a lot
+        cheaper than rendering them with the font.
+
+        :param font     : font the glyphs are rendered with
+        :param color    : text color as r,g,b
+        :type font      : pygame.font.Font
+        :type color     : set
+        """
+
+        self.__glyphs = {}
+        self.__height = 0
+        for c in self._chars:
+            glyph = font.render(c, True, color)
+            self.__glyphs[c] = glyph
+            self.__height = max(self.__height, glyph.get_height())
+
+    @classmethod
+    def can_render(cls, text):
+        return len(text) > 0 and all(c in cls._chars for c in text)
+
+    def render(self, text):
+        glyphs = [self.__glyphs[c] for c in text]
+        image = pygame.Surface((sum(g.get_width() for g in glyphs), self.__height), pygame.SRCALPHA)
+        image.fill((0, 0, 0, 0))
+        x = 0
+        for g in glyphs:
+            image.blit(g, (x, 0), special_flags=pygame.BLEND_RGBA_MAX)
+            x += g.get_width()
+        return image
+
+
+class Font_cache(object):
+
+    def __init__(self, max_texts=256):
+        """
+        Registry for fonts and rendered texts. Fonts are created once per name and size, rendered texts are kept in a
+        least recently used cache keyed by text, size, color and font name. Texts only made of digits and signs are
+        composed from a Digit_strip. The surfaces handed out are shared and have to be treated as read only.
+
+        :param max_texts    : maximum number of rendered texts kept in the cache
+        :type max_texts     : int
+        """
+
+        self.__fonts = {}
+        self.__strips = {}
+        self.__texts = Lru_cache(max_entries=max_texts)
+
+    def get_font(self, name, size):
+        key = name, size
+        font = self.__fonts.get(key)
+        if font is None:
+            font = pygame.font.SysFont(name, size)
+            self.__fonts[key] = font
+        return font
+
+    def get_digit_strip(self, name, size, color):
+        key = name, size, color
+        strip = self.__strips.get(key)
+        if strip is None:
+            strip = Digit_strip(self.get_font(name, size), color)
+            self.__strips[key] = strip
+        return strip
+
+    def render(self, text, size, color=(255, 255, 255), name="Arial"):
+
+        """
+        Returns the rendered text, from the cache if it has been rendered before.
+
+        :param text     : text to render
+        :param size     : font size
+        :param color    : text color as r,g,b
+        :param name     : font name
+        :type text      : string
+        :type size      : int
+        :type color     : set
+        :type name      : string
+
+        :returns: pygame.Surface
+        """
+
+        color = tuple(color)
+        key = text, size, color, name
+        image = self.__texts.get(key)
+        if image is None:
+            if Digit_strip.can_render(text):
+                image = self.get_digit_strip(name, size, color).render(text)
+            else:
+                image = self.get_font(name, size).render(text, True, color)
+            self.__texts.put(key, image)
+        return image
+
+    def get_stats(self):
+        return self.__texts.get_stats()
+
+
+assets = Asset_cache()
+fonts = Font_cache()
+
+
+def load_image(path):
+
+    """
+    Shortcut for loading an image through the shared asset cache. Drop in replacement for pygame.image.load for
+    read only images.
+
+    :returns: pygame.Surface
+    """
+
+    return assets.get_image(path)
+
+
+def render_text(text, size, color=(255, 255, 255), name="Arial"):
+
+    """
+    Shortcut for rendering a text through the shared font cache.
+
+    :returns: pygame.Surface
+    """
+
+    return fonts.render(text, size, color, name)
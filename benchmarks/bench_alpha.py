@@ -0,0 +1,87 @@
+########################################################################################################################
+# Destroyer - a small boat shooter game.                                                                               #
+# Copyright (C) 2018 by Hendrik Braun                                                                                  #
+#                                                                                                                      #
+# This program is free software: you can redistribute it and/or modify it under the terms of the                       #
+# GNU General Public License as published by the Free Software Foundation, either version 3 of the License, or         #
+# (at your option) any later version.                                                                                  #
+#                                                                                                                      #
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied   #
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more        #
+# details.                                                                                                             #
+#                                                                                                                      #
+# You should have received a copy of the GNU General Public License along with this program.                           #
+# If not, see <http://www.gnu.org/licenses/>.                                                                          #
+########################################################################################################################
+
+"""
+Microbenchmark for alpha blitting. Compares the old blit_alpha, which allocated and converted a new surface per call,
+with the pooled Alpha_blitter for 10 to 1000 concurrent fades of ship images and score texts.
+
+Run from the repository root: python benchmarks/bench_alpha.py
+"""
+
+import os
+import sys
+import timeit
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.chdir(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import pygame
+from assets import load_image, render_text
+from gfx import Alpha_blitter
+
+
+def legacy_blit_alpha(screen, image, rect, opacity):
+    x = rect[0]
+    y = rect[1]
+    temp = pygame.Surface((image.get_width(), image.get_height())).convert()
+    temp.blit(screen, (-x, -y))
+    temp.blit(image, (0, 0))
+    temp.set_alpha(opacity)
+    screen.blit(temp, rect)
+
+
+def make_fades(count, window_size):
+    images = [load_image("./media/submarine.png"), load_image("./media/torpedoboat.png"),
+              render_text("+100", 16, (0, 0, 0))]
+    fades = []
+    for i in range(count):
+        image = images[i % len(images)]
+        x = (i * 37) % (window_size[0] - image.get_width())
+        y = (i * 53) % (window_size[1] - image.get_height())
+        fades.append((image, pygame.Rect(x, y, image.get_width(), image.get_height()), 255 - i % 255))
+    return fades
+
+
+def main():
+    pygame.init()
+    window_size = (1280, 1024)
+    screen = pygame.display.set_mode(window_size)
+    background = pygame.transform.scale(load_image("./media/background.png"), window_size)
+    blitter = Alpha_blitter()
+
+    print("{:>8} {:>14} {:>14} {:>8}".format("fades", "old ms/frame", "new ms/frame", "speedup"))
+    for count in (10, 100, 1000):
+        fades = make_fades(count, window_size)
+        frames = max(3, 3000 // count)
+
+        def old_frame():
+            screen.blit(background, (0, 0))
+            for image, rect, alpha in fades:
+                legacy_blit_alpha(screen, image, rect, alpha)
+
+        def new_frame():
+            screen.blit(background, (0, 0))
+            for image, rect, alpha in fades:
+                blitter.blit(screen, image, rect, alpha)
+
+        old = min(timeit.repeat(old_frame, number=frames, repeat=3)) / frames * 1000
+        new = min(timeit.repeat(new_frame, number=frames, repeat=3)) / frames * 1000
+        print("{:>8} {:>14.3f} {:>14.3f} {:>7.1f}x".format(count, old, new, old / new))
+
+
+if __name__ == "__main__":
+    main()
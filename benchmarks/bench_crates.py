@@ -0,0 +1,105 @@
+########################################################################################################################
+# Destroyer - a small boat shooter game.                                                                               #
+# Copyright (C) 2018 by Hendrik Braun                                                                                  #
+#                                                                                                                      #
+# This program is free software: you can redistribute it and/or modify it under the terms of the                       #
+# GNU General Public License as published by the Free Software Foundation, either version 3 of the License, or         #
+# (at your option) any later version.                                                                                  #
+#                                                                                                                      #
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied   #
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more        #
+# details.                                                                                                             #
+#                                                                                                                      #
+# You should have received a copy of the GNU General Public License along with this program.                           #
+# If not, see <http://www.gnu.org/licenses/>.                                                                          #
+########################################################################################################################
+
+"""
+Microbenchmark for crate placement. Compares the former rejection sampling, which retries random positions until
+one misses every ship, with picking a free cell from the Occupancy_grid, for increasingly crowded screens. Ships
+drift one pixel per tick and are updated in the grid on every tick, as Enemies.move does, so a placement is only the
+pick. Reports mean and worst case latency per placement, the mean grid update cost per tick and how many placements
+failed; rejection sampling gives up after a fixed number of attempts on a full screen.
+
+Run from the repository root: python benchmarks/bench_crates.py
+"""
+
+import os
+import random
+import sys
+from timeit import default_timer
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.chdir(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import pygame
+from unit_handling import Occupancy_grid
+
+WINDOW_SIZE = (1280, 1024)
+Y_MARGIN = 60
+CRATE_SIZE = (20, 20)
+DESTROYER_RECT = pygame.Rect(590, 460, 100, 100)
+MAX_ATTEMPTS = 100000
+
+
+def rejection_sampling(ships):
+    crate = pygame.Rect(0, 0, CRATE_SIZE[0], CRATE_SIZE[1])
+    for attempt in range(MAX_ATTEMPTS):
+        crate.x = random.randrange(50, WINDOW_SIZE[0] - 50, 1)
+        crate.y = random.randrange(Y_MARGIN, WINDOW_SIZE[1] - 50, 1)
+        if crate.collidelist(ships) == -1 and not DESTROYER_RECT.colliderect(crate):
+            return crate.x, crate.y
+    return None
+
+
+def make_ships(count):
+    return [pygame.Rect(random.randrange(-100, WINDOW_SIZE[0]), random.randrange(Y_MARGIN, WINDOW_SIZE[1] - 50),
+                        random.randrange(60, 200), random.randrange(20, 60)) for i in range(count)]
+
+
+def measure(function, ships, ticks, update=None):
+    times = []
+    update_time = 0
+    failed = 0
+    for i in range(ticks):
+        for ship in ships:
+            ship.x += 1
+        if update is not None:
+            start = default_timer()
+            update()
+            update_time += default_timer() - start
+        start = default_timer()
+        if function() is None:
+            failed += 1
+        times.append((default_timer() - start) * 1000)
+    return sum(times) / len(times), max(times), failed, update_time * 1000 / ticks
+
+
+def main():
+    random.seed(1)
+    ticks = 200
+
+    print("{:>6} {:>10} {:>12} {:>12} {:>12} {:>12} {:>12} {:>12}".format(
+        "ships", "free cells", "reject ms", "reject max", "grid ms", "grid max", "update ms", "failed r/g"))
+    for count in (0, 10, 50, 150, 400, 1000, "full"):
+        if count == "full":
+            ships = [pygame.Rect(-2 * ticks, Y_MARGIN, WINDOW_SIZE[0] + 2 * ticks, WINDOW_SIZE[1] - Y_MARGIN)]
+        else:
+            ships = make_ships(count)
+        grid = Occupancy_grid((50, Y_MARGIN, WINDOW_SIZE[0] - 100, WINDOW_SIZE[1] - 50 - Y_MARGIN))
+        grid.block(DESTROYER_RECT)
+
+        def update_grid():
+            for i, ship in enumerate(ships):
+                grid.set_rect(i, ship)
+
+        reject_mean, reject_max, reject_failed, _ = measure(lambda: rejection_sampling(ships), ships, ticks)
+        grid_mean, grid_max, grid_failed, update_mean = measure(grid.pick, ships, ticks, update_grid)
+        print("{:>6} {:>10} {:>12.4f} {:>12.4f} {:>12.4f} {:>12.4f} {:>12.4f} {:>12}".format(
+            count, grid.get_free_count(), reject_mean, reject_max, grid_mean, grid_max, update_mean,
+            "{}/{}".format(reject_failed, grid_failed)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+########################################################################################################################
+# Destroyer - a small boat shooter game.                                                                               #
+# Copyright (C) 2018 by Hendrik Braun                                                                                  #
+#                                                                                                                      #
+# This program is free software: you can redistribute it and/or modify it under the terms of the                       #
+# GNU General Public License as published by the Free Software Foundation, either version 3 of the License, or         #
+# (at your option) any later version.                                                                                  #
+#                                                                                                                      #
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied   #
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more        #
+# details.                                                                                                             #
+#                                                                                                                      #
+# You should have received a copy of the GNU General Public License along with this program.                           #
+# If not, see <http://www.gnu.org/licenses/>.                                                                          #
+########################################################################################################################
+
+"""
+Microbenchmark for the projection helpers. Compares the scalar project_point and get_bearing, called once per point,
+with the batched project_points (with and without a Trig_table) and get_bearings for 10 to 100000 points.
+
+Run from the repository root: python benchmarks/bench_projection.py
+"""
+
+import os
+import random
+import sys
+import timeit
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.chdir(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import numpy
+from units import project_point, get_bearing, project_points, get_bearings, Trig_table
+
+
+def best_time(function, number):
+    return min(timeit.repeat(function, number=number, repeat=3)) / number * 1000
+
+
+def main():
+    random.seed(1)
+    table = Trig_table()
+
+    print("{:>8} {:>10} {:>14} {:>14} {:>14} {:>10}".format("points", "function", "scalar ms", "batch ms",
+                                                            "table ms", "speedup"))
+    for count in (10, 1000, 100000):
+        x = [random.uniform(0, 1280) for i in range(count)]
+        y = [random.uniform(0, 1024) for i in range(count)]
+        bearings = [random.randrange(0, 360) for i in range(count)]
+        distances = [random.uniform(1, 20) for i in range(count)]
+        points = list(zip(x, y))
+        x_array = numpy.array(x)
+        y_array = numpy.array(y)
+        bearing_array = numpy.array(bearings)
+        distance_array = numpy.array(distances)
+        point_array = numpy.array(points)
+        number = max(1, 100000 // count)
+
+        def scalar_project():
+            for i in range(count):
+                project_point(x[i], y[i], bearings[i], distances[i])
+
+        def scalar_bearing():
+            for p in points:
+                get_bearing(p, (640, 512))
+
+        scalar = best_time(scalar_project, number)
+        batch = best_time(lambda: project_points(x_array, y_array, bearing_array, distance_array), number)
+        lookup = best_time(lambda: project_points(x_array, y_array, bearing_array, distance_array, table), number)
+        print("{:>8} {:>10} {:>14.4f} {:>14.4f} {:>14.4f} {:>9.1f}x".format(count, "project", scalar, batch, lookup,
+                                                                           scalar / min(batch, lookup)))
+
+        scalar = best_time(scalar_bearing, number)
+        batch = best_time(lambda: get_bearings(point_array, (640, 512)), number)
+        print("{:>8} {:>10} {:>14.4f} {:>14.4f} {:>14} {:>9.1f}x".format(count, "bearing", scalar, batch, "-",
+                                                                        scalar / batch))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+########################################################################################################################
+# Destroyer - a small boat shooter game.                                                                               #
+# Copyright (C) 2018 by Hendrik Braun                                                                                  #
+#                                                                                                                      #
+# This program is free software: you can redistribute it and/or modify it under the terms of the                       #
+# GNU General Public License as published by the Free Software Foundation, either version 3 of the License, or         #
+# (at your option) any later version.                                                                                  #
+#                                                                                                                      #
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied   #
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more        #
+# details.                                                                                                             #
+#                                                                                                                      #
+# You should have received a copy of the GNU General Public License along with this program.                           #
+# If not, see <http://www.gnu.org/licenses/>.                                                                          #
+########################################################################################################################
+
+"""
+Benchmark for the unit and effect classes. Measures the memory per instance (with tracemalloc, the shared images are
+loaded before measuring) and the time per call of Enemy.move, Bullet.move, Fade_fx.fade and Text_fx.move.
+
+Run from the repository root with Python 3 (tracemalloc): python benchmarks/bench_units.py
+"""
+
+import os
+import sys
+import timeit
+import tracemalloc
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+os.chdir(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import pygame
+from units import Submarine, Gunboat, Standard_enemy_bullet, Destroyer_bullet_1, Repair_crate
+from gfx import Fade_fx, Text_fx, Explosion
+from assets import load_image
+
+COUNT = 10000
+
+
+class Fixed_timer(object):
+
+    def get_delta(self):
+        return 1 / 60.0
+
+
+def instance_bytes(factory):
+    factory(0)
+    tracemalloc.start()
+    start = tracemalloc.get_traced_memory()[0]
+    instances = [factory(i) for i in range(COUNT)]
+    size = tracemalloc.get_traced_memory()[0] - start
+    tracemalloc.stop()
+    del instances
+    return size / float(COUNT)
+
+
+def main():
+    pygame.init()
+    pygame.display.set_mode((1280, 1024))
+    timer = Fixed_timer()
+    image = load_image("./media/submarine.png")
+
+    factories = [
+        ("Submarine", lambda i: Submarine(50, (-150, 300 + i % 400), 1)),
+        ("Gunboat", lambda i: Gunboat(50, (1280, 300 + i % 400), 3)),
+        ("Standard_enemy_bullet", lambda i: Standard_enemy_bullet(timer, (100, 100), i % 360)),
+        ("Destroyer_bullet_1", lambda i: Destroyer_bullet_1(timer, (640, 512), i % 360)),
+        ("Repair_crate", lambda i: Repair_crate((100 + i % 1000, 200), 100, 100)),
+        ("Fade_fx", lambda i: Fade_fx(image, image.get_rect(), 0.5)),
+        ("Text_fx", lambda i: Text_fx((100, 100), "+100", 1000, 80)),
+        ("Explosion", lambda i: Explosion((100, 100), 20))
+    ]
+    print("{:>24} {:>14}".format("class", "bytes/instance"))
+    for name, factory in factories:
+        print("{:>24} {:>14.0f}".format(name, instance_bytes(factory)))
+
+    ships = [Submarine(50, (-150, 300 + i % 400), 1) for i in range(1000)]
+    bullets = [Destroyer_bullet_1(timer, (640, 512), i % 360) for i in range(1000)]
+    fades = [Fade_fx(image, image.get_rect(), 1000) for i in range(1000)]
+    texts = [Text_fx((100, 100), "+100", 10 ** 9, 80) for i in range(1000)]
+
+    def move_ships():
+        for s in ships:
+            s.move(1 / 60.0, 3)
+
+    def move_bullets():
+        for b in bullets:
+            b.move()
+
+    def fade():
+        for f in fades:
+            f.fade(1 / 60.0)
+
+    def move_texts():
+        for t in texts:
+            t.move(1 / 60.0)
+
+    print("")
+    print("{:>24} {:>14}".format("call", "us/call"))
+    for name, function in (("Enemy.move", move_ships), ("Bullet.move", move_bullets), ("Fade_fx.fade", fade),
+                           ("Text_fx.move", move_texts)):
+        best = min(timeit.repeat(function, number=20, repeat=5)) / 20 / 1000 * 1e6
+        print("{:>24} {:>14.3f}".format(name, best))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+########################################################################################################################
+# Destroyer - a small boat shooter game.                                                                               #
+# Copyright (C) 2018 by Hendrik Braun                                                                                  #
+#                                                                                                                      #
+# This program is free software: you can redistribute it and/or modify it under the terms of the                       #
+# GNU General Public License as published by the Free Software Foundation, either version 3 of the License, or         #
+# (at your option) any later version.                                                                                  #
+#                                                                                                                      #
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied   #
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more        #
+# details.                                                                                                             #
+#                                                                                                                      #
+# You should have received a copy of the GNU General Public License along with this program.                           #
+# If not, see <http://www.gnu.org/licenses/>.                                                                          #
+########################################################################################################################
+
+import json
+from bisect import bisect_right
+from rng import get_random
+
+import units
+
+
+class Unit_catalog(object):
+
+    def __init__(self, path="./media/catalog.json"):
+        """
+        Catalog of the unit types, loaded from a json data file and compiled into dispatch tables once at startup.
+        Ship types are sampled per game level from cumulative weight tables with bisect, torpedo and gun types are
+        mapped to their classes and each crate type to its class, constructor arguments and the name of its effect.
+        Adding a unit type only needs an entry in the data file (and an effect handler for a new crate effect).
+
+        Weights are integers. A type is chosen with a probability of its weight divided by the sum of the weights, a
+        weight of 0 disables a type. Levels without an own table use the table of the highest level defined.
+
+        :param path : path of the catalog data file
+        :type path  : str
+        """
+
+        with open(path) as f:
+            data = json.load(f)
+
+        self.__ship_classes = [self.__get_class(name) for name in data["ships"]["types"]]
+        self.__ship_tables = {}
+        for level, weights in data["ships"]["weights_per_level"].items():
+            self.__ship_tables[int(level)] = self.__compile_weights(weights, len(self.__ship_classes))
+        self.__max_level = max(self.__ship_tables.keys())
+
+        self.__torpedo_classes = {int(k): self.__get_class(v) for k, v in data["torpedos"].items()}
+        self.__gun_classes = {int(k): self.__get_class(v) for k, v in data["guns"].items()}
+
+        crates = data["crates"]["types"]
+        self.__crate_classes = [self.__get_class(c["class"]) for c in crates]
+        self.__crate_args = [(c["return_points"], c["effect_points"]) for c in crates]
+        self.__crate_effects = {cls: c["effect"] for cls, c in zip(self.__crate_classes, crates)}
+        self.__crate_table = self.__compile_weights(data["crates"]["weights"], len(crates))
+
+    @staticmethod
+    def __get_class(name):
+        try:
+            return getattr(units, name)
+        except AttributeError:
+            raise ValueError("Unknown unit class in catalog: {}".format(name))
+
+    @staticmethod
+    def __compile_weights(weights, count):
+        if len(weights) != count:
+            raise ValueError("Expected {} weights, got {}".format(count, len(weights)))
+        cumulative = []
+        total = 0
+        for w in weights:
+            if w < 0:
+                raise ValueError("Negative weight in catalog: {}".format(w))
+            total += w
+            cumulative.append(total)
+        if total == 0:
+            raise ValueError("All weights in catalog are 0")
+        return cumulative, total
+
+    @staticmethod
+    def __sample(table):
+        return bisect_right(table[0], get_random().randrange(table[1]))
+
+    def sample_ship(self, level):
+
+        """
+        Returns a randomized ship class for the game level.
+
+        :returns: class
+        """
+
+        return self.__ship_classes[self.__sample(self.__ship_tables.get(level,
+                                                                        self.__ship_tables[self.__max_level]))]
+
+    def sample_crate(self):
+
+        """
+        Returns a randomized crate class and its constructor arguments return_points, effect_points.
+
+        :returns: set
+        """
+
+        i = self.__sample(self.__crate_table)
+        return self.__crate_classes[i], self.__crate_args[i]
+
+    def get_torpedo_class(self, torpedo_type):
+        return self.__torpedo_classes.get(torpedo_type)
+
+    def get_gun_class(self, gun_type):
+        return self.__gun_classes.get(gun_type)
+
+    def get_crate_effect(self, crate):
+        return self.__crate_effects[type(crate)]
+
+    def get_ship_classes(self):
+        return list(self.__ship_classes)
+
+    def get_crate_effects(self):
+        return set(self.__crate_effects.values())
+
+
+_catalog = None
+
+
+def get_catalog():
+
+    """
+    Returns the shared catalog loaded from the default data file. It is loaded on the first call.
+    """
+
+    global _catalog
+    if _catalog is None:
+        _catalog = Unit_catalog()
+    return _catalog
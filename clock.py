@@ -0,0 +1,114 @@
+########################################################################################################################
+# Destroyer - a small boat shooter game.                                                                               #
+# Copyright (C) 2018 by Hendrik Braun                                                                                  #
+#                                                                                                                      #
+# This program is free software: you can redistribute it and/or modify it under the terms of the                       #
+# GNU General Public License as published by the Free Software Foundation, either version 3 of the License, or         #
+# (at your option) any later version.                                                                                  #
+#                                                                                                                      #
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied   #
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more        #
+# details.                                                                                                             #
+#                                                                                                                      #
+# You should have received a copy of the GNU General Public License along with this program.                           #
+# If not, see <http://www.gnu.org/licenses/>.                                                                          #
+########################################################################################################################
+
+try:
+    from time import perf_counter
+except ImportError:
+    from time import time as perf_counter
+
+
+class Clock(object):
+
+    def __init__(self, source=perf_counter):
+        """
+        Clock service shared by all game objects that need the current time. The time source is read once per frame
+        by calling tick() from the main loop (done by the game Timer). Everything else asks for now(), which returns
+        the time of the current frame without reading the source again, so all subsystems see the same time during a
+        frame. Times are in seconds and only differences between them are meaningful.
+
+        :param source   : function returning a monotonic time in seconds
+        :type source    : function
+        """
+
+        self.__source = source
+        self.__now = source()
+
+    def tick(self):
+
+        """
+        Reads the time source. To be called once per frame.
+
+        :returns: float
+        """
+
+        self.__now = self.__source()
+        return self.__now
+
+    def now(self):
+        return self.__now
+
+
+class Simulated_clock(Clock):
+
+    def __init__(self, step=1/60.0, start=0.0):
+        """
+        Clock that does not follow the real time. Each tick() advances the time by step seconds, so the game can be run
+        faster (or slower) than real time with the same frame deltas as a game running at 1/step frames per second.
+
+        :param step     : time in seconds each tick advances the clock by
+        :param start    : start time in seconds
+        :type step      : float
+        :type start     : float
+        """
+
+        self.__step = step
+        self.__time = start
+        Clock.__init__(self, self.__read)
+
+    def __read(self):
+        return self.__time
+
+    def tick(self):
+        self.__time += self.__step
+        return Clock.tick(self)
+
+    def advance(self, seconds):
+
+        """
+        Moves the clock forward by seconds without changing the step.
+
+        :returns: float
+        """
+
+        self.__time += seconds
+        return Clock.tick(self)
+
+    def get_step(self):
+        return self.__step
+
+    def get_state(self):
+        return {"time": self.__time}
+
+    def set_state(self, state):
+        self.__time = state["time"]
+        Clock.tick(self)
+
+
+_clock = Clock()
+
+
+def get_clock():
+    return _clock
+
+
+def set_clock(clock):
+
+    """
+    Replaces the shared clock service, e.g. by a Simulated_clock. Has to be done before the game objects are created.
+    """
+
+    global _clock
+    _clock = clock
@@ -0,0 +1,137 @@
+########################################################################################################################
+# Destroyer - a small boat shooter game.                                                                               #
+# Copyright (C) 2018 by Hendrik Braun                                                                                  #
+#                                                                                                                      #
+# This program is free software: you can redistribute it and/or modify it under the terms of the                       #
+# GNU General Public License as published by the Free Software Foundation, either version 3 of the License, or         #
+# (at your option) any later version.                                                                                  #
+#                                                                                                                      #
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied   #
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more        #
+# details.                                                                                                             #
+#                                                                                                                      #
+# You should have received a copy of the GNU General Public License along with this program.                           #
+# If not, see <http://www.gnu.org/licenses/>.                                                                          #
+########################################################################################################################
+
+from units import get_bearing
+
+#Input bits of one tick. MACHINE_GUN is the machine gun cheat, MENU marks that the ingame menu was opened before the
+#tick and does not change the simulation.
+TURN_LEFT = 1
+TURN_RIGHT = 2
+FIRE = 4
+MACHINE_GUN = 8
+MENU = 16
+
+
+def encode_input(turn_left, turn_right, fire, machine_gun=False, menu=False):
+
+    """
+    Packs the player input of one tick into an integer of input bits.
+
+    :returns: integer
+    """
+
+    return ((TURN_LEFT if turn_left else 0) | (TURN_RIGHT if turn_right else 0) | (FIRE if fire else 0) |
+            (MACHINE_GUN if machine_gun else 0) | (MENU if menu else 0))
+
+
+def decode_input(bits):
+
+    """
+    Unpacks the turn_left, turn_right and fire input from an integer of input bits.
+
+    :returns: set
+    """
+
+    return bool(bits & TURN_LEFT), bool(bits & TURN_RIGHT), bool(bits & FIRE)
+
+
+class Script_controller(object):
+
+    def __init__(self, inputs, loop=False):
+        """
+        Controller replaying a scripted sequence of inputs, one integer of input bits (see encode_input) per tick,
+        e.g. the inputs of a Replay. After the end of the script there is no input, unless loop is set. Controllers
+        return the input bits for the next tick from get_input.
+
+        :param inputs   : input bits per tick
+        :param loop     : start over at the end of the script
+        :type inputs    : list
+        :type loop      : bool
+        """
+
+        self.__inputs = list(inputs)
+        self.__loop = loop
+        self.__position = 0
+
+    @classmethod
+    def from_file(cls, path, loop=False):
+
+        """
+        Loads a script from a text file holding the input bits per tick as whitespace separated integers.
+
+        :returns: Script_controller
+        """
+
+        with open(path) as f:
+            return cls([int(bits) for bits in f.read().split()], loop)
+
+    def get_input(self, simulation):
+        if self.__position >= len(self.__inputs):
+            if not self.__loop or len(self.__inputs) == 0:
+                return 0
+            self.__position = 0
+        bits = self.__inputs[self.__position]
+        self.__position += 1
+        return bits
+
+    def set_position(self, tick):
+
+        """
+        Continues the script at the given tick, e.g. after seeking in a replay.
+
+        :param tick : index of the input returned next
+        :type tick  : int
+
+        :returns:
+        """
+
+        self.__position = tick
+
+
+class Bot_controller(object):
+
+    def __init__(self, tolerance=3, fire_angle=10):
+        """
+        Simple bot for headless runs. Turns the tower towards the closest torpedo or, if there is none, the closest
+        enemy ship and fires when the target is within fire_angle degrees of the tower direction.
+
+        :param tolerance    : angle in degrees within which the tower is not turned any further
+        :param fire_angle   : angle in degrees within which the bot fires
+        :type tolerance     : int
+        :type fire_angle    : int
+        """
+
+        self.__tolerance = tolerance
+        self.__fire_angle = fire_angle
+
+    def get_input(self, simulation):
+        center = simulation.get_center()
+        target = None
+        for group in (simulation.torpedos.get_torpedos(), simulation.enemies.get_enemies()):
+            for u in group:
+                bearing = get_bearing(center, u.get_center_point())
+                if target is None or bearing[1] < target[1]:
+                    target = bearing
+            if target is not None:
+                break
+        if target is None:
+            return 0
+
+        delta = (target[0] - simulation.destroyer.get_direction()) % 360
+        turn_right = self.__tolerance < delta < 180
+        turn_left = 180 <= delta < 360 - self.__tolerance
+        fire = delta <= self.__fire_angle or delta >= 360 - self.__fire_angle
+        return encode_input(turn_left, turn_right, fire)
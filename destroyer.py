@@ -15,9 +15,79 @@
 ########################################################################################################################
 
 from game import *
+from controllers import Bot_controller, Script_controller
+from replay import Replay
+import argparse
 import sys
 
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Destroyer - a small boat shooter game.")
+    parser.add_argument("--level", type=int, default=0, help="initial game level")
+    parser.add_argument("--tick-rate", type=int, default=60, help="simulation ticks per second")
+    parser.add_argument("--entity-store", action="store_true",
+                        help="keep ships, torpedos and bullets in numpy backed entity stores")
+    parser.add_argument("--dirty-rects", action="store_true", help="only update the changed regions of the window")
+    parser.add_argument("--seed", type=int, default=None, help="seed of the random number generator")
+    parser.add_argument("--record", default=None, help="save a replay of the game to this file")
+    parser.add_argument("--keyframe-every", type=int, default=None,
+                        help="store the game state in the recorded replay every n-th tick, 0 for no keyframes. "
+                             "Defaults to 1800 for headless runs and to 0 for the game")
+    parser.add_argument("--headless", action="store_true",
+                        help="run without a window as fast as possible and print the statistics")
+    parser.add_argument("--ticks", type=int, default=None, help="headless: stop after this many ticks")
+    parser.add_argument("--script", default=None,
+                        help="headless: file with the input bits per tick to play instead of the bot")
+    parser.add_argument("--replay", default=None,
+                        help="headless: play back a replay file and check that it gives the recorded result")
+    parser.add_argument("--seek", type=int, default=None,
+                        help="headless: start the playback of the replay at this tick")
+    parser.add_argument("--render-every", type=int, default=0,
+                        help="headless: draw every n-th tick onto an offscreen surface, 0 for no rendering")
+    return parser.parse_args(argv)
+
+
 if __name__ == "__main__":
-    myGame = Destroyer_game()
-    if myGame.run():
+    args = parse_args()
+    if args.headless:
+        keyframe_every = args.keyframe_every if args.keyframe_every is not None else 1800
+        replay = None
+        if args.replay is not None:
+            replay = Replay.load(args.replay)
+            game = Headless_game.for_replay(replay, render_every=args.render_every, keyframe_every=keyframe_every)
+            ticks = len(replay)
+            if args.seek is not None:
+                start = perf_counter()
+                try:
+                    game.seek(args.seek)
+                except ValueError as e:
+                    print("Cannot seek in the replay: {}".format(e))
+                    sys.exit(1)
+                print("seek_time: {}".format(perf_counter() - start))
+        else:
+            if args.script is not None:
+                controller = Script_controller.from_file(args.script)
+            else:
+                controller = Bot_controller()
+            game = Headless_game(controller, init_game_level=args.level, tick_rate=args.tick_rate,
+                                 entity_store=args.entity_store, render_every=args.render_every, seed=args.seed,
+                                 keyframe_every=keyframe_every)
+            ticks = args.ticks
+        stats = game.run(ticks, resume=args.seek is not None)
+        for key in sorted(stats):
+            print("{}: {}".format(key, stats[key]))
+        if args.record is not None:
+            game.get_replay().save(args.record)
+        if replay is not None and replay.matches(stats) is False:
+            print("Playback differs from the recorded result: {}".format(replay.get_result()))
+            sys.exit(1)
+        sys.exit()
+
+    myGame = Destroyer_game(init_game_level=args.level, dirty_rects=args.dirty_rects, tick_rate=args.tick_rate,
+                            entity_store=args.entity_store, seed=args.seed,
+                            keyframe_every=args.keyframe_every or 0)
+    game_over = myGame.run()
+    if args.record is not None:
+        myGame.get_replay().save(args.record)
+    if game_over:
         sys.exit()
@@ -0,0 +1,213 @@
+########################################################################################################################
+# Destroyer - a small boat shooter game.                                                                               #
+# Copyright (C) 2018 by Hendrik Braun                                                                                  #
+#                                                                                                                      #
+# This program is free software: you can redistribute it and/or modify it under the terms of the                       #
+# GNU General Public License as published by the Free Software Foundation, either version 3 of the License, or         #
+# (at your option) any later version.                                                                                  #
+#                                                                                                                      #
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied   #
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more        #
+# details.                                                                                                             #
+#                                                                                                                      #
+# You should have received a copy of the GNU General Public License along with this program.                           #
+# If not, see <http://www.gnu.org/licenses/>.                                                                          #
+########################################################################################################################
+
+import pygame
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class Entity_store(object):
+
+    def __init__(self, capacity=256):
+        """
+        Array backed storage for moving entities (struct of arrays). Each entity gets a slot in float64 arrays for
+        position, previous position, direction, speed, rectangle offset and size and hp, plus an int32 array with the
+        rectangles. Movement, rectangle updates and off screen culling are done for all entities at once with numpy
+        operations. Units attached to a store (see Enemy.attach and Bullet.attach) become views on their slot.
+
+        The position is the same anchor point the unit classes use and the rectangle is placed at position + offset.
+        Entities can have a speed scale, their speed is increased by speed * speed scale * level in step(), which is
+        used for the game speed multiplier of the ships. The arrays grow by doubling if the capacity is exceeded.
+
+        The positions are computed in the same precision and order of operations as Enemy.move and Bullet.move and
+        the rectangles are truncated towards zero like pygame.Rect does, so a game gives the same result with and
+        without a store.
+
+        :param capacity : initial number of slots
+        :type capacity  : int
+        """
+
+        if numpy is None:
+            raise ImportError("The entity store requires numpy")
+
+        self.__capacity = 0
+        self.__free = []
+        self.__count = 0
+        self.__rect_cache = {}
+        self.__grow(capacity)
+
+    def __grow(self, capacity):
+        old_capacity = self.__capacity
+        arrays = {
+            "position": ((capacity, 2), numpy.float64),
+            "previous": ((capacity, 2), numpy.float64),
+            "direction": ((capacity, 2), numpy.float64),
+            "speed": ((capacity,), numpy.float64),
+            "offset": ((capacity, 2), numpy.float64),
+            "size": ((capacity, 2), numpy.float64),
+            "speed_scale": ((capacity,), numpy.float64),
+            "hp": ((capacity,), numpy.float64),
+            "rect": ((capacity, 4), numpy.int32),
+            "alive": ((capacity,), numpy.bool_)
+        }
+        for name, (shape, dtype) in arrays.items():
+            array = numpy.zeros(shape, dtype)
+            if old_capacity > 0:
+                array[:old_capacity] = getattr(self, "_" + name)
+            setattr(self, "_" + name, array)
+
+        #Handing out low slots first keeps the alive entities together at the start of the arrays
+        self.__free.extend(range(capacity - 1, old_capacity - 1, -1))
+        self.__capacity = capacity
+
+    def add(self, x, y, direction_x, direction_y, speed, width, height, offset_x, offset_y, hp=0, speed_scale=0):
+
+        """
+        Adds an entity and returns its slot. The direction is the unit vector the entity moves along with speed
+        pixels per second.
+
+        :returns: integer
+        """
+
+        if len(self.__free) == 0:
+            free = self.__free
+            self.__free = []
+            self.__grow(self.__capacity * 2)
+            self.__free.extend(free)
+        slot = self.__free.pop()
+        self._position[slot] = x, y
+        self._previous[slot] = x, y
+        self._direction[slot] = direction_x, direction_y
+        self._speed[slot] = speed
+        self._offset[slot] = offset_x, offset_y
+        self._size[slot] = width, height
+        self._hp[slot] = hp
+        self._speed_scale[slot] = speed_scale
+        self._rect[slot] = int(x + offset_x), int(y + offset_y), width, height
+        self._alive[slot] = True
+        self.__rect_cache.pop(slot, None)
+        self.__count += 1
+        return slot
+
+    def remove(self, slot):
+        if self._alive[slot]:
+            self._alive[slot] = False
+            self.__free.append(slot)
+            self.__rect_cache.pop(slot, None)
+            self.__count -= 1
+
+    def step(self, time_delta, level=0):
+
+        """
+        Moves all entities along their direction over time_delta seconds and updates their rectangles.
+        """
+
+        alive = self._alive
+        speed = self._speed[alive]
+        self._previous[alive] = self._position[alive]
+        distance = time_delta * (speed + speed * self._speed_scale[alive] * level)
+        self._position[alive] += self._direction[alive] * distance[:, None]
+        self._rect[:, 0:2] = numpy.trunc(self._position + self._offset)
+        self.__rect_cache = {}
+
+    def outside(self, min_x, min_y, max_x, max_y):
+
+        """
+        Returns the slots of all entities whose position, rounded down to whole pixels like Bullet.get_position, is
+        outside the given bounds.
+
+        :returns: list of int
+        """
+
+        x = numpy.floor(self._position[:, 0])
+        y = numpy.floor(self._position[:, 1])
+        out = self._alive & ((x < min_x) | (x > max_x) | (y < min_y) | (y > max_y))
+        return numpy.flatnonzero(out).tolist()
+
+    def get_rect(self, slot):
+
+        """
+        Returns the rectangle of an entity. The pygame.Rect is created on first access after a step and shared until
+        the next step, so it must not be modified.
+
+        :returns: pygame.Rect
+        """
+
+        rect = self.__rect_cache.get(slot)
+        if rect is None:
+            rect = pygame.Rect(self._rect[slot].tolist())
+            self.__rect_cache[slot] = rect
+        return rect
+
+    def get_previous_rect(self, slot):
+        x, y = numpy.trunc(self._previous[slot] + self._offset[slot]).tolist()
+        return pygame.Rect(x, y, int(self._size[slot][0]), int(self._size[slot][1]))
+
+    def get_position(self, slot):
+        return float(self._position[slot][0]), float(self._position[slot][1])
+
+    def get_entity(self, slot):
+
+        """
+        Returns the moving part of an entity, position, previous position, direction, speed, hp and rectangle, as
+        plain data for saving the game state. The rest is set up again when the unit is attached.
+
+        :returns: dictionary
+        """
+
+        return {
+            "position": self._position[slot].tolist(),
+            "previous": self._previous[slot].tolist(),
+            "direction": self._direction[slot].tolist(),
+            "speed": float(self._speed[slot]),
+            "hp": float(self._hp[slot]),
+            "rect": self._rect[slot].tolist()
+        }
+
+    def set_entity(self, slot, entity):
+
+        """
+        Restores an entity returned by get_entity into a slot.
+
+        :returns:
+        """
+
+        self._position[slot] = entity["position"]
+        self._previous[slot] = entity["previous"]
+        self._direction[slot] = entity["direction"]
+        self._speed[slot] = entity["speed"]
+        self._hp[slot] = entity["hp"]
+        self._rect[slot] = entity["rect"]
+        self.__rect_cache.pop(slot, None)
+
+    def set_direction(self, slot, direction_x, direction_y):
+        self._direction[slot] = direction_x, direction_y
+
+    def get_hp(self, slot):
+        return float(self._hp[slot])
+
+    def reduce_hp(self, slot, hp):
+        self._hp[slot] -= hp
+        return float(self._hp[slot])
+
+    def count(self):
+        return self.__count
+
+    def get_capacity(self):
+        return self.__capacity
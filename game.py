@@ -15,41 +15,156 @@
 ########################################################################################################################
 
 import pygame
+import os
 import sys
 from units import *
 from gfx import *
 from menus import *
 from logic import *
 from unit_handling import *
+from assets import assets
+from clock import get_clock, set_clock, perf_counter, Simulated_clock
+from entity_store import Entity_store
+from catalog import get_catalog
+from scheduler import Scheduler
+from rng import set_random
+from replay import Replay
+from snapshot import dump_state, load_state
+from controllers import Script_controller, encode_input, decode_input, MACHINE_GUN, MENU
+import random
 from time import sleep
-import datetime
+from collections import deque
+import math
 
 class Timer(object):
     """This class is used as a time tracker for the game. Each cykle through the main loop the time difference is
     measure. The object is then passed into different game objects that require time deltas and their calculations are
-    based on the time delta received from the Timer game instance.
+    based on the time delta received from the Timer game instance. The time is taken from the shared clock service,
+    which is read once per cykle by the timer.
     """
-    def __init__(self):
+    def __init__(self, clock=None):
+        self.__clock = clock if clock is not None else get_clock()
         self.__old_time = None
-        self.__new_time = None
         self.__delta = None
+        self.__game_time = 0
 
     def start(self):
-        self.__old_time = datetime.datetime.now()
+        self.__old_time = self.__clock.tick()
         self.__delta = 0
+        self.__game_time = 0
 
     def time(self):
-        new_time = datetime.datetime.now()
-        self.__delta = (new_time-self.__old_time).total_seconds()
+        new_time = self.__clock.tick()
+        self.__delta = new_time-self.__old_time
         self.__old_time = new_time
+        self.__game_time += self.__delta
 
     def get_delta(self):
         return self.__delta
 
+    def get_time(self):
+        """Returns the game time in seconds, i.e. the sum of all deltas since start. Time spent in menus is not
+        included."""
+        return self.__game_time
+
+    def get_clock(self):
+        return self.__clock
+
     def reset(self):
-        self.__old_time = datetime.datetime.now()
+        self.__old_time = self.__clock.tick()
         self.__delta = 0
 
+    def get_state(self):
+        return {"old_time": self.__old_time, "delta": self.__delta, "game_time": self.__game_time}
+
+    def set_state(self, state):
+        self.__old_time = state["old_time"]
+        self.__delta = state["delta"]
+        self.__game_time = state["game_time"]
+
+class Frame_pacer(object):
+
+    VSYNC = "vsync"
+
+    def __init__(self, target_fps=60, spin_time=0.002, stats_frames=120):
+        """
+        Limits the frame rate of the main loop and measures the achieved frame rate. The waiting is done with a hybrid
+        strategy: the pacer sleeps until spin_time before the end of the frame and busy waits for the rest, since
+        sleep can wake up late by a millisecond or more. The statistics are taken over the last stats_frames frames.
+
+        :param target_fps   : frames per second to limit to. None runs uncapped, Frame_pacer.VSYNC leaves the
+                              waiting to the display's vertical sync.
+        :param spin_time    : time in seconds that is busy waited at the end of each frame
+        :param stats_frames : number of frames the statistics are taken over
+        :type target_fps    : int
+        :type spin_time     : float
+        :type stats_frames  : int
+        """
+
+        self.__target_fps = target_fps
+        self.__frame_time = None
+        if target_fps is not None and target_fps != self.VSYNC:
+            self.__frame_time = 1.0 / target_fps
+        self.__spin_time = spin_time
+        self.__frame_times = deque(maxlen=stats_frames)
+        self.__last_frame = None
+        self.__next_frame = None
+
+    def start(self):
+        self.__last_frame = perf_counter()
+        self.__next_frame = self.__last_frame
+        self.__frame_times.clear()
+
+    def wait(self):
+
+        """
+        Waits until the next frame is due and records the frame time. To be called once at the end of every frame.
+
+        :returns: frame time in seconds
+        """
+
+        if self.__frame_time is not None:
+            self.__next_frame += self.__frame_time
+            now = perf_counter()
+            if now > self.__next_frame:
+                #Too late for this frame, don't try to catch up
+                self.__next_frame = now
+            else:
+                if self.__next_frame - now > self.__spin_time:
+                    sleep(self.__next_frame - now - self.__spin_time)
+                while perf_counter() < self.__next_frame:
+                    pass
+
+        now = perf_counter()
+        frame_time = now - self.__last_frame
+        self.__last_frame = now
+        self.__frame_times.append(frame_time)
+        return frame_time
+
+    def get_fps(self):
+        if len(self.__frame_times) == 0:
+            return 0.0
+        total = sum(self.__frame_times)
+        return len(self.__frame_times) / total if total > 0 else 0.0
+
+    def get_jitter(self):
+
+        """
+        Returns the standard deviation of the frame times in ms.
+
+        :returns: float
+        """
+
+        if len(self.__frame_times) < 2:
+            return 0.0
+        mean = sum(self.__frame_times) / len(self.__frame_times)
+        variance = sum((t - mean) ** 2 for t in self.__frame_times) / (len(self.__frame_times) - 1)
+        return math.sqrt(variance) * 1000
+
+    def get_target_fps(self):
+        return self.__target_fps
+
+
 class Game_level(object):
     def __init__(self, init_level=0):
         self.__game_level = init_level
@@ -60,9 +175,19 @@ class Game_level(object):
     def get_level(self):
         return self.__game_level
 
+    def get_state(self):
+        return {"level": self.__game_level}
 
-class Destroyer_game(object):
+    def set_state(self, state):
+        self.__game_level = state["level"]
+
+
+class Destroyer_simulation(object):
     """
+    Fixed timestep simulation of the game. Holds all game objects and advances them by one tick of 1/tick_rate seconds
+    per call of step(). The shared clock service is replaced by a Simulated_clock that advances by exactly one tick per
+    step, so all movement, timers and collision checks always see the same time delta, independent of the frame rate.
+
     The following dictionaries give the game level dependend variable values for game level brakes, maximum enemies
     and enemy wait ranges. Game level breaks define how many enemies the player has to sink before going to the next
     level. Max enemies defines the maximum number of enemies per game level. Enemy wait time ranges define the wait
@@ -107,63 +232,378 @@ class Destroyer_game(object):
         9:(1,2),
     }
 
-    def __init__(self, window_size=(1280, 1024), init_game_level=0, font_size=16):
+    #Tower turn speed in degrees per second
+    __turn_speed = 120
+
+    #Number of released objects kept for reuse per object pool
+    __pool_sizes = {
+        "bullets":256,
+        "explosions":64,
+        "fades":64,
+        "texts":64
+    }
+
+    def __init__(self, window_size, init_game_level=0, font_size=16, tick_rate=60, entity_store=False,
+                 pool_sizes=None, seed=None):
+        """
+        :param window_size      : window size as x,y
+        :param init_game_level  : the initial game level
+        :param font_size        : font size for HUD
+        :param tick_rate        : simulation ticks per second
+        :param entity_store     : keep ships, torpedos and bullets in numpy backed entity stores (requires numpy)
+        :param pool_sizes       : object pool sizes overriding the defaults, keyed by "bullets", "explosions",
+                                  "fades" and "texts"
+        :param seed             : seed of the random number generator all game randomness is drawn from, between 0
+                                  and 2**32-1. None for a random seed (see get_seed)
+        :type window_size       : set
+        :type init_game_level   : int
+        :type font_size         : int
+        :type tick_rate         : int
+        :type entity_store      : bool
+        :type pool_sizes        : dictionary
+        :type seed              : int
+        """
+
+        self.__window_size = window_size
+        self.__settings = {
+            "window_size": list(window_size),
+            "init_game_level": init_game_level,
+            "font_size": font_size,
+            "tick_rate": tick_rate,
+            "entity_store": entity_store,
+            "pool_sizes": pool_sizes
+        }
+        self.__center = (self.__window_size[0]/2, self.__window_size[1]/2)
+        self.__tick_time = 1.0 / tick_rate
+        self.__turn_steps = max(1, int(round(self.__turn_speed * self.__tick_time)))
+        self.__max_level = max(self.__game_level_breaks.keys())
+        self.__next_level_in = self.__game_level_breaks[init_game_level]
+        self.__total_enemies = 0
+        self.__ticks = 0
+
+        self.__clock = Simulated_clock(self.__tick_time)
+        set_clock(self.__clock)
+        self.__seed = seed if seed is not None else random.SystemRandom().randrange(1 << 32)
+        self.__random = random.Random(self.__seed)
+        set_random(self.__random)
+
+        #Initializing all game objects
+        self.timer = Timer(self.__clock)
+        self.scheduler = Scheduler(self.timer)
+        self.game_level = Game_level(init_game_level)
+        self.points = Points()
+        self.catalog = get_catalog()
+        sizes = dict(self.__pool_sizes)
+        sizes.update(pool_sizes or {})
+        self.texts = Texts(self.timer, sizes["texts"])
+        self.explosions = Explosions(self.timer, sizes["explosions"])
+        self.destroyer_options = Destroyer_options(self.timer, self.scheduler)
+        self.destroyer = Destroyer(0, 5000, self.destroyer_options, self.__window_size, clock=self.__clock)
+        if entity_store:
+            stores = Entity_store(), Entity_store(), Entity_store()
+        else:
+            stores = None, None, None
+        self.trails = Trails(self.timer)
+        self.bullets = Bullets(self.timer, self.__center, self.__window_size, self.trails, store=stores[0],
+                               pool_size=sizes["bullets"])
+        self.torpedos = Torpedos(self.timer, store=stores[1])
+        self.crates = Crates(self.timer, self.scheduler, self.__window_size, font_size + 20, self.destroyer,
+                             self.game_level, catalog=self.catalog)
+        self.enemies = Enemies(self.timer, self.scheduler, self.__enemy_wait_time_ranges[init_game_level],
+                               self.__max_enemies[init_game_level], self.torpedos, self.crates, self.bullets,
+                               self.game_level, self.__window_size, font_size, store=stores[2],
+                               catalog=self.catalog)
+        self.crates.set_enemies(self.enemies)
+        self.fades = Fades(self.timer, sizes["fades"])
+        self.timer.start()
+        self.enemies.add_enemy()
+
+        #Initializing game logic
+        self.logic = Destroyer_logic(self.timer, self.destroyer, self.destroyer_options, self.enemies, self.bullets,
+                                     self.torpedos, self.explosions, self.fades, self.texts, self.points, self.crates,
+                                     self.__window_size, self.catalog)
+
+    def step(self, turn_left=False, turn_right=False, fire=False):
+
+        """
+        Advances the game by one tick and applies the player input for that tick. Returns True if the destroyer has
+        been destroyed.
+
+        :param turn_left    : turn the tower counter clockwise
+        :param turn_right   : turn the tower clockwise
+        :param fire         : fire the gun
+        :type turn_left     : bool
+        :type turn_right    : bool
+        :type fire          : bool
+
+        :returns: boolean
+        """
+
+        self.timer.time()
+        self.scheduler.run()
+        self.__ticks += 1
+
+        #Level handling
+        if self.enemies.get_sunk_count() >= self.__next_level_in:
+            if self.game_level.get_level() < self.__max_level:
+                self.game_level.increase()
+                self.enemies.reset_sunk_count()
+                self.enemies.set_max_enemies(self.__max_enemies[self.game_level.get_level()])
+                self.enemies.set_wait_time_range(self.__enemy_wait_time_ranges[self.game_level.get_level()])
+                self.__next_level_in = self.__game_level_breaks[self.game_level.get_level()]
+                self.texts.add_text((self.__window_size[0]/2, self.__window_size[1]/2),
+                                    "LEVEL UP!", font_size=50, positive=True)
+
+        self.destroyer.regenerate_power()
+        self.enemies.add_enemy()
+        self.enemies.move()
+        self.enemies.shoot()
+        self.torpedos.move()
+        self.bullets.move()
+        self.explosions.change_frames()
+        self.fades.fade()
+        self.trails.update()
+        self.texts.move()
+        self.crates.make_crate(self.timer)
+        self.logic.check()
+        destroyer_check = self.destroyer_options.check()
+        if destroyer_check is not None:
+            self.texts.add_text((self.__window_size[0]/2, self.__window_size[1]/2), "{}...".format(destroyer_check),
+                                font_size=18)
+
+        self.__total_enemies = self.enemies.get_total_enemies()
+
+        if self.destroyer.get_hp() <= 0:
+            return True
+
+        if turn_right:
+            self.destroyer.turn_tower(1, self.__turn_steps)
+
+        if turn_left:
+            self.destroyer.turn_tower(3, self.__turn_steps)
+
+        if fire:
+            if self.destroyer.shoot():
+                self.fades.add_fade(self.destroyer.get_flash()[0], self.destroyer.get_flash()[1], 0.15)
+                bullet_pos = project_point(self.__center[0], self.__center[1], self.destroyer.get_direction(),
+                                           self.destroyer.get_tower_height()+3)
+                self.bullets.add_bullet(Destroyer_bullet_1, bullet_pos, self.destroyer.get_direction())
+        return False
+
+    def step_input(self, bits):
+
+        """
+        Advances the game by one tick with the input given as input bits (see controllers.encode_input), including
+        the machine gun cheat. Returns True if the destroyer has been destroyed.
+
+        :param bits : input bits
+        :type bits  : int
+
+        :returns: boolean
+        """
+
+        if bits & MACHINE_GUN:
+            self.machine_gun()
+        turn_left, turn_right, fire = decode_input(bits)
+        return self.step(turn_left, turn_right, fire)
+
+    def machine_gun(self):
+
+        """
+        Cheat: machine gun for 10 seconds.
+        """
+
+        self.destroyer_options.set_reload_time(100,10)
+        self.destroyer_options.set_power_reduction(0,10)
+        self.destroyer_options.set_power_refill(500,10)
+        self.destroyer_options.set_text_timer(10)
+
+    def get_state(self):
+
+        """
+        Returns a snapshot of the game state as a compressed byte string (see snapshot.dump_state). Used for the
+        keyframes of replays. The snapshot holds the settings and seed of the simulation and the state of the clock,
+        the timer, the scheduler, the random number generator and the unit handlers, each saved as plain data by the
+        get_state method of the object. Running graphics effects (explosions, fades, texts and trails) are not part of
+        the game state and are not saved.
+
+        :returns: bytes
+        """
+
+        rng_version, rng_internal, rng_gauss = self.__random.getstate()
+        return dump_state({
+            "settings": self.__settings,
+            "seed": self.__seed,
+            "ticks": self.__ticks,
+            "next_level_in": self.__next_level_in,
+            "total_enemies": self.__total_enemies,
+            "random": [rng_version, list(rng_internal), rng_gauss],
+            "clock": self.__clock.get_state(),
+            "timer": self.timer.get_state(),
+            "scheduler": self.scheduler.get_state(),
+            "game_level": self.game_level.get_state(),
+            "points": self.points.get_state(),
+            "destroyer_options": self.destroyer_options.get_state(),
+            "destroyer": self.destroyer.get_state(),
+            "bullets": self.bullets.get_state(),
+            "torpedos": self.torpedos.get_state(),
+            "enemies": self.enemies.get_state(),
+            "crates": self.crates.get_state()
+        })
+
+    @classmethod
+    def from_state(cls, snapshot):
+
+        """
+        Creates a simulation from a snapshot returned by get_state. The restored simulation continues exactly like
+        the one the snapshot was taken from. Its clock and random number generator become the shared ones, so only
+        one simulation can be run at a time, as for newly created ones. Raises ValueError for snapshots that are
+        damaged or were saved in another state format version.
+
+        :param snapshot : snapshot from get_state
+        :type snapshot  : bytes
+
+        :returns: Destroyer_simulation
+        """
+
+        state = load_state(snapshot)
+        try:
+            settings = state["settings"]
+            simulation = cls(tuple(settings["window_size"]), settings["init_game_level"], settings["font_size"],
+                             settings["tick_rate"], settings["entity_store"], settings["pool_sizes"], state["seed"])
+            simulation.__set_state(state)
+        except (KeyError, IndexError, TypeError) as e:
+            raise ValueError("Invalid game state snapshot: {!r}".format(e))
+        return simulation
+
+    def __set_state(self, state):
+        self.__ticks = state["ticks"]
+        self.__next_level_in = state["next_level_in"]
+        self.__total_enemies = state["total_enemies"]
+        self.__clock.set_state(state["clock"])
+        self.timer.set_state(state["timer"])
+        self.scheduler.set_state(state["scheduler"])
+        self.game_level.set_state(state["game_level"])
+        self.points.set_state(state["points"])
+        self.destroyer_options.set_state(state["destroyer_options"])
+        self.destroyer.set_state(state["destroyer"])
+        self.bullets.set_state(state["bullets"])
+        self.torpedos.set_state(state["torpedos"])
+        self.enemies.set_state(state["enemies"])
+        #After the enemies, the occupancy grid of the crates holds the cells of the ships
+        self.crates.set_state(state["crates"])
+        rng_version, rng_internal, rng_gauss = state["random"]
+        self.__random.setstate((rng_version, tuple(rng_internal), rng_gauss))
+
+    def get_tick_time(self):
+        return self.__tick_time
+
+    def get_ticks(self):
+        return self.__ticks
+
+    def get_center(self):
+        return self.__center
+
+    def get_seed(self):
+        return self.__seed
+
+    def get_stats(self):
+
+        """
+        Returns the state of the game as a dictionary with the keys ticks, points, hp, level and enemies (total
+        spawned).
+
+        :returns: dictionary
+        """
+
+        return {
+            "ticks": self.__ticks,
+            "points": self.points.get_points(),
+            "hp": self.destroyer.get_hp(),
+            "level": self.game_level.get_level(),
+            "enemies": self.enemies.get_total_enemies()
+        }
+
+    def get_window_size(self):
+        return self.__window_size
+
+
+class Destroyer_game(object):
+
+    #Maximum real time in seconds simulated per frame. Slower frames slow the game down instead of stalling it.
+    __max_frame_time = 0.25
+
+    def __init__(self, window_size=(1280, 1024), init_game_level=0, font_size=16, dirty_rects=False, target_fps=60,
+                 tick_rate=60, entity_store=False, pool_sizes=None, seed=None, keyframe_every=0):
         """
-        Main class for the game creating and managing all game object class instances.
+        Main class for the game creating the simulation and running the main loop. The simulation is advanced in
+        fixed ticks of 1/tick_rate seconds, as many as fit into the real time that has passed. The graphics are drawn
+        once per frame, interpolated between the last two ticks. The input of every tick is recorded into a replay
+        (see get_replay), which can be played back with Headless_game.for_replay. Optionally the game state is stored
+        in the replay every keyframe_every ticks as well, so the playback can seek to any tick quickly.
 
         :param window_size      : window size as x,y
         :param init_game_level  : the initial game level
-        :param enemy_wait_range : range of spawn waiting times between enemies in seconds
         :param font_size        : font size for HUD
+        :param dirty_rects      : use the dirty rectangle rendering mode of Destroyer_gfx
+        :param target_fps       : frame rate limit. None for uncapped, Frame_pacer.VSYNC to sync to the display
+        :param tick_rate        : simulation ticks per second
+        :param entity_store     : keep ships, torpedos and bullets in numpy backed entity stores (requires numpy)
+        :param pool_sizes       : object pool sizes, see Destroyer_simulation
+        :param seed             : seed of the random number generator, None for a random seed
+        :param keyframe_every   : store the game state in the replay every n-th tick, 0 for no keyframes. A keyframe
+                                  takes about 1 ms, about ten times as long as a tick, and is taken inside the frame.
         :type window_size       : set
         :type init_game_level   : set
         :type font_size         : int
+        :type dirty_rects       : bool
+        :type target_fps        : int
+        :type tick_rate         : int
+        :type entity_store      : bool
+        :type pool_sizes        : dictionary
+        :type seed              : int
+        :type keyframe_every    : int
 
         :returns:
         """
         self.__window_size = window_size
-        self.__center = (self.__window_size[0]/2, self.__window_size[1]/2)
-        self.__enemies = []
-        self.__bullets = []
-        self.__enemy_strenght = None
-        self.__font_size = font_size
-        self.__total_enemies = 0
-        self.__max_level = max(self.__game_level_breaks.keys())
-        self.__next_level_in = self.__game_level_breaks[init_game_level]
-        self.__max_enemies_ff = self.__max_enemies[init_game_level]
-        self.__wait_time_range = self.__enemy_wait_time_ranges[init_game_level]
         self.__init_game_level = init_game_level
         self.__font_size = font_size
-        self.__screen = pygame.display.set_mode(window_size)
+        self.__dirty_rects = dirty_rects
+        self.__tick_rate = tick_rate
+        self.__entity_store = entity_store
+        self.__pool_sizes = pool_sizes
+        self.__seed = seed
+        self.__keyframe_every = keyframe_every
+        self.__replay = None
+        self.__screen = None
+        if target_fps == Frame_pacer.VSYNC:
+            try:
+                self.__screen = pygame.display.set_mode(window_size, pygame.SCALED, vsync=1)
+            except (AttributeError, TypeError, pygame.error):
+                #No vsync support, fall back to a fixed frame rate
+                target_fps = 60
+        if self.__screen is None:
+            self.__screen = pygame.display.set_mode(window_size)
+        self.__pacer = Frame_pacer(target_fps)
+
+        #Decoding all images once, after the display is set up so they can be converted to the display format
+        assets.preload("./media")
 
     def run(self):
-        #Initializing all game objects
-        timer = Timer()
         pygame.init()
         pygame.font.init()
-        game_level = Game_level(self.__init_game_level)
-        points = Points()
-        texts = Texts(timer)
-        explosions = Explosions(timer)
-        destroyer_options = Destroyer_options(timer)
-        destroyer = Destroyer(0, 5000, destroyer_options, self.__window_size)
-        bullets = Bullets(timer, (self.__window_size[0]/2, self.__window_size[1]/2), self.__window_size)
-        torpedos = Torpedos(timer)
-        crates = Crates(timer, self.__window_size, self.__font_size + 20, destroyer, game_level)
-        enemies = Enemies(timer, self.__wait_time_range, self.__max_enemies_ff, torpedos, crates, bullets, game_level,
-                          self.__window_size, self.__font_size)
-        crates.set_enemies(enemies)
-        fades = Fades(timer)
-        timer.start()
-        enemies.add_enemy()
-
-        #Initializing game logic
-        logic = Destroyer_logic(timer, destroyer, destroyer_options, enemies, bullets, torpedos, explosions, fades,
-                                texts, points, crates,  self.__window_size)
+        sim = Destroyer_simulation(self.__window_size, self.__init_game_level, self.__font_size, self.__tick_rate,
+                                   self.__entity_store, self.__pool_sizes, self.__seed)
+        tick_time = sim.get_tick_time()
+        self.__replay = Replay(sim.get_seed(), self.__tick_rate, self.__init_game_level, self.__window_size,
+                               self.__entity_store)
 
         #Initializing game graphics
-        graphics = Destroyer_gfx(self.__screen, destroyer, enemies, bullets, torpedos, explosions, fades, texts, points,
-                                 crates, game_level, self.__font_size, "./media/background.png")
+        graphics = Destroyer_gfx(self.__screen, sim.destroyer, sim.enemies, sim.bullets, sim.torpedos, sim.explosions,
+                                 sim.fades, sim.texts, sim.points, sim.crates, sim.game_level, self.__font_size,
+                                 "./media/background.png", sim.trails, dirty_rects=self.__dirty_rects,
+                                 logic=sim.logic)
 
         #Initializing game menus
         kwargs = {"add_text":[0,"Hello","Hallo"]}
@@ -171,85 +611,274 @@ class Destroyer_game(object):
 
         graphics.draw()
         exit_game = False
-        counter = 0
-        oldtime = datetime.datetime.now()
+        self.__pacer.start()
+        last_report = perf_counter()
+        last_frame = perf_counter()
+        accumulator = 0.0
+        #Input bits of key presses that apply to the next tick
+        pending_bits = 0
 
         while not exit_game:
 
-            #Level handling
-            if enemies.get_sunk_count() >= self.__next_level_in:
-                if game_level.get_level() < self.__max_level:
-                    game_level.increase()
-                    enemies.reset_sunk_count()
-                    enemies.set_max_enemies(self.__max_enemies[game_level.get_level()])
-                    enemies.set_wait_time_range(self.__enemy_wait_time_ranges[game_level.get_level()])
-                    self.__next_level_in = self.__game_level_breaks[game_level.get_level()]
-                    texts.add_text((self.__window_size[0]/2, self.__window_size[1]/2),
-                                   "LEVEL UP!", font_size=50, positive=True)
-
-            destroyer.regenerate_power()
-            enemies.add_enemy()
-            enemies.move()
-            enemies.shoot()
-            torpedos.move()
-            bullets.move()
-            explosions.change_frames()
-            fades.fade()
-            texts.move()
-            crates.make_crate(timer)
-            crates.check()
-            logic.check()
-            destroyer_check = destroyer_options.check()
-            if destroyer_check is not None:
-                texts.add_text((self.__window_size[0]/2, self.__window_size[1]/2), "{}...".format(destroyer_check), font_size=18)
-
-            self.__total_enemies = enemies.get_total_enemies()
-
-            if destroyer.get_hp() <= 0:
-                return True
-
             keys = pygame.key.get_pressed()
 
-            if keys[pygame.K_RIGHT]:
-                destroyer.turn_tower(1,2)
-
-            if keys[pygame.K_LEFT]:
-                destroyer.turn_tower(3,2)
-
-            if keys[pygame.K_SPACE]:
-                if destroyer.shoot():
-                    fades.add_fade(destroyer.get_flash()[0], destroyer.get_flash()[1], 0.15)
-                    bullet_pos = project_point(self.__center[0], self.__center[1], destroyer.get_direction(),
-                                               destroyer.get_tower_height()+3)
-                    bullets.add_bullet(Destroyer_bullet_1(timer, bullet_pos, destroyer.get_direction()))
-
             for event in pygame.event.get():
-                if event.type == pygame.QUIT: sys.exit()
+                if event.type == pygame.QUIT:
+                    exit_game = True
 
                 if event.type is pygame.KEYDOWN:
                     key = pygame.key.name(event.key)
 
                     if key == "escape":
+                        pending_bits |= MENU
                         if ingame_menu.show() == 2:
                             exit_game = True
                         else:
-                            timer.reset()
+                            graphics.invalidate()
+                            self.__pacer.start()
+                            last_frame = perf_counter()
 
                     if key == "b":
-                        destroyer_options.set_reload_time(100,10)
-                        destroyer_options.set_power_reduction(0,10)
-                        destroyer_options.set_power_refill(500,10)
-                        destroyer_options.set_text_timer(10)
-
-
-            graphics.draw()
-            timer.time()
-            new_time = datetime.datetime.now()
-            if (new_time-oldtime).total_seconds() >= 1:
-                counter=0
-                oldtime = new_time
-            else:
-                counter += 1
+                        pending_bits |= MACHINE_GUN
+
+                    if key == "f3":
+                        graphics.toggle_debug()
+
+            now = perf_counter()
+            accumulator += min(now - last_frame, self.__max_frame_time)
+            last_frame = now
+
+            while accumulator >= tick_time:
+                bits = encode_input(keys[pygame.K_LEFT], keys[pygame.K_RIGHT], keys[pygame.K_SPACE]) | pending_bits
+                pending_bits = 0
+                self.__replay.record(bits)
+                if sim.step_input(bits):
+                    self.__replay.set_result(sim.get_stats())
+                    return True
+                if self.__keyframe_every > 0 and sim.get_ticks() % self.__keyframe_every == 0:
+                    self.__replay.add_keyframe(sim.get_ticks(), sim.get_state())
+                accumulator -= tick_time
+
+            graphics.draw(accumulator / tick_time)
+            self.__pacer.wait()
+            if perf_counter() - last_report >= 1:
+                pygame.display.set_caption("Destroyer - {:.0f} fps, jitter {:.2f} ms".format(self.__pacer.get_fps(),
+                                                                                             self.__pacer.get_jitter()))
+                last_report = perf_counter()
+
+        self.__replay.set_result(sim.get_stats())
+
+    def get_replay(self):
+        return self.__replay
 
     def __del__(self):
         pass
+
+
+class Headless_game(object):
+
+    def __init__(self, controller, window_size=(1280, 1024), init_game_level=0, font_size=16, tick_rate=60,
+                 entity_store=False, pool_sizes=None, render_every=0, seed=None, keyframe_every=0):
+        """
+        Runs the game simulation without a window, e.g. for soak tests, balance sweeps and performance tracking. The
+        SDL dummy video driver is used, so no display is needed. The simulation runs on its simulated clock as fast as
+        the CPU allows, the input for each tick comes from the controller. Optionally every render_every-th tick is
+        drawn onto an offscreen surface (see get_surface). Each run is recorded into a replay (see get_replay), with a
+        keyframe every keyframe_every ticks.
+
+        :param controller       : object with a get_input(simulation) method returning the input bits of the next
+                                  tick (see controllers.encode_input), e.g. Bot_controller or Script_controller
+        :param window_size      : window size as x,y
+        :param init_game_level  : the initial game level
+        :param font_size        : font size for HUD
+        :param tick_rate        : simulation ticks per second
+        :param entity_store     : keep ships, torpedos and bullets in numpy backed entity stores (requires numpy)
+        :param pool_sizes       : object pool sizes, see Destroyer_simulation
+        :param render_every     : draw every n-th tick offscreen, 0 for no rendering
+        :param seed             : seed of the random number generator, None for a random seed per run
+        :param keyframe_every   : store the game state in the replay every n-th tick, 0 for no keyframes
+        :type window_size       : set
+        :type init_game_level   : int
+        :type font_size         : int
+        :type tick_rate         : int
+        :type entity_store      : bool
+        :type pool_sizes        : dictionary
+        :type render_every      : int
+        :type seed              : int
+        :type keyframe_every    : int
+
+        :returns:
+        """
+
+        self.__controller = controller
+        self.__window_size = window_size
+        self.__init_game_level = init_game_level
+        self.__font_size = font_size
+        self.__tick_rate = tick_rate
+        self.__entity_store = entity_store
+        self.__pool_sizes = pool_sizes
+        self.__render_every = render_every
+        self.__seed = seed
+        self.__keyframe_every = keyframe_every
+        self.__simulation = None
+        self.__replay = None
+        self.__playback = None
+
+        #The video driver is read when the display is initialized, so it has to be set before
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+        pygame.init()
+        pygame.font.init()
+        #The dummy display is needed for converting images to the display format, nothing is shown
+        pygame.display.set_mode(window_size)
+        self.__surface = pygame.Surface(window_size)
+        assets.preload("./media")
+
+    @classmethod
+    def for_replay(cls, replay, render_every=0, keyframe_every=0):
+
+        """
+        Creates a headless game playing back a replay with the settings and the seed it was recorded with. Run it
+        with max_ticks=len(replay). Playbacks can be started at any tick with seek.
+
+        :param replay           : the replay to play back
+        :param render_every     : draw every n-th tick offscreen, 0 for no rendering
+        :param keyframe_every   : store the game state in the recorded replay every n-th tick, 0 for no keyframes
+        :type replay            : Replay
+        :type render_every      : int
+        :type keyframe_every    : int
+
+        :returns: Headless_game
+        """
+
+        game = cls(Script_controller(replay.get_inputs()), replay.get_window_size(), replay.get_init_game_level(),
+                   tick_rate=replay.get_tick_rate(), entity_store=replay.get_entity_store(),
+                   render_every=render_every, seed=replay.get_seed(), keyframe_every=keyframe_every)
+        game.__playback = replay
+        return game
+
+    def seek(self, tick):
+
+        """
+        Moves the playback of a replay to the given tick. The game state is restored from the latest keyframe of the
+        replay before the tick and only the remaining ticks are simulated. Continue the playback with
+        run(resume=True). Returns the simulation. Raises ValueError if the keyframe can not be restored, e.g. because
+        it was saved with another game state format version.
+
+        :param tick : tick to seek to, limited to the length of the replay
+        :type tick  : int
+
+        :returns: Destroyer_simulation
+        """
+
+        if self.__playback is None:
+            raise ValueError("Seeking needs a replay, see Headless_game.for_replay")
+        playback = self.__playback
+        tick = min(tick, len(playback))
+        keyframe = playback.get_keyframe(tick)
+        if keyframe is None:
+            sim = self.__new_simulation()
+        else:
+            sim = Destroyer_simulation.from_state(keyframe[1])
+
+        inputs = playback.get_inputs()
+        while sim.get_ticks() < tick:
+            if sim.step_input(inputs[sim.get_ticks()]):
+                break
+
+        self.__simulation = sim
+        self.__replay = Replay(sim.get_seed(), self.__tick_rate, self.__init_game_level, self.__window_size,
+                               self.__entity_store, inputs[:sim.get_ticks()])
+        for keyframe_tick in playback.get_keyframe_ticks():
+            if keyframe_tick <= sim.get_ticks():
+                self.__replay.add_keyframe(*playback.get_keyframe(keyframe_tick))
+        self.__controller.set_position(sim.get_ticks())
+        return sim
+
+    def __new_simulation(self):
+        return Destroyer_simulation(self.__window_size, self.__init_game_level, self.__font_size, self.__tick_rate,
+                                    self.__entity_store, self.__pool_sizes, self.__seed)
+
+    def run(self, max_ticks=None, resume=False):
+
+        """
+        Runs a new game until the destroyer is destroyed or max_ticks ticks have been simulated. Returns a dictionary
+        of statistics: ticks, game_time (in seconds of game time), wall_time (in seconds), ticks_per_second,
+        max_tick_time (wall time of the slowest tick in seconds), slowest_tick, game_over, points, hp, level, enemies
+        (total spawned), frames (drawn), pair_tests_per_tick (collision pair tests, mean per tick) and max_pair_tests
+        (most pair tests in one tick).
+
+        :param max_ticks    : maximum number of ticks, None for no limit
+        :param resume       : continue the last game, e.g. after seek, instead of starting a new one
+        :type max_ticks     : int
+        :type resume        : bool
+
+        :returns: dictionary
+        """
+
+        if resume and self.__simulation is not None:
+            sim = self.__simulation
+        else:
+            sim = self.__new_simulation()
+            self.__simulation = sim
+            self.__replay = Replay(sim.get_seed(), self.__tick_rate, self.__init_game_level, self.__window_size,
+                                   self.__entity_store)
+        start_ticks = sim.get_ticks()
+        graphics = None
+        if self.__render_every > 0:
+            graphics = Destroyer_gfx(self.__surface, sim.destroyer, sim.enemies, sim.bullets, sim.torpedos,
+                                     sim.explosions, sim.fades, sim.texts, sim.points, sim.crates, sim.game_level,
+                                     self.__font_size, "./media/background.png", sim.trails, present=False,
+                                     logic=sim.logic)
+
+        game_over = False
+        frames = 0
+        max_tick_time = 0
+        slowest_tick = 0
+        pair_tests = 0
+        max_pair_tests = 0
+        start = perf_counter()
+        while max_ticks is None or sim.get_ticks() < max_ticks:
+            bits = self.__controller.get_input(sim)
+            self.__replay.record(bits)
+            tick_start = perf_counter()
+            game_over = sim.step_input(bits)
+            tick_pair_tests = sim.logic.get_pair_tests()
+            pair_tests += tick_pair_tests
+            max_pair_tests = max(max_pair_tests, tick_pair_tests)
+            if game_over:
+                break
+            if graphics is not None and sim.get_ticks() % self.__render_every == 0:
+                graphics.draw()
+                frames += 1
+            tick_time = perf_counter() - tick_start
+            if tick_time > max_tick_time:
+                max_tick_time = tick_time
+                slowest_tick = sim.get_ticks()
+            if self.__keyframe_every > 0 and sim.get_ticks() % self.__keyframe_every == 0:
+                self.__replay.add_keyframe(sim.get_ticks(), sim.get_state())
+        wall_time = perf_counter() - start
+        ticks = sim.get_ticks() - start_ticks
+
+        stats = sim.get_stats()
+        self.__replay.set_result(stats)
+        stats.update({
+            "game_time": sim.get_ticks() * sim.get_tick_time(),
+            "wall_time": wall_time,
+            "ticks_per_second": ticks / wall_time if wall_time > 0 else 0,
+            "max_tick_time": max_tick_time,
+            "slowest_tick": slowest_tick,
+            "game_over": game_over,
+            "frames": frames,
+            "pair_tests_per_tick": pair_tests / float(ticks) if ticks > 0 else 0,
+            "max_pair_tests": max_pair_tests
+        })
+        return stats
+
+    def get_simulation(self):
+        return self.__simulation
+
+    def get_surface(self):
+        return self.__surface
+
+    def get_replay(self):
+        return self.__replay
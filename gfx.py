@@ -16,25 +16,108 @@
 
 
 import pygame
-import datetime
+from assets import assets, load_image, render_text, Lru_cache
+from pool import Object_pool
+
+class Alpha_blitter(object):
+
+    def __init__(self):
+        """
+        Blits images with a given opacity without allocating surfaces per call. Images with per pixel alpha are blitted
+        directly with their surface alpha set to the opacity, which pygame 2 combines with the per pixel alpha. All
+        other images are composed on a scratch surface taken from a pool with one surface per power of two size
+        bucket. The scratch surfaces are created once and reused for every later blit of that size bucket.
+        """
+
+        self.__per_pixel = pygame.version.vernum[0] >= 2
+        self.__scratch = {}
+
+    def __get_scratch(self, width, height):
+        bucket = self.__bucket(width), self.__bucket(height)
+        scratch = self.__scratch.get(bucket)
+        if scratch is None:
+            scratch = pygame.Surface(bucket).convert()
+            self.__scratch[bucket] = scratch
+        return scratch
+
+    @staticmethod
+    def __bucket(size):
+        bucket = 8
+        while bucket < size:
+            bucket *= 2
+        return bucket
+
+    def blit(self, screen, image, rect, opacity):
+
+        """
+        Blits image onto screen at the position of rect with the given opacity between 0 and 255. Returns the affected
+        screen region.
+
+        :returns: pygame.Rect
+        """
+
+        opacity = int(max(0, min(255, opacity)))
+
+        if self.__per_pixel and image.get_flags() & pygame.SRCALPHA:
+            alpha = image.get_alpha()
+            image.set_alpha(opacity)
+            drawn = screen.blit(image, rect)
+            image.set_alpha(alpha)
+            return drawn
+
+        x = rect[0]
+        y = rect[1]
+        width, height = image.get_size()
+        scratch = self.__get_scratch(width, height)
+        scratch.set_clip((0, 0, width, height))
+        scratch.blit(screen, (-x, -y))
+        scratch.blit(image, (0, 0))
+        scratch.set_alpha(opacity)
+        return screen.blit(scratch, (x, y), (0, 0, width, height))
+
+    def get_scratch_count(self):
+        return len(self.__scratch)
+
+
+alpha_blitter = Alpha_blitter()
+
 
 def blit_alpha(screen, image, rect, opacity):
 
     """
-    Function for blit:ing objects with specified opacity onto the game window
+    Function for blit:ing objects with specified opacity onto the game window. Uses the shared Alpha_blitter.
+
+    :returns: pygame.Rect of the affected screen region
+    """
+
+    return alpha_blitter.blit(screen, image, rect, opacity)
+
+def merge_rects(rects):
+
+    """
+    Merges overlapping rectangles into their union, so overlapping screen regions are only updated once.
+
+    :param rects    : rectangles to merge
+    :type rects     : list of pygame.Rect
 
-    :returns
+    :returns: list of pygame.Rect
     """
 
-    x = rect[0]
-    y = rect[1]
-    temp = pygame.Surface((image.get_width(), image.get_height())).convert()
-    temp.blit(screen, (-x, -y))
-    temp.blit(image, (0, 0))
-    temp.set_alpha(opacity)
-    screen.blit(temp, rect)
+    merged = []
+    for r in sorted(rects, key=lambda rect: rect[0]):
+        r = pygame.Rect(r)
+        if r.width == 0 or r.height == 0:
+            continue
+        i = r.collidelist(merged)
+        while i != -1:
+            r.union_ip(merged.pop(i))
+            i = r.collidelist(merged)
+        merged.append(r)
+    return merged
 
 class Fade_fx(object):
+    __slots__ = ("_image", "_rect", "_time", "_steps", "_total_time", "_alpha")
+
     def __init__(self, image, rect, time):
 
         """
@@ -55,10 +138,16 @@ class Fade_fx(object):
         self._rect = rect
         self._time = time
         self._steps = 255/self._time
-        self._old_time = datetime.datetime.now()
         self._total_time = 0
         self._alpha = 255
 
+    def reinit(self, image, rect, time):
+        self.__init__(image, rect, time)
+
+    def reset(self):
+        self._image = None
+        self._rect = None
+
     def fade(self, time_delta):
         if self._alpha < 0:
             return -1
@@ -75,30 +164,146 @@ class Fade_fx(object):
 
 
 class Fades(object):
-    def __init__(self, timer):
+    def __init__(self, timer, pool_size=64):
 
         """
-        Class for managing all the fades in the game window
+        Class for managing all the fades in the game window. Finished fades are reused through an Object_pool.
+
+        :param timer        : timer game instance
+        :param pool_size    : maximum number of finished fades kept for reuse
+        :type pool_size     : int
         """
 
         self.__fade_list = []
         self.__timer = timer
+        self.__pool = Object_pool(pool_size)
 
     def add_fade(self, image, rect, time):
-        self.__fade_list.append(Fade_fx(image, rect, time))
+        self.__fade_list.append(self.__pool.acquire(Fade_fx, image, rect, time))
 
     def fade(self):
         new_fades = []
         for i,v in enumerate(self.__fade_list):
             if not v.fade(self.__timer.get_delta()) == -1:
                 new_fades.append(v)
+            else:
+                self.__pool.release(v)
         self.__fade_list = new_fades
 
     def get_fades(self):
         return self.__fade_list
 
+    def get_pool_stats(self):
+        return self.__pool.get_stats()
+
+
+class Trails(object):
+
+    _trail_images = {
+        0:"./media/trail.png"
+    }
+
+    def __init__(self, timer, capacity=2048, fade_time=0.4):
+
+        """
+        Particle system for bullet trails. Every trail segment emitted by a bullet is stored in fixed size ring
+        buffers holding its position, emission time and a reference to a pre rotated segment image. Segments fade out
+        over fade_time and are dropped oldest first, either when they have faded or when the buffers are full, so
+        memory and drawing cost are bounded by the capacity no matter how many bullets are fired.
+
+        :param timer        : timer game instance
+        :param capacity     : maximum number of trail segments alive at the same time
+        :param fade_time    : fade time of a segment in seconds
+        :type capacity      : int
+        :type fade_time     : float
+        """
+
+        self.__timer = timer
+        self.__capacity = capacity
+        self.__fade_time = float(fade_time)
+        self.__x = [0] * capacity
+        self.__y = [0] * capacity
+        self.__born = [0.0] * capacity
+        self.__segment = [None] * capacity
+        self.__first = 0
+        self.__count = 0
+        self.__segments = Lru_cache(max_entries=2048)
+
+    def __get_segment(self, length, direction, trail_type):
+
+        """
+        Returns the trail image cut to length and rotated to direction, quantized to whole pixels and degrees.
+
+        :returns: pygame.Surface
+        """
+
+        length = int(length)
+        step = int(round(direction)) % 360
+        key = trail_type, length, step
+        segment = self.__segments.get(key)
+        if segment is None:
+            image = load_image(self._trail_images[trail_type])
+            if 0 < length <= image.get_height():
+                image = image.subsurface((0, 0, image.get_width(), length))
+            segment = pygame.transform.rotate(image, -step)
+            self.__segments.put(key, segment)
+        return segment
+
+    def emit(self, x, y, length, direction, trail_type=0):
+
+        """
+        Adds a trail segment centered on x,y. If all slots are taken, the oldest segment is replaced.
+        """
+
+        segment = self.__get_segment(length, direction, trail_type)
+        if self.__count == self.__capacity:
+            self.__first = (self.__first + 1) % self.__capacity
+            self.__count -= 1
+        i = (self.__first + self.__count) % self.__capacity
+        self.__x[i] = x - segment.get_width() / 2
+        self.__y[i] = y - segment.get_height() / 2
+        self.__born[i] = self.__timer.get_time()
+        self.__segment[i] = segment
+        self.__count += 1
+
+    def update(self):
+
+        """
+        Drops the segments that have faded out. All segments have the same fade time, so they expire in the order they
+        were emitted.
+        """
+
+        expired = self.__timer.get_time() - self.__fade_time
+        while self.__count > 0 and self.__born[self.__first] <= expired:
+            self.__segment[self.__first] = None
+            self.__first = (self.__first + 1) % self.__capacity
+            self.__count -= 1
+
+    def draw(self, screen, blitter):
+
+        """
+        Draws all segments in one pass with their current opacity. Returns the affected screen regions.
+
+        :returns: list of pygame.Rect
+        """
+
+        now = self.__timer.get_time()
+        steps = 255 / self.__fade_time
+        drawn = []
+        for n in range(self.__count):
+            i = (self.__first + n) % self.__capacity
+            drawn.append(blitter.blit(screen, self.__segment[i], (self.__x[i], self.__y[i]),
+                                      255 - steps * (now - self.__born[i])))
+        return drawn
+
+    def count(self):
+        return self.__count
+
 
 class Text_fx(object):
+    __slots__ = ("_text", "_time", "_movement", "_alpha_steps", "_steps", "_origin", "_time_delta", "_alpha", "_color",
+                 "_rect", "_font_size", "_image", "_size_x", "_size_y", "_position")
+
     def __init__(self, origin, text, time, movement, font_size=16, positive=True):
 
         """
@@ -128,13 +333,19 @@ class Text_fx(object):
         if not positive:
             self._color = (190,28,28)
 
-        myfont = pygame.font.SysFont('Arial', self._font_size)
-        self._image = myfont.render(self._text, True, self._color)
+        self._image = render_text(self._text, self._font_size, self._color)
         rect = self._image.get_rect()
         self._size_x, self._size_y = rect[2], rect[3]
         self._position = (self._origin[0] - (self._size_x/2), self._origin[1] - (self._size_y/2))
         self._rect = (self._position[0], self._position[1], self._size_x, self._size_y)
 
+    def reinit(self, origin, text, time, movement, font_size=16, positive=True):
+        self.__init__(origin, text, time, movement, font_size, positive)
+
+    def reset(self):
+        self._image = None
+        self._rect = None
+
     def move(self, time_delta):
         if self._alpha < 0:
             return -1
@@ -155,78 +366,111 @@ class Text_fx(object):
 class Texts(object):
 
     """
-    Class holding all text effect objects in the game
+    Class holding all text effect objects in the game. Finished texts are reused through an Object_pool.
     """
 
-    def __init__(self, timer):
+    def __init__(self, timer, pool_size=64):
         self.__text_list = []
         self.__timer = timer
+        self.__pool = Object_pool(pool_size)
 
     def add_text(self, origin, text, positive=True, font_size=16):
-        self.__text_list.append(Text_fx(origin, text, 1000, 80, font_size=font_size, positive=positive))
+        self.__text_list.append(self.__pool.acquire(Text_fx, origin, text, 1000, 80, font_size, positive))
 
     def move(self):
         new_texts = []
         for i,v in enumerate(self.__text_list):
             if not v.move(self.__timer.get_delta()) == -1:
                 new_texts.append(v)
+            else:
+                self.__pool.release(v)
         self.__text_list = new_texts
 
     def get_texts(self):
         return self.__text_list
 
+    def get_pool_stats(self):
+        return self.__pool.get_stats()
+
 
 class Explosion(object):
-    def __init__(self, origin, pause):
+    __slots__ = ("__animation", "__rect", "__pause", "__start_time", "__frame")
+
+    _frames = "./media/explosion/frame_{}.png"
+    _frame_count = 17
+
+    def __init__(self, origin, pause, start_time=None):
 
         """
         Explosion animation class. Shows the sequence of explosion images at specified intervals to create the
-        illusion of an awesome explosion
+        illusion of an awesome explosion. The frames are shared between all explosions through the asset cache, an
+        explosion only holds its position and start time and picks the current frame from the elapsed game time.
         origin (list of int)  : origin as x,y. Usually the impact point of the bullet Lower center of the image
                                 rectangle
         pause (int)           : pause between the images in ms
-
-        TODO
+        start_time (float)    : game time in seconds when the explosion started. Set by Explosions.add_explosion if
+                                not given.
         """
 
-        self.__frame = 1
-        self.__image = pygame.image.load("./media/explosion/frame_1.png")
-        self.__old_time = datetime.datetime.now()
+        self.__animation = assets.get_animation(self._frames, self._frame_count)
         self.__rect = pygame.Rect(origin[0]-63, origin[1]-132, 62, 132)
         self.__pause = pause
-        self.__total_time_delta = 0
+        self.__start_time = start_time
+        self.__frame = 0
+
+    def reinit(self, origin, pause, start_time=None):
+        self.__rect.topleft = origin[0]-63, origin[1]-132
+        self.__pause = pause
+        self.__start_time = start_time
+        self.__frame = 0
+
+    def reset(self):
+        pass
+
+    def start(self, start_time):
+        self.__start_time = start_time
+
+    def get_start_time(self):
+        return self.__start_time
 
     def next_frame(self, timer):
 
         """
-        Method to walk through the frames and change image if the specified pause time has elapsed. If the explosion
-        sequence is finished, it returns True, otherwise False.
+        Method to select the frame for the current game time. If the explosion sequence is finished, it returns True,
+        otherwise False.
         """
 
-        self.__total_time_delta += timer.get_delta()
-        if self.__frame > 17:
+        self.__frame = int((timer.get_time() - self.__start_time) * 1000 / self.__pause)
+        if self.__frame >= self.__animation.get_frame_count():
             return True
-        if self.__total_time_delta*1000 >= self.__pause:
-            self.__image = pygame.image.load("./media/explosion/frame_{}.png".format(self.__frame))
-            self.__total_time_delta = 0
-            self.__frame += 1
         return False
 
     def get_image(self):
-        return self.__image, self.__rect
+        return self.__animation.get_frame(max(self.__frame, 0)), self.__rect
 
 
 class Explosions(object):
 
     """
-    Class holding all instances of explosion objects in the game.
+    Class holding all instances of explosion objects in the game. Finished explosions are reused through an
+    Object_pool.
     """
 
-    def __init__(self, timer):
+    def __init__(self, timer, pool_size=64):
         self.__explosion_list = []
         self.__timer = timer
+        self.__pool = Object_pool(pool_size)
+
+    def add_explosion(self, origin, pause, start_time=None):
 
-    def add_explosion(self, explosion):
+        """
+        Adds an explosion at origin, see Explosion. The explosion starts at the current game time if no start time is
+        given.
+        """
+
+        explosion = self.__pool.acquire(Explosion, origin, pause, start_time)
+        if start_time is None:
+            explosion.start(self.__timer.get_time())
         self.__explosion_list.append(explosion)
 
     def change_frames(self):
@@ -234,8 +478,13 @@ class Explosions(object):
         for e in self.__explosion_list:
             if not e.next_frame(self.__timer):
                 new_list.append(e)
+            else:
+                self.__pool.release(e)
         self.__explosion_list = new_list
 
+    def get_pool_stats(self):
+        return self.__pool.get_stats()
+
     def get_explosions(self):
         return self.__explosion_list
 
@@ -243,7 +492,7 @@ class Explosions(object):
 class Destroyer_gfx(object):
 
     def __init__(self, screen, destroyer, enemies, bullets, torpedos, explosions, fades, texts, points, crates,
-                 game_level, font_size, bg_image):
+                 game_level, font_size, bg_image, trails, dirty_rects=False, present=True, logic=None):
 
         """
         Main graphics class. This is where all the elements are drawn.
@@ -260,6 +509,14 @@ class Destroyer_gfx(object):
         crates (Creates)          : Crates class game instance
         font_size (int)           : HUD font size
         bg_image (string)         : path to the background image
+        trails (Trails)           : Trails class game instance
+        dirty_rects (bool)        : if True, only the regions drawn to in the last and the current frame are
+                                    restored from the background and updated on the display instead of the whole
+                                    window. Call invalidate() after something else has drawn to the screen.
+        present (bool)            : if False, the frames are only drawn onto screen and not presented on the display,
+                                    for rendering onto an offscreen surface.
+        logic (Destroyer_logic)   : optional game logic instance, its collision pair tests are shown in the debug
+                                    overlay
 
         TODO
         """
@@ -278,33 +535,83 @@ class Destroyer_gfx(object):
         self.__font_size = font_size
         self.__crates = crates
         self.__game_level = game_level
+        self.__trails = trails
+        self.__hud = None
+        self.__hud_state = None
+        self.__dirty_rects = dirty_rects
+        self.__present = present
+        self.__drawn_rects = []
+        self.__full_redraw = True
+        self.__debug = False
+        self.__logic = logic
         self.make_background()
 
     def __render_hud(self):
 
         """
-        Method for rendering the HUD, showing information on the player HP, points and level.
+        Method for rendering the HUD, showing information on the player HP, points and level. The HUD is composed into
+        a cached surface that is only rendered again if one of the shown values has changed, otherwise drawing the
+        HUD is a single blit.
         :return:
         """
 
-        myfont = pygame.font.SysFont('Arial', self.__font_size)
-        rect = pygame.Rect(0,0,self.__window_size[0],self.__font_size)
-        pygame.draw.rect(self.__screen, (150,150,150), rect, 0)
+        hud_state = (self.__points.get_points(), self.__destroyer.get_hp(), self.__destroyer.get_max_hp(),
+                     self.__game_level.get_level())
+        if hud_state != self.__hud_state:
+            self.__hud_state = hud_state
+            self.__hud = self.__compose_hud(*hud_state)
+        self.__blit(self.__hud, (0,0))
 
-        points = myfont.render('Points: {}'.format(self.__points.get_points()), True, (255, 255, 255))
-        self.__screen.blit(points, (0,0))
+    def __compose_hud(self, points, hp, max_hp, game_level):
 
-        hp_ratio = self.__destroyer.get_hp() / float(self.__destroyer.get_max_hp())
-        hp = myfont.render('HP: {}'.format(self.__destroyer.get_hp()), True, (255, 255*hp_ratio,255*hp_ratio))
-        self.__screen.blit(hp, (100,0))
+        """
+        Renders the HUD texts on top of the HUD bar onto a new transparent surface.
+
+        :returns: pygame.Surface
+        """
+
+        hp_ratio = max(0.0, min(1.0, hp / float(max_hp)))
+        texts = [
+            render_text('Points: {}'.format(points), self.__font_size, (255, 255, 255)),
+            render_text('HP: {}'.format(hp), self.__font_size, (255, int(255*hp_ratio), int(255*hp_ratio))),
+            render_text("Max HP:{}".format(max_hp), self.__font_size, (255,255,255)),
+            render_text("Level: {}".format(game_level +1), self.__font_size, (255,255,255))
+        ]
+
+        height = max([self.__font_size] + [t.get_height() for t in texts])
+        hud = pygame.Surface((self.__window_size[0], height), pygame.SRCALPHA).convert_alpha()
+        hud.fill((0,0,0,0))
+        hud.fill((150,150,150), pygame.Rect(0,0,self.__window_size[0],self.__font_size))
+
+        hud.blit(texts[0], (0,0))
+        hud.blit(texts[1], (100,0))
+        hud.blit(texts[2], (200,0))
+        size_x = texts[3].get_rect()[2]
+        hud.blit(texts[3], (self.__window_size[0] - size_x - 10, 0))
+        return hud
+
+    def __render_debug(self):
+
+        """
+        Debug overlay below the HUD, showing the object pool statistics and the collision pair tests of the last tick.
+        """
 
-        max_hp = myfont.render("Max HP:{}".format(self.__destroyer.get_max_hp()), True, (255,255,255))
-        self.__screen.blit(max_hp, (200,0))
+        lines = []
+        for name, container in (("bullets", self.__bullets), ("explosions", self.__explosions),
+                                ("fades", self.__fades), ("texts", self.__texts)):
+            lines.append("{}: hits {hits} misses {misses} in use {in_use} high water {high_water} free {free}".format(
+                name, **container.get_pool_stats()))
+        if self.__logic is not None:
+            lines.append("collisions: pair tests {}".format(self.__logic.get_pair_tests()))
 
-        level = myfont.render("Level: {}".format(self.__game_level.get_level() +1), True, (255,255,255))
-        size_x = level.get_rect()[2]
-        self.__screen.blit(level, (self.__window_size[0] - size_x - 10, 0))
+        y = self.__hud.get_height() + 4
+        for text in lines:
+            image = render_text(text, self.__font_size, (255, 255, 0))
+            self.__blit(image, (4, y))
+            y += image.get_height()
 
+    def toggle_debug(self):
+        self.__debug = not self.__debug
 
     def make_background(self):
 
@@ -313,34 +620,43 @@ class Destroyer_gfx(object):
         :return:
         """
 
-        self.__background = pygame.image.load(self.__background_path)
+        self.__background = load_image(self.__background_path)
         self.__background = pygame.transform.scale(self.__background, (self.__window_size[0], self.__window_size[1]))
         self.__background_rect = self.__background.get_rect()
         self.__background_rect.left, self.__background_rect.top = [0,0]
 
-    def draw(self):
+    def draw(self, alpha=1.0):
 
         """
-        The drawing method itself. Drawing order:
+        The drawing method itself. Moving objects are drawn at their position interpolated between the last two
+        simulation ticks, alpha being the fraction of a tick that has passed since the last tick. Drawing order:
         1. Background image
         2. Destroyer
         3. Bullets
         4. Crates
-        5. Fades
-        6. Tower
-        7. Torpedos
-        8. Enemies
-        9. Destroyer pipe
-        10. Explosions
-        11. Texts
-        12. HUD
+        5. Bullet trails
+        6. Fades
+        7. Tower
+        8. Torpedos
+        9. Enemies
+        10. Destroyer pipe
+        11. Explosions
+        12. Texts
+        13. HUD
+        14. Debug overlay, if enabled with toggle_debug
 
         :return:
         """
 
-        self.__screen.blit(self.__background, self.__background_rect)
+        previous_rects = self.__drawn_rects
+        self.__drawn_rects = []
+        if self.__dirty_rects and not self.__full_redraw:
+            for r in previous_rects:
+                self.__screen.blit(self.__background, r, r)
+        else:
+            self.__screen.blit(self.__background, self.__background_rect)
 
-        self.__screen.blit(self.__destroyer.get_image()[0], self.__destroyer.get_image()[1])
+        self.__blit(self.__destroyer.get_image()[0], self.__destroyer.get_image()[1])
 
         #Drawing the shoot power bar
         shooting_power = self.__destroyer.get_shooting_power()
@@ -349,49 +665,71 @@ class Destroyer_gfx(object):
             self.__screen.fill((255 - shooting_power*2.55, shooting_power*2.55, 0),
                          (self.__window_size[0]/2 - 25, self.__window_size[1]/2 + 30,
                           shooting_power/2, 3))
-            pygame.draw.rect(self.__screen, (0, 0, 0), \
+            self.__drawn_rects.append(pygame.draw.rect(self.__screen, (0, 0, 0), \
             (self.__window_size[0]/2 - 26, self.__window_size[1]/2 + 29,
-             shooting_power/2+1, 4),1)
+             shooting_power/2+1, 4),1))
         else:
             self.__screen.fill((255 - shooting_power*2.55, shooting_power*2.55, 0),
                                (self.__window_size[0]/2 - 25, self.__window_size[1]/2 - 30,
                                 shooting_power/2, 3))
-            pygame.draw.rect(self.__screen, (0, 0, 0), \
+            self.__drawn_rects.append(pygame.draw.rect(self.__screen, (0, 0, 0), \
                              (self.__window_size[0]/2 - 26, self.__window_size[1]/2 - 31,
-                              shooting_power/2+1, 4),1)
+                              shooting_power/2+1, 4),1))
 
         for b in self.__bullets.get_bullets():
-            self.__screen.blit(b.get_image()[0], b.get_image()[1])
-            trail = b.get_trail()
-            if trail is not None:
-                self.__fades.add_fade(trail.get_image(), trail.get_rect(), 0.4)
+            self.__blit(b.get_image()[0], b.get_draw_rect(alpha))
 
         for c in self.__crates.get_crates():
-            self.__screen.blit(c.get_image()[0], c.get_image()[1])
+            self.__blit(c.get_image()[0], c.get_image()[1])
+
+        self.__drawn_rects.extend(self.__trails.draw(self.__screen, alpha_blitter))
 
         for f in self.__fades.get_fades():
-            blit_alpha(self.__screen, f.get_image()[0], f.get_image()[1], f.get_alpha())
+            self.__drawn_rects.append(blit_alpha(self.__screen, f.get_image()[0], f.get_image()[1], f.get_alpha()))
 
-        self.__screen.blit(self.__destroyer.get_tower()[0], self.__destroyer.get_tower()[1])
+        self.__blit(self.__destroyer.get_tower()[0], self.__destroyer.get_tower()[1])
 
         for t in self.__torpedos.get_torpedos():
-            self.__screen.blit(t.get_image()[0], t.get_image()[1])
+            self.__blit(t.get_image()[0], t.get_draw_rect(alpha))
 
         for e in self.__enemies.get_enemies():
-            self.__screen.blit(e.get_image()[0], e.get_image()[1])
+            self.__blit(e.get_image()[0], e.get_draw_rect(alpha))
 
         #pygame.draw.line(self.__screen, (102,102,102), (self.__window_size[0]/2, self.__window_size[1]/2),
         #                 (self.__destroyer.get_pipe()), 8)
 
         for e in self.__explosions.get_explosions():
-            self.__screen.blit(e.get_image()[0], e.get_image()[1])
+            self.__blit(e.get_image()[0], e.get_image()[1])
 
         for f in self.__texts.get_texts():
-            blit_alpha(self.__screen, f.get_image()[0], f.get_image()[1], f.get_alpha())
+            self.__drawn_rects.append(blit_alpha(self.__screen, f.get_image()[0], f.get_image()[1], f.get_alpha()))
 
         self.__render_hud()
+        if self.__debug:
+            self.__render_debug()
+
+        if self.__present:
+            if self.__dirty_rects and not self.__full_redraw:
+                pygame.display.update(merge_rects(previous_rects + self.__drawn_rects))
+            else:
+                pygame.display.update()
+        self.__full_redraw = False
+
+    def __blit(self, image, rect):
+
+        """
+        Blits an image onto the screen and remembers the affected screen region for the dirty rectangle mode.
+        """
+
+        self.__drawn_rects.append(self.__screen.blit(image, rect))
+
+    def invalidate(self):
+
+        """
+        Forces the next frame to redraw and update the whole window, e.g. after a menu has been painted over the game.
+        """
 
-        pygame.display.update()
+        self.__full_redraw = True
 
     def get_screen(self):
         return self.__screen
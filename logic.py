@@ -17,6 +17,7 @@
 
 from gfx import *
 from units import *
+from catalog import get_catalog
 import pygame
 
 class Points(object):
@@ -38,10 +39,79 @@ class Points(object):
     def get_points(self):
         return self.__points
 
+    def get_state(self):
+        return {"points": self.__points}
+
+    def set_state(self, state):
+        self.__points = state["points"]
+
+class Spatial_grid(object):
+    def __init__(self, cell_size=64):
+        """
+        Uniform grid for the broad phase of the collision checks. Objects are inserted with their rectangle into every
+        grid cell the rectangle covers. A query returns the objects sharing at least one cell with the query
+        rectangle, which are the only candidates for an actual collision. The grid is rebuilt every tick.
+
+        :param cell_size    : width and height of the grid cells in pixels
+        :type cell_size     : int
+        """
+
+        self.__cell_size = cell_size
+        self.__cells = {}
+
+    def __cell_range(self, rect):
+        size = self.__cell_size
+        return (int(rect[0]) // size, int(rect[0] + rect[2]) // size,
+                int(rect[1]) // size, int(rect[1] + rect[3]) // size)
+
+    def clear(self):
+        self.__cells = {}
+
+    def insert(self, key, item, rect):
+
+        """
+        Inserts an object into the grid. The key identifies the object, usually its container handle, and is used to
+        return candidates in a fixed order.
+        """
+
+        x0, x1, y0, y1 = self.__cell_range(rect)
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                cell = self.__cells.get((x, y))
+                if cell is None:
+                    self.__cells[(x, y)] = [(key, item)]
+                else:
+                    cell.append((key, item))
+
+    def build(self, entries, get_rect):
+        self.clear()
+        for key, item in entries:
+            self.insert(key, item, get_rect(item))
+
+    def query(self, rect):
+
+        """
+        Returns the objects that share a grid cell with rect as list of key, object, ordered by key.
+
+        :returns: list
+        """
+
+        x0, x1, y0, y1 = self.__cell_range(rect)
+        if x0 == x1 and y0 == y1:
+            return sorted(self.__cells.get((x0, y0), ()), key=lambda entry: entry[0])
+
+        found = {}
+        for x in range(x0, x1 + 1):
+            for y in range(y0, y1 + 1):
+                for key, item in self.__cells.get((x, y), ()):
+                    found[key] = item
+        return sorted(found.items(), key=lambda entry: entry[0])
+
+
 class Destroyer_logic(object):
 
     def __init__(self, timer, destroyer, destroyer_options, enemies, bullets, torpedos, explosions, fades, texts,
-                 points, crates, window_size):
+                 points, crates, window_size, catalog=None):
 
         """
         This is where all the game logic magic happens. Takes the instances of the different game objects and checks
@@ -57,6 +127,7 @@ class Destroyer_logic(object):
         :param points       : game instance of points class
         :param crates       : game instance of crates class
         :param window_size  : window size as x(int), y(int)
+        :param catalog      : unit catalog defining the effect of each crate type, defaults to the shared catalog
         :type destroyer     : Destroyer
         :type enemies       : Enemies
         :type bullets       : Bullets
@@ -67,6 +138,7 @@ class Destroyer_logic(object):
         :type points        : Points
         :type crates        : Crates
         :type window_size   : list
+        :type catalog       : Unit_catalog
 
         :returns:
         """
@@ -83,271 +155,312 @@ class Destroyer_logic(object):
         self.__crates = crates
         self.__timer = timer
         self.__destroyer_options = destroyer_options
+        self.__enemy_grid = Spatial_grid()
+        self.__torpedo_grid = Spatial_grid()
+        self.__crate_grid = Spatial_grid()
+        self.__pair_tests = 0
+        self.__bullet_entries = []
+        self.__removed_bullets = set()
+        self.__removed_enemies = set()
+        self.__removed_torpedos = set()
+        self.__removed_crates = set()
+        self.__sunk_count = 0
+        self.__catalog = catalog if catalog is not None else get_catalog()
+        self.__crate_effects = {
+            "repair": self.__repair_effect,
+            "armor": self.__armor_effect,
+            "life": self.__life_effect,
+            "bomb": self.__bomb_effect,
+            "mines": self.__mines_effect,
+            "machine_gun": self.__machine_gun_effect
+        }
+        missing = self.__catalog.get_crate_effects() - set(self.__crate_effects)
+        if missing:
+            raise ValueError("No handler for crate effects: {}".format(", ".join(sorted(missing))))
+
+    def __collide(self, rect_1, rect_2):
+
+        """
+        Narrow phase collision test. Counts the number of pair tests per check.
+
+        :returns: boolean
+        """
+
+        self.__pair_tests += 1
+        return rect_1.colliderect(rect_2)
 
     def __check_bullets(self):
 
         """
-        Checks if any of the bullets are outside the game window. Returns a list of indices for the bullets that are
-        to be removed.
+        Checks if any of the bullets are outside the game window and marks them for removal.
 
-        :returns: list
+        :returns:
         """
-        bullet_remove_list = []
-        bullet_list = self.__bullets.get_bullets()
 
-        for b, _bullet in enumerate(bullet_list):
-            if not (self.__window_size[0] >= _bullet.get_position()[0] >= 0) or \
-                    not (self.__window_size[1] >= _bullet.get_position()[1] >= 0):
-                bullet_remove_list.append(b)
-        return bullet_remove_list
+        for b, _bullet in self.__bullet_entries:
+            position = _bullet.get_position()
+            if not (self.__window_size[0] >= position[0] >= 0) or \
+                    not (self.__window_size[1] >= position[1] >= 0):
+                self.__removed_bullets.add(b)
 
     def __check_bullets_enemies(self):
 
         """
-        Checks for collisions between bullets and enemies and what happens in that case. Returns list of bullets and
-        enemies that are to be removed.
+        Checks for collisions between bullets and enemies and what happens in that case. Bullets and sunk enemies are
+        marked for removal. Bullets and enemies marked during an earlier pass of the same check are skipped.
 
-        :returns: list
+        :returns:
         """
-        enemy_remove_list = []
-        bullet_remove_list = []
-        enemy_list = self.__enemies.get_enemies()
-        bullet_list = self.__bullets.get_bullets()
 
-        for b, _bullet in enumerate(bullet_list):
+        for b, _bullet in self.__bullet_entries:
+            if b in self.__removed_bullets:
+                continue
             if _bullet.is_friendly():
-                for e, _enemy in enumerate(enemy_list):
-                    if _bullet.get_image()[1].colliderect(_enemy.get_image()[1]):
-                        bullet_remove_list.append(b)
-                        self.__explosions.add_explosion(Explosion(_bullet.get_position(), 20))
+                for e, _enemy in self.__enemy_grid.query(_bullet.get_image()[1]):
+                    if e in self.__removed_enemies:
+                        continue
+                    if self.__collide(_bullet.get_image()[1], _enemy.get_image()[1]):
+                        self.__removed_bullets.add(b)
+                        self.__explosions.add_explosion(_bullet.get_position(), 20)
                         if _enemy.reduce_hp(_bullet.get_damage()):
-                            enemy_remove_list.append(e)
-                            self.__points.add_points(_enemy.get_params()["points"])
+                            self.__removed_enemies.add(e)
+                            self.__sunk_count += 1
+                            self.__points.add_points(_enemy.get_instance_params().points)
                             self.__fades.add_fade(_enemy.get_image()[0], _enemy.get_image()[1], 0.5)
                             self.__texts.add_text(_bullet.get_position(), "+{}".
-                                                  format(_enemy.get_params()["points"]))
+                                                  format(_enemy.get_instance_params().points))
             else:
-                if _bullet.get_image()[1].colliderect(self.__destroyer.get_image()[1]):
-                    bullet_remove_list.append(b)
-                    self.__explosions.add_explosion(Explosion(_bullet.get_position(), 20))
+                if self.__collide(_bullet.get_image()[1], self.__destroyer.get_image()[1]):
+                    self.__removed_bullets.add(b)
+                    self.__explosions.add_explosion(_bullet.get_position(), 20)
                     self.__texts.add_text(_bullet.get_position(), "-{}".
                                           format(_bullet.get_damage(), positive=False))
                     self.__destroyer.reduce_hp(_bullet.get_damage())
-        return bullet_remove_list, enemy_remove_list
 
     def __check_enemies(self):
 
         """
-        Checks if any of the enemies are outside the game window. Returns a list of enemies that are to be removed
+        Checks if any of the enemies are outside the game window and marks them for removal.
 
-        :returns: list
+        :returns:
         """
-        enemies_remove_list = []
-        for e, _enemy in enumerate(self.__enemies.get_enemies()):
+
+        for e, _enemy in self.__enemies.get_entries():
+            if e in self.__removed_enemies:
+                continue
             rect = _enemy.get_extent()
 
             if _enemy.get_direction() == 0:
                 if rect[1] <= 0:
-                    enemies_remove_list.append(e)
-                    self.__points.reduce_points(_enemy.get_params()["points"])
+                    self.__removed_enemies.add(e)
+                    self.__points.reduce_points(_enemy.get_instance_params().points)
 
             if _enemy.get_direction() == 1:
                 if rect[0] >= self.__window_size[0]:
-                    enemies_remove_list.append(e)
-                    self.__points.reduce_points(_enemy.get_params()["points"])
+                    self.__removed_enemies.add(e)
+                    self.__points.reduce_points(_enemy.get_instance_params().points)
 
             if _enemy.get_direction() == 2:
-                if rect[1] > self.__window_size:
-                    enemies_remove_list.append(e)
-                    self.__points.reduce_points(_enemy.get_params()["points"])
+                if rect[1] > self.__window_size[1]:
+                    self.__removed_enemies.add(e)
+                    self.__points.reduce_points(_enemy.get_instance_params().points)
 
             if _enemy.get_direction() == 3:
                 if rect[2] <= 0:
-                    enemies_remove_list.append(e)
-                    self.__points.reduce_points(_enemy.get_params()["points"])
-        return enemies_remove_list
+                    self.__removed_enemies.add(e)
+                    self.__points.reduce_points(_enemy.get_instance_params().points)
 
     def __check_torpedos(self):
 
         """
-        Checks if any of the torpedos are outside the game window. Returns a list of torpedos that are to be removed
+        Checks if any of the torpedos hit the destroyer or are outside the game window and marks them for removal.
 
-        :returns: list
+        :returns:
         """
 
-        torpedos_remove_list = []
-        for t, _torpedo in enumerate(self.__torpedos.get_torpedos()):
+        for t, _torpedo in self.__torpedos.get_entries():
             rect = _torpedo.get_rect()
 
-            if _torpedo.get_image()[1].colliderect(self.__destroyer.get_image()[1]):
-                torpedos_remove_list.append(t)
-                self.__explosions.add_explosion(Explosion(_torpedo.get_position(), 20))
+            if self.__collide(_torpedo.get_image()[1], self.__destroyer.get_image()[1]):
+                self.__removed_torpedos.add(t)
+                self.__explosions.add_explosion(_torpedo.get_position(), 20)
                 self.__texts.add_text(_torpedo.get_position(), "-{}".
-                                      format(_torpedo.get_params()["points"]), positive = False)
+                                      format(_torpedo.get_instance_params().points), positive = False)
                 self.__destroyer.reduce_hp(_torpedo.get_damage())
 
             elif _torpedo.get_direction() == 0:
                 if rect[1] <= 0:
-                    torpedos_remove_list.append(t)
+                    self.__removed_torpedos.add(t)
             elif _torpedo.get_direction() == 1:
                 if rect[0] >= self.__window_size[0]:
-                    torpedos_remove_list.append(t)
+                    self.__removed_torpedos.add(t)
             elif _torpedo.get_direction() == 2:
-                if rect[1] > self.__window_size:
-                    torpedos_remove_list.append(t)
+                if rect[1] > self.__window_size[1]:
+                    self.__removed_torpedos.add(t)
             elif _torpedo.get_direction() == 3:
                 if rect[2] <= 0:
-                    torpedos_remove_list.append(t)
-        return torpedos_remove_list
+                    self.__removed_torpedos.add(t)
 
     def __check_bullets_torpedos(self):
 
         """
-        Checks for collisions between bullets and torpedos and what happens in that case. Returns list of bullets
-        torpedos that are to be removed.
+        Checks for collisions between bullets and torpedos and what happens in that case. Bullets and torpedos are
+        marked for removal.
 
-        :returns: list
+        :returns:
         """
 
-        torpedo_remove_list = []
-        bullet_remove_list = []
-        torpedo_list = self.__torpedos.get_torpedos()
-        bullet_list = self.__bullets.get_bullets()
-
-        for b,_bullet in enumerate(bullet_list):
+        for b, _bullet in self.__bullet_entries:
+            if b in self.__removed_bullets:
+                continue
             if _bullet.is_friendly():
-                for t, _torpedo in enumerate(torpedo_list):
-                    if _bullet.get_image()[1].colliderect(_torpedo.get_image()[1]):
-                        bullet_remove_list.append(b)
-                        torpedo_remove_list.append(t)
-                        self.__points.add_points(_torpedo.get_params()["points"])
-                        self.__explosions.add_explosion(Explosion(_bullet.get_position(), 20))
+                for t, _torpedo in self.__torpedo_grid.query(_bullet.get_image()[1]):
+                    if t in self.__removed_torpedos:
+                        continue
+                    if self.__collide(_bullet.get_image()[1], _torpedo.get_image()[1]):
+                        self.__removed_bullets.add(b)
+                        self.__removed_torpedos.add(t)
+                        self.__points.add_points(_torpedo.get_instance_params().points)
+                        self.__explosions.add_explosion(_bullet.get_position(), 20)
                         self.__fades.add_fade(_torpedo.get_image()[0], _torpedo.get_image()[1], 0.5)
                         self.__texts.add_text(_bullet.get_position(), "+{}".
-                                              format(_torpedo.get_params()["points"]))
-        return bullet_remove_list, torpedo_remove_list
+                                              format(_torpedo.get_instance_params().points))
 
     def __check_bullets_crates(self):
 
         """
-        Checks for collisions between bullets and crates and what happens in that case. Returns list of bullets and
-        crates that are to be removed.
+        Checks for collisions between bullets and crates and what happens in that case. Bullets and crates are marked
+        for removal, so the effect of a crate is applied only once.
 
-        :returns: list
+        :returns:
         """
 
-        bullet_remove_list = []
-        crate_remove_list = []
-        bullet_list = self.__bullets.get_bullets()
-        crate_list = self.__crates.get_crates()
-
-        for b, _bullet in enumerate(bullet_list):
+        for b, _bullet in self.__bullet_entries:
+            if b in self.__removed_bullets:
+                continue
             if _bullet.is_friendly():
-                for c, _crate in enumerate(crate_list):
-                    if _bullet.get_image()[1].colliderect(_crate.get_rect()):
-                        bullet_remove_list.append(b)
-                        crate_remove_list.append(c)
+                for c, _crate in self.__crate_grid.query(_bullet.get_image()[1]):
+                    if c in self.__removed_crates:
+                        continue
+                    if self.__collide(_bullet.get_image()[1], _crate.get_rect()):
+                        self.__removed_bullets.add(b)
+                        self.__removed_crates.add(c)
                         self.__points.add_points(_crate.get_points())
-                        self.__explosions.add_explosion(Explosion(_bullet.get_position(), 20))
-
-                        #Defining the effect of each type of crate
-                        if _crate.get_type() == 0:
-                            self.__destroyer.increase_hp(_crate.get_effect_points())
-                            self.__texts.add_text(_bullet.get_position(), "+{}hp".
-                                                  format(_crate.get_effect_points()))
-
-                        if _crate.get_type() == 1:
-                            self.__destroyer.increase_max_hp(_crate.get_effect_points())
-                            self.__texts.add_text(_bullet.get_position(), "+{} max hp".
-                                              format(_crate.get_effect_points()))
-
-                        if _crate.get_type() == 2:
-                            self.__destroyer.reset_hp()
-                            self.__texts.add_text(_bullet.get_position(), "HP refilled!".
-                                                  format(_crate.get_effect_points()))
-
-                        if _crate.get_type() == 3:
-                            for e in self.__enemies.get_enemies():
-                                self.__bullets.add_bullet(Destroyer_bullet_1(self.__timer,
-                                                                             e.get_center_point(), 0))
-                            self.__texts.add_text(_bullet.get_position(), "C'EST LA BOMBE!".
-                                                  format(_crate.get_effect_points()))
-
-                        if _crate.get_type() == 4:
-                            x = _crate.get_position()[0]
-                            y = _crate.get_position()[1]
-
-                            self.__bullets.add_bullet(Mine(self.__timer,(x, y-40), 0))
-                            self.__bullets.add_bullet(Mine(self.__timer,(x+40, y), 0))
-                            self.__bullets.add_bullet(Mine(self.__timer,(x, y+40), 0))
-                            self.__bullets.add_bullet(Mine(self.__timer,(x-40, y), 0))
-
-                            self.__texts.add_text(_bullet.get_position(), "Mines!".
-                                                  format(_crate.get_effect_points()))
+                        self.__explosions.add_explosion(_bullet.get_position(), 20)
+
+                        #The effect of each type of crate is defined in the catalog and handled below
+                        if self.__crate_effects[self.__catalog.get_crate_effect(_crate)](_bullet, _crate):
                             break
 
-                        if _crate.get_type() == 5:
-                            self.__destroyer_options.set_reload_time(100,10)
-                            self.__destroyer_options.set_power_reduction(0,10)
-                            self.__destroyer_options.set_power_refill(500,10)
-                            self.__texts.add_text(_bullet.get_position(), "M..m...machine gun!!!".
-                                                  format(_crate.get_effect_points()))
-                            self.__destroyer_options.set_text_timer(10)
+    def __repair_effect(self, bullet, crate):
+        self.__destroyer.increase_hp(crate.get_effect_points())
+        self.__texts.add_text(bullet.get_position(), "+{}hp".format(crate.get_effect_points()))
 
+    def __armor_effect(self, bullet, crate):
+        self.__destroyer.increase_max_hp(crate.get_effect_points())
+        self.__texts.add_text(bullet.get_position(), "+{} max hp".format(crate.get_effect_points()))
 
-        return bullet_remove_list, crate_remove_list
+    def __life_effect(self, bullet, crate):
+        self.__destroyer.reset_hp()
+        self.__texts.add_text(bullet.get_position(), "HP refilled!")
 
-    def __check_enemies_crates(self):
+    def __bomb_effect(self, bullet, crate):
+        for e in self.__enemies.get_enemies():
+            self.__bullets.add_bullet(Destroyer_bullet_1, e.get_center_point(), 0)
+        self.__texts.add_text(bullet.get_position(), "C'EST LA BOMBE!")
+
+    def __mines_effect(self, bullet, crate):
 
         """
-        Checks for collisions between enemies and crates and what happens in that case. Returns list of crates that
-        are to be removed.
+        Lays four mines around the crate. Returns True, so the bullet does not hit any further crates.
 
-        :returns: list
+        :returns: boolean
         """
-        crates_remove_list = []
-        crate_list = self.__crates.get_crates()
-        for e, _enemy in enumerate(self.__enemies.get_enemies()):
-            for c, _crate in enumerate(crate_list):
-                if _enemy.get_rect().colliderect(_crate.get_rect()):
-                    crates_remove_list.append(c)
-        return crates_remove_list
 
-    def check(self):
+        x = crate.get_position()[0]
+        y = crate.get_position()[1]
+
+        self.__bullets.add_bullet(Mine, (x, y-40), 0)
+        self.__bullets.add_bullet(Mine, (x+40, y), 0)
+        self.__bullets.add_bullet(Mine, (x, y+40), 0)
+        self.__bullets.add_bullet(Mine, (x-40, y), 0)
+
+        self.__texts.add_text(bullet.get_position(), "Mines!")
+        return True
+
+    def __machine_gun_effect(self, bullet, crate):
+        self.__destroyer_options.set_reload_time(100,10)
+        self.__destroyer_options.set_power_reduction(0,10)
+        self.__destroyer_options.set_power_refill(500,10)
+        self.__texts.add_text(bullet.get_position(), "M..m...machine gun!!!")
+        self.__destroyer_options.set_text_timer(10)
+
+    def __check_enemies_crates(self):
 
         """
-        Runs the collision check functions above. The returned lists containing the list indices of the objects that
-        are to be deleted are combined per object type. The lists are then "destilled" down to unique indices in
-        order to prevent double entries leading to problems during removal. Calls the remove methods for each object
-        type with the "destilled" list as argument. Spawns a new enemy in case all enemies are gone. Returns true if
-        the destroyer has been destroyed.
+        Checks for collisions between enemies and crates and marks the crates that are run over for removal.
 
-        :returns: boolean
+        :returns:
         """
 
-        bullet_remove_list_1 = self.__check_bullets()
-        bullet_remove_list_2, enemy_remove_list_1 = self.__check_bullets_enemies()
-        enemy_remove_list_2 = self.__check_enemies()
-        torpedo_remove_list_1 = self.__check_torpedos()
-        bullet_remove_list_3, torpedo_remove_list_2 = self.__check_bullets_torpedos()
-        bullet_remove_list_4, crate_remove_list_1 = self.__check_bullets_crates()
-        crate_remove_list_2 = self.__check_enemies_crates()
+        for c, _crate in self.__crates.get_entries():
+            for e, _enemy in self.__enemy_grid.query(_crate.get_rect()):
+                if self.__collide(_enemy.get_rect(), _crate.get_rect()):
+                    self.__removed_crates.add(c)
 
-        bullet_remove_list = list(set(bullet_remove_list_1 + bullet_remove_list_2 + bullet_remove_list_3 +
-                                      bullet_remove_list_4))
-        enemy_remove_list = list(set(enemy_remove_list_1 + enemy_remove_list_2))
-        torpedo_remove_list = list(set(torpedo_remove_list_1 + torpedo_remove_list_2))
-        crate_remove_list = list(set(crate_remove_list_1 + crate_remove_list_2))
+    def check(self):
 
-        self.__bullets.remove_bullets(bullet_remove_list)
-        self.__enemies.remove_enemies(enemy_remove_list)
-        self.__torpedos.remove_torpedos(torpedo_remove_list)
-        self.__crates.remove_crates(crate_remove_list)
+        """
+        Runs the collision check functions above. The checks refer to the objects by their container handles and mark
+        the objects that are to be deleted in one removal set per object type, so an object flagged by several checks
+        is removed only once. Objects are removed after all checks have run, which keeps the handles valid during the
+        checks. Spawns a new enemy in case all enemies are gone.
+
+        :returns:
+        """
+
+        self.__removed_bullets = set()
+        self.__removed_enemies = set()
+        self.__removed_torpedos = set()
+        self.__removed_crates = set()
+        self.__sunk_count = 0
+        self.__bullet_entries = self.__bullets.get_entries()
+
+        #Broad phase: sorting the collision targets into grids, so every bullet is only tested against the targets
+        #in its vicinity
+        self.__pair_tests = 0
+        self.__enemy_grid.build(self.__enemies.get_entries(), lambda e: e.get_image()[1])
+        self.__torpedo_grid.build(self.__torpedos.get_entries(), lambda t: t.get_image()[1])
+        self.__crate_grid.build(self.__crates.get_entries(), lambda c: c.get_rect())
+
+        self.__check_bullets()
+        self.__check_bullets_enemies()
+        self.__check_enemies()
+        self.__check_torpedos()
+        self.__check_bullets_torpedos()
+        self.__check_bullets_crates()
+        self.__check_enemies_crates()
+
+        self.__bullets.remove_bullets(self.__removed_bullets)
+        self.__enemies.remove_enemies(self.__removed_enemies)
+        self.__torpedos.remove_torpedos(self.__removed_torpedos)
+        self.__crates.remove_crates(self.__removed_crates)
+        self.__bullet_entries = []
 
         if len(self.__enemies.get_enemies()) == 0:
             self.__enemies.add_enemy()
 
         #Add the number of enemies sunk in this round to the total count
-        self.__enemies.inc_sunk_count(len(enemy_remove_list_1))
+        self.__enemies.inc_sunk_count(self.__sunk_count)
+
+    def get_pair_tests(self):
+
+        """
+        Returns the number of collision pair tests done during the last check.
+
+        :returns: integer
+        """
+
+        return self.__pair_tests
 
 
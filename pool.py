@@ -0,0 +1,85 @@
+########################################################################################################################
+# Destroyer - a small boat shooter game.                                                                               #
+# Copyright (C) 2018 by Hendrik Braun                                                                                  #
+#                                                                                                                      #
+# This program is free software: you can redistribute it and/or modify it under the terms of the                       #
+# GNU General Public License as published by the Free Software Foundation, either version 3 of the License, or         #
+# (at your option) any later version.                                                                                  #
+#                                                                                                                      #
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied   #
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more        #
+# details.                                                                                                             #
+#                                                                                                                      #
+# You should have received a copy of the GNU General Public License along with this program.                           #
+# If not, see <http://www.gnu.org/licenses/>.                                                                          #
+########################################################################################################################
+
+
+class Object_pool(object):
+
+    def __init__(self, max_free=256, prefill=None):
+        """
+        Pool of reusable game objects. acquire() hands out a released object of the requested class if there is one
+        and reinitializes it with the given arguments, otherwise a new object is created. Objects go back into the
+        pool with release() once the game is done with them.
+
+        Pooled classes implement the reset/reinit protocol: reinit(*args) takes the constructor arguments and puts the
+        object into the same state as a new one, reset() drops references to images and other objects that should not
+        be kept alive while the object waits in the pool.
+
+        :param max_free : maximum number of released objects kept per class, the rest is left to the garbage collector
+        :param prefill  : optional list of class, number, constructor arguments to create objects for in advance
+        :type max_free  : int
+        :type prefill   : list
+        """
+
+        self.__max_free = max_free
+        self.__free = {}
+        self.__in_use = 0
+        self.__high_water = 0
+        self.__hits = 0
+        self.__misses = 0
+        for cls, count, args in prefill or ():
+            free = self.__free.setdefault(cls, [])
+            for i in range(min(count, max_free)):
+                obj = cls(*args)
+                obj.reset()
+                free.append(obj)
+
+    def acquire(self, cls, *args):
+
+        """
+        Returns an object of class cls initialized with args.
+        """
+
+        free = self.__free.get(cls)
+        if free:
+            obj = free.pop()
+            obj.reinit(*args)
+            self.__hits += 1
+        else:
+            obj = cls(*args)
+            self.__misses += 1
+        self.__in_use += 1
+        if self.__in_use > self.__high_water:
+            self.__high_water = self.__in_use
+        return obj
+
+    def release(self, obj):
+        self.__in_use -= 1
+        free = self.__free.setdefault(type(obj), [])
+        if len(free) < self.__max_free:
+            obj.reset()
+            free.append(obj)
+
+    def get_stats(self):
+
+        """
+        Returns the pool statistics: hits (objects reused), misses (objects created), objects in use, the highest
+        number of objects in use at the same time and the number of objects waiting in the pool.
+
+        :returns: dictionary
+        """
+
+        return {"hits": self.__hits, "misses": self.__misses, "in_use": self.__in_use,
+                "high_water": self.__high_water, "free": sum(len(f) for f in self.__free.values())}
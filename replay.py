@@ -0,0 +1,235 @@
+########################################################################################################################
+# Destroyer - a small boat shooter game.                                                                               #
+# Copyright (C) 2018 by Hendrik Braun                                                                                  #
+#                                                                                                                      #
+# This program is free software: you can redistribute it and/or modify it under the terms of the                       #
+# GNU General Public License as published by the Free Software Foundation, either version 3 of the License, or         #
+# (at your option) any later version.                                                                                  #
+#                                                                                                                      #
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied   #
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more        #
+# details.                                                                                                             #
+#                                                                                                                      #
+# You should have received a copy of the GNU General Public License along with this program.                           #
+# If not, see <http://www.gnu.org/licenses/>.                                                                          #
+########################################################################################################################
+
+import struct
+from array import array
+from bisect import bisect_right
+
+
+class Replay(object):
+
+    __magic = b"DRPL"
+    __version = 3
+    __header_format = struct.Struct("<4sBIHBHHB")
+    __result_format = struct.Struct("<5i")
+    __count_format = struct.Struct("<I")
+    __run_format = struct.Struct("<BH")
+    __keyframe_format = struct.Struct("<II")
+
+    #Header flags
+    __entity_store_flag = 1
+    __result_flag = 2
+
+    def __init__(self, seed, tick_rate=60, init_game_level=0, window_size=(1280, 1024), entity_store=False,
+                 inputs=None):
+        """
+        Recording of a game: the settings and the seed it was started with plus the input bits of every tick (see
+        controllers.encode_input). Since all randomness of the game comes from the seeded random number generator and
+        the simulation runs on a simulated clock, playing back the inputs reproduces the game exactly. Optionally the
+        result of the recorded game is stored, so a playback can be verified. Keyframes, snapshots of the game state
+        taken every few thousand ticks (see Destroyer_simulation.get_state), allow seeking in long replays without
+        playing them back from the start.
+
+        Replays are saved in a compact binary format: a header, the optional result, the inputs run length encoded as
+        pairs of input bits and number of ticks and the keyframes. Each keyframe carries the version of the game state
+        format (see snapshot.load_state). Older replays can still be loaded, without their keyframes.
+
+        :param seed             : seed of the random number generator, 0 to 2**32-1
+        :param tick_rate        : simulation ticks per second
+        :param init_game_level  : the initial game level
+        :param window_size      : window size as x,y
+        :param entity_store     : if the game was run with the entity stores
+        :param inputs           : input bits per tick
+        :type seed              : int
+        :type tick_rate         : int
+        :type init_game_level   : int
+        :type window_size       : set
+        :type entity_store      : bool
+        :type inputs            : list
+        """
+
+        if not 0 <= seed < 1 << 32:
+            raise ValueError("Replay seeds have to be between 0 and 2**32-1, got {}".format(seed))
+        self.__seed = seed
+        self.__tick_rate = tick_rate
+        self.__init_game_level = init_game_level
+        self.__window_size = tuple(window_size)
+        self.__entity_store = entity_store
+        self.__inputs = array("B", inputs or [])
+        self.__result = None
+        self.__keyframe_ticks = []
+        self.__keyframes = []
+
+    def record(self, bits):
+        self.__inputs.append(bits)
+
+    def set_result(self, stats):
+
+        """
+        Stores the result of the recorded game from the statistics of Headless_game.run or of the simulation.
+
+        :param stats    : dictionary with the keys ticks, points, hp, level and enemies
+        :type stats     : dictionary
+
+        :returns:
+        """
+
+        self.__result = tuple(int(stats[k]) for k in ("ticks", "points", "hp", "level", "enemies"))
+
+    def get_result(self):
+
+        """
+        Returns the stored result as a dictionary with the keys ticks, points, hp, level and enemies or None.
+
+        :returns: dictionary
+        """
+
+        if self.__result is None:
+            return None
+        return dict(zip(("ticks", "points", "hp", "level", "enemies"), self.__result))
+
+    def matches(self, stats):
+
+        """
+        Checks the statistics of a playback against the stored result. Returns None if no result is stored.
+
+        :returns: boolean
+        """
+
+        if self.__result is None:
+            return None
+        return self.__result == tuple(int(stats[k]) for k in ("ticks", "points", "hp", "level", "enemies"))
+
+    def add_keyframe(self, tick, state):
+
+        """
+        Stores a snapshot of the game state after the given number of ticks. Keyframes have to be added in order.
+
+        :param tick     : number of ticks simulated when the snapshot was taken
+        :param state    : game state from Destroyer_simulation.get_state
+        :type tick      : int
+        :type state     : bytes
+
+        :returns:
+        """
+
+        if self.__keyframe_ticks and tick <= self.__keyframe_ticks[-1]:
+            raise ValueError("Keyframe at tick {} is not after the last keyframe".format(tick))
+        self.__keyframe_ticks.append(tick)
+        self.__keyframes.append(state)
+
+    def get_keyframe(self, tick):
+
+        """
+        Returns the latest keyframe at or before the given tick as tick, state or None if there is none.
+
+        :returns: set
+        """
+
+        i = bisect_right(self.__keyframe_ticks, tick)
+        if i == 0:
+            return None
+        return self.__keyframe_ticks[i - 1], self.__keyframes[i - 1]
+
+    def get_keyframe_ticks(self):
+        return list(self.__keyframe_ticks)
+
+    def get_inputs(self):
+        return self.__inputs
+
+    def get_seed(self):
+        return self.__seed
+
+    def get_tick_rate(self):
+        return self.__tick_rate
+
+    def get_init_game_level(self):
+        return self.__init_game_level
+
+    def get_window_size(self):
+        return self.__window_size
+
+    def get_entity_store(self):
+        return self.__entity_store
+
+    def __len__(self):
+        return len(self.__inputs)
+
+    def to_bytes(self):
+        flags = self.__entity_store_flag if self.__entity_store else 0
+        if self.__result is not None:
+            flags |= self.__result_flag
+        parts = [self.__header_format.pack(self.__magic, self.__version, self.__seed, self.__tick_rate,
+                                    self.__init_game_level, self.__window_size[0], self.__window_size[1], flags)]
+        if self.__result is not None:
+            parts.append(self.__result_format.pack(*self.__result))
+
+        runs = []
+        for bits in self.__inputs:
+            if runs and runs[-1][0] == bits and runs[-1][1] < 0xffff:
+                runs[-1][1] += 1
+            else:
+                runs.append([bits, 1])
+        parts.append(self.__count_format.pack(len(runs)))
+        parts.extend(self.__run_format.pack(bits, count) for bits, count in runs)
+
+        parts.append(self.__count_format.pack(len(self.__keyframes)))
+        for tick, state in zip(self.__keyframe_ticks, self.__keyframes):
+            parts.append(self.__keyframe_format.pack(tick, len(state)))
+            parts.append(state)
+        return b"".join(parts)
+
+    @classmethod
+    def from_bytes(cls, data):
+        header = cls.__header_format
+        magic, version, seed, tick_rate, level, width, height, flags = header.unpack_from(data, 0)
+        if magic != cls.__magic or not 1 <= version <= cls.__version:
+            raise ValueError("Not a replay or unsupported replay version")
+        offset = header.size
+        result = None
+        if flags & cls.__result_flag:
+            result = cls.__result_format.unpack_from(data, offset)
+            offset += cls.__result_format.size
+        count = cls.__count_format.unpack_from(data, offset)[0]
+        offset += cls.__count_format.size
+
+        inputs = array("B")
+        for i in range(count):
+            bits, ticks = cls.__run_format.unpack_from(data, offset)
+            offset += cls.__run_format.size
+            inputs.extend([bits] * ticks)
+
+        replay = cls(seed, tick_rate, level, (width, height), bool(flags & cls.__entity_store_flag), inputs)
+        replay.__result = result
+        #Version 2 keyframes were saved in a format that is not supported any more
+        if version >= 3:
+            count = cls.__count_format.unpack_from(data, offset)[0]
+            offset += cls.__count_format.size
+            for i in range(count):
+                tick, length = cls.__keyframe_format.unpack_from(data, offset)
+                offset += cls.__keyframe_format.size
+                replay.add_keyframe(tick, bytes(data[offset:offset + length]))
+                offset += length
+        return replay
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            f.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            return cls.from_bytes(f.read())
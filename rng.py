@@ -0,0 +1,43 @@
+########################################################################################################################
+# Destroyer - a small boat shooter game.                                                                               #
+# Copyright (C) 2018 by Hendrik Braun                                                                                  #
+#                                                                                                                      #
+# This program is free software: you can redistribute it and/or modify it under the terms of the                       #
+# GNU General Public License as published by the Free Software Foundation, either version 3 of the License, or         #
+# (at your option) any later version.                                                                                  #
+#                                                                                                                      #
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied   #
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more        #
+# details.                                                                                                             #
+#                                                                                                                      #
+# You should have received a copy of the GNU General Public License along with this program.                           #
+# If not, see <http://www.gnu.org/licenses/>.                                                                          #
+########################################################################################################################
+
+import random
+
+
+_random = random.Random()
+
+
+def get_random():
+
+    """
+    Returns the shared random number generator. All game randomness is drawn from it, so a game can be reproduced
+    by seeding it.
+
+    :returns: random.Random
+    """
+
+    return _random
+
+
+def set_random(rng):
+
+    """
+    Replaces the shared random number generator, e.g. by a random.Random(seed). Has to be done before the game
+    objects are created.
+    """
+
+    global _random
+    _random = rng
@@ -0,0 +1,162 @@
+########################################################################################################################
+# Destroyer - a small boat shooter game.                                                                               #
+# Copyright (C) 2018 by Hendrik Braun                                                                                  #
+#                                                                                                                      #
+# This program is free software: you can redistribute it and/or modify it under the terms of the                       #
+# GNU General Public License as published by the Free Software Foundation, either version 3 of the License, or         #
+# (at your option) any later version.                                                                                  #
+#                                                                                                                      #
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied   #
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more        #
+# details.                                                                                                             #
+#                                                                                                                      #
+# You should have received a copy of the GNU General Public License along with this program.                           #
+# If not, see <http://www.gnu.org/licenses/>.                                                                          #
+########################################################################################################################
+
+from heapq import heappush, heappop, heapify
+
+
+class Scheduler(object):
+
+    def __init__(self, timer):
+        """
+        Central event scheduler on the game time of the timer (see Timer.get_time). Subsystems register callbacks by
+        name and schedule events that call them with the given arguments after a delay. The events are kept in a
+        heap, so each run only touches the events that are due instead of polling a countdown per object and timer.
+        Events refer to callbacks by name and only hold plain arguments, so the pending events can be copied or saved.
+
+        Events scheduled while the scheduler runs are not fired before the next run, even with a delay of 0.
+
+        :param timer    : timer game instance
+        :type timer     : Timer
+        """
+
+        self.__timer = timer
+        self.__callbacks = {}
+        self.__heap = []
+        self.__pending = set()
+        self.__next_id = 0
+        self.__fired = 0
+
+    def register(self, name, callback):
+
+        """
+        Registers a callback under a name. Names have to be unique.
+
+        :param name     : name events refer to the callback by
+        :param callback : function called with the arguments of the event
+        :type name      : str
+        :type callback  : function
+
+        :returns:
+        """
+
+        if name in self.__callbacks:
+            raise ValueError("Callback already registered: {}".format(name))
+        self.__callbacks[name] = callback
+
+    def schedule(self, delay, name, *args):
+
+        """
+        Schedules the callback registered as name to be called with args after delay seconds of game time. Returns
+        the id of the event, which can be used to cancel it.
+
+        :param delay    : delay in seconds, negative delays are treated as 0
+        :param name     : name of a registered callback
+        :type delay     : float
+        :type name      : str
+
+        :returns: int
+        """
+
+        if name not in self.__callbacks:
+            raise KeyError("No callback registered: {}".format(name))
+        event_id = self.__next_id
+        self.__next_id += 1
+        heappush(self.__heap, (self.__timer.get_time() + max(0, delay), event_id, name, args))
+        self.__pending.add(event_id)
+        return event_id
+
+    def cancel(self, event_id):
+
+        """
+        Cancels a pending event. Cancelling an event that has fired or was cancelled already does nothing.
+
+        :returns:
+        """
+
+        self.__pending.discard(event_id)
+        #Cancelled events stay in the heap until they are due, rebuild it if they make up most of it
+        if len(self.__heap) > 64 and len(self.__pending) < len(self.__heap) // 4:
+            self.__heap[:] = [e for e in self.__heap if e[1] in self.__pending]
+            heapify(self.__heap)
+
+    def run(self):
+
+        """
+        Fires all events that are due, in the order of their time and of scheduling. To be called once per tick.
+        Returns the number of events fired.
+
+        :returns: int
+        """
+
+        now = self.__timer.get_time()
+        last_id = self.__next_id
+        heap = self.__heap
+        fired = 0
+        while heap and heap[0][0] <= now and heap[0][1] < last_id:
+            time, event_id, name, args = heappop(heap)
+            if event_id not in self.__pending:
+                continue
+            self.__pending.remove(event_id)
+            self.__callbacks[name](*args)
+            fired += 1
+        self.__fired += fired
+        return fired
+
+    def get_state(self):
+
+        """
+        Returns the pending events as plain data for saving the game state. The callbacks are not part of it, they
+        are registered again by the game objects.
+
+        :returns: dictionary
+        """
+
+        return {
+            "events": [[time, event_id, name, [list(a) if isinstance(a, tuple) else a for a in args]]
+                       for time, event_id, name, args in self.__heap],
+            "pending": sorted(self.__pending),
+            "next_id": self.__next_id,
+            "fired": self.__fired
+        }
+
+    def set_state(self, state):
+
+        """
+        Replaces the pending events with a state returned by get_state. The callbacks of all events have to be
+        registered. Arguments saved as lists, e.g. slot map handles, are restored as tuples.
+
+        :returns:
+        """
+
+        heap = []
+        for time, event_id, name, args in state["events"]:
+            if name not in self.__callbacks:
+                raise ValueError("No callback registered: {}".format(name))
+            heap.append((time, event_id, name, tuple(tuple(a) if isinstance(a, list) else a for a in args)))
+        #The saved list is a heap already, including the cancelled events
+        self.__heap = heap
+        self.__pending = set(state["pending"])
+        self.__next_id = state["next_id"]
+        self.__fired = state["fired"]
+
+    def get_time(self):
+        return self.__timer.get_time()
+
+    def get_fired_count(self):
+        return self.__fired
+
+    def __len__(self):
+        return len(self.__pending)
@@ -0,0 +1,199 @@
+########################################################################################################################
+# Destroyer - a small boat shooter game.                                                                               #
+# Copyright (C) 2018 by Hendrik Braun                                                                                  #
+#                                                                                                                      #
+# This program is free software: you can redistribute it and/or modify it under the terms of the                       #
+# GNU General Public License as published by the Free Software Foundation, either version 3 of the License, or         #
+# (at your option) any later version.                                                                                  #
+#                                                                                                                      #
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied   #
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more        #
+# details.                                                                                                             #
+#                                                                                                                      #
+# You should have received a copy of the GNU General Public License along with this program.                           #
+# If not, see <http://www.gnu.org/licenses/>.                                                                          #
+########################################################################################################################
+
+
+class Slot_map(object):
+
+    def __init__(self):
+        """
+        Container handing out stable handles for its items. A handle is a slot number and a generation count. When an
+        item is removed its slot is reused for later items with the next generation, so a handle of a removed item
+        never refers to another item and is just ignored by get() and remove().
+
+        The items are kept densely packed in a list, which is what values() returns and what is iterated. Removal moves
+        the last item into the gap (swap remove), so it is O(1) but changes the order of the items. Items can also be
+        marked for removal with defer_remove() while the container is being iterated and removed together with
+        flush(); an item marked several times is removed once.
+        """
+
+        self.__items = []
+        self.__handles = []
+        #Per slot: index of the item in the dense list (-1 if the slot is free) and generation
+        self.__dense_index = []
+        self.__generations = []
+        self.__free = []
+        self.__pending = set()
+
+    def add(self, item):
+
+        """
+        Adds an item and returns its handle.
+
+        :returns: set
+        """
+
+        if len(self.__free) > 0:
+            slot = self.__free.pop()
+        else:
+            slot = len(self.__dense_index)
+            self.__dense_index.append(-1)
+            self.__generations.append(0)
+        handle = slot, self.__generations[slot]
+        self.__dense_index[slot] = len(self.__items)
+        self.__items.append(item)
+        self.__handles.append(handle)
+        return handle
+
+    def __index(self, handle):
+        slot, generation = handle
+        if slot < len(self.__generations) and self.__generations[slot] == generation:
+            return self.__dense_index[slot]
+        return -1
+
+    def get(self, handle):
+
+        """
+        Returns the item for a handle or None if it has been removed.
+        """
+
+        index = self.__index(handle)
+        if index < 0:
+            return None
+        return self.__items[index]
+
+    def remove(self, handle):
+
+        """
+        Removes the item for a handle and returns it. Returns None if the item has been removed already.
+        """
+
+        index = self.__index(handle)
+        if index < 0:
+            return None
+        item = self.__items[index]
+
+        last_item = self.__items.pop()
+        last_handle = self.__handles.pop()
+        if index < len(self.__items):
+            self.__items[index] = last_item
+            self.__handles[index] = last_handle
+            self.__dense_index[last_handle[0]] = index
+
+        slot = handle[0]
+        self.__dense_index[slot] = -1
+        self.__generations[slot] += 1
+        self.__free.append(slot)
+        return item
+
+    def defer_remove(self, handle):
+        self.__pending.add(handle)
+
+    def flush(self):
+
+        """
+        Removes all items marked with defer_remove and returns them.
+
+        :returns: list
+        """
+
+        removed = []
+        if len(self.__pending) > 0:
+            pending = self.__pending
+            self.__pending = set()
+            for handle in pending:
+                item = self.remove(handle)
+                if item is not None:
+                    removed.append(item)
+        return removed
+
+    def clear(self):
+        for handle in list(self.__handles):
+            self.remove(handle)
+        self.__pending = set()
+
+    def values(self):
+
+        """
+        Returns the items. The list is owned by the container and must not be modified.
+
+        :returns: list
+        """
+
+        return self.__items
+
+    def handles(self):
+        return self.__handles
+
+    def items(self):
+
+        """
+        Returns the items together with their handles.
+
+        :returns: list of handle, item
+        """
+
+        return list(zip(self.__handles, self.__items))
+
+    def get_state(self, item_state):
+
+        """
+        Returns the state of the container as plain data (lists and numbers) for saving the game state. The items are
+        converted with item_state. Restoring with set_state gives the same handles, slot reuse and item order.
+
+        :param item_state   : function returning the state of an item
+        :type item_state    : function
+
+        :returns: dictionary
+        """
+
+        return {
+            "items": [item_state(item) for item in self.__items],
+            "handles": [list(handle) for handle in self.__handles],
+            "generations": list(self.__generations),
+            "free": list(self.__free)
+        }
+
+    def set_state(self, state, make_item):
+
+        """
+        Replaces the content with a state returned by get_state. The items are created from their states with
+        make_item.
+
+        :param state        : state from get_state
+        :param make_item    : function returning an item for an item state
+        :type state         : dictionary
+        :type make_item     : function
+
+        :returns:
+        """
+
+        self.__items = [make_item(item) for item in state["items"]]
+        self.__handles = [(int(slot), int(generation)) for slot, generation in state["handles"]]
+        self.__generations = [int(generation) for generation in state["generations"]]
+        self.__free = [int(slot) for slot in state["free"]]
+        self.__dense_index = [-1] * len(self.__generations)
+        for index, handle in enumerate(self.__handles):
+            self.__dense_index[handle[0]] = index
+        self.__pending = set()
+
+    def __contains__(self, handle):
+        return self.__index(handle) >= 0
+
+    def __iter__(self):
+        return iter(self.__items)
+
+    def __len__(self):
+        return len(self.__items)
@@ -0,0 +1,66 @@
+########################################################################################################################
+# Destroyer - a small boat shooter game.                                                                               #
+# Copyright (C) 2018 by Hendrik Braun                                                                                  #
+#                                                                                                                      #
+# This program is free software: you can redistribute it and/or modify it under the terms of the                       #
+# GNU General Public License as published by the Free Software Foundation, either version 3 of the License, or         #
+# (at your option) any later version.                                                                                  #
+#                                                                                                                      #
+# This program is distributed in the hope that it will be useful, but WITHOUT ANY WARRANTY; without even the implied   #
+# warranty of MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License for more        #
+# details.                                                                                                             #
+#                                                                                                                      #
+# You should have received a copy of the GNU General Public License along with this program.                           #
+# If not, see <http://www.gnu.org/licenses/>.                                                                          #
+########################################################################################################################
+
+import json
+import zlib
+
+
+#Version of the layout of the saved game state. To be increased whenever a get_state method of the game objects
+#changes what it saves, so snapshots of other versions are rejected instead of being restored inconsistently.
+STATE_VERSION = 3
+
+_format_name = "destroyer-state"
+
+
+def dump_state(state):
+
+    """
+    Saves a game state given as plain data (dictionaries, lists, strings, numbers, booleans and None) into a zlib
+    compressed JSON document stamped with the state format version. Loading it does not run any code, so snapshots
+    from untrusted sources, e.g. replays sent in from the field, can be inspected and restored safely.
+
+    :param state    : game state, e.g. from Destroyer_simulation.get_state
+    :type state     : dictionary
+
+    :returns: bytes
+    """
+
+    document = {"format": _format_name, "version": STATE_VERSION, "state": state}
+    return zlib.compress(json.dumps(document, separators=(",", ":")).encode("utf-8"))
+
+
+def load_state(data):
+
+    """
+    Returns the game state saved with dump_state. Raises ValueError if the data is not a game state snapshot or has
+    been saved with another state format version.
+
+    :param data : snapshot from dump_state
+    :type data  : bytes
+
+    :returns: dictionary
+    """
+
+    try:
+        document = json.loads(zlib.decompress(data).decode("utf-8"))
+    except (zlib.error, ValueError, UnicodeDecodeError):
+        raise ValueError("Not a game state snapshot")
+    if not isinstance(document, dict) or document.get("format") != _format_name:
+        raise ValueError("Not a game state snapshot")
+    if document.get("version") != STATE_VERSION:
+        raise ValueError("Unsupported game state version {}, expected {}".format(document.get("version"),
+                                                                                 STATE_VERSION))
+    return document["state"]
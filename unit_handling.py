@@ -15,37 +15,259 @@
 ########################################################################################################################
 
 from units import *
+from slot_map import Slot_map
+from pool import Object_pool
+from bisect import bisect_right
+from catalog import get_catalog
+from rng import get_random
+
+
+class Lane_index(object):
+
+    def __init__(self, low, high, margin=40):
+        """
+        Occupancy index of the horizontal lanes the ships travel in. A ship at y with a height of h blocks the y
+        positions from margin above y to margin below y + h. The free y positions between low and high are kept as a
+        sorted list of half open integer intervals, which is recomputed when a ship is added or removed. Spawn
+        positions are sampled uniformly from the free positions inside the allowed bands with a binary search over the
+        cumulative interval lengths.
+
+        :param low      : lowest y position ships can spawn at
+        :param high     : y position below the lowest spawn position
+        :param margin   : minimum vertical distance between ships
+        :type low       : int
+        :type high      : int
+        :type margin    : int
+        """
+
+        self.__low = int(low)
+        self.__high = int(high)
+        self.__margin = margin
+        self.__blocked = {}
+        self.__free = [(self.__low, self.__high)]
+        self.__samplers = {}
+
+    def block(self, key, y, height):
+
+        """
+        Blocks the lane of a ship. The key is used to release it again.
+        """
+
+        self.__blocked[key] = (int(y) - self.__margin + 1, int(y) + int(height) + self.__margin)
+        self.__update()
+
+    def release(self, key):
+        if self.__blocked.pop(key, None) is not None:
+            self.__update()
+
+    def __update(self):
+        free = []
+        start = self.__low
+        for low, high in sorted(self.__blocked.values()):
+            if low > start:
+                free.append((start, min(low, self.__high)))
+            start = max(start, high)
+            if start >= self.__high:
+                break
+        if start < self.__high:
+            free.append((start, self.__high))
+        self.__free = free
+        self.__samplers = {}
+
+    def __build_sampler(self, bands):
+        intervals = []
+        cumulative = []
+        total = 0
+        for band_low, band_high in bands:
+            for low, high in self.__free:
+                low, high = max(low, band_low), min(high, band_high)
+                if low < high:
+                    total += high - low
+                    intervals.append(low)
+                    cumulative.append(total)
+        return intervals, cumulative
+
+    def sample(self, bands):
+
+        """
+        Returns a random free y position inside the bands or None if there is none.
+
+        :param bands    : allowed y ranges as half open low, high intervals
+        :type bands     : set of set
+
+        :returns: integer
+        """
+
+        bands = tuple((int(low), int(high)) for low, high in bands)
+        sampler = self.__samplers.get(bands)
+        if sampler is None:
+            sampler = self.__build_sampler(bands)
+            self.__samplers[bands] = sampler
+        intervals, cumulative = sampler
+        if len(cumulative) == 0:
+            return None
+        r = get_random().randrange(cumulative[-1])
+        i = bisect_right(cumulative, r)
+        return intervals[i] + r - (cumulative[i - 1] if i > 0 else 0)
+
+    def get_free(self):
+        return self.__free
+
+    def get_state(self):
+        return {"blocked": sorted([list(key), low, high] for key, (low, high) in self.__blocked.items())}
+
+    def set_state(self, state):
+
+        """
+        Restores the blocked lanes from a state returned by get_state. The keys are saved as lists and restored as
+        tuples, as the slot map handles they are.
+        """
+
+        self.__blocked = dict((tuple(key), (low, high)) for key, low, high in state["blocked"])
+        self.__update()
+
+
+class Occupancy_grid(object):
+
+    def __init__(self, area, cell_size=32):
+        """
+        Coarse occupancy grid for placing crates. The area is divided into square cells, a cell is blocked while at
+        least one registered rectangle touches it. Rectangles are registered by key and updated incrementally as the
+        objects move, only the cells of rectangles whose cell range has changed are touched. The free cells are kept
+        in a list with a position index, so a random free cell can be picked in constant time.
+
+        :param area         : area covered by the grid as x, y, width, height. Only whole cells are used.
+        :param cell_size    : width and height of the cells in pixels
+        :type area          : set
+        :type cell_size     : int
+        """
+
+        self.__x = int(area[0])
+        self.__y = int(area[1])
+        self.__cell_size = cell_size
+        self.__columns = max(0, int(area[2]) // cell_size)
+        self.__rows = max(0, int(area[3]) // cell_size)
+        cell_count = self.__columns * self.__rows
+        self.__counts = [0] * cell_count
+        self.__free = list(range(cell_count))
+        self.__free_index = list(range(cell_count))
+        self.__ranges = {}
+
+    def __cell_range(self, rect):
+        size = self.__cell_size
+        x0 = max(0, (int(rect[0]) - self.__x) // size)
+        x1 = min(self.__columns - 1, (int(rect[0] + rect[2]) - 1 - self.__x) // size)
+        y0 = max(0, (int(rect[1]) - self.__y) // size)
+        y1 = min(self.__rows - 1, (int(rect[1] + rect[3]) - 1 - self.__y) // size)
+        if x0 > x1 or y0 > y1:
+            return None
+        return x0, x1, y0, y1
+
+    def __change(self, cell_range, delta):
+        x0, x1, y0, y1 = cell_range
+        for row in range(y0, y1 + 1):
+            for cell in range(row * self.__columns + x0, row * self.__columns + x1 + 1):
+                count = self.__counts[cell] + delta
+                self.__counts[cell] = count
+                if count == 1 and delta > 0:
+                    #Swap removing the cell from the free list
+                    i = self.__free_index[cell]
+                    last = self.__free.pop()
+                    if last != cell:
+                        self.__free[i] = last
+                        self.__free_index[last] = i
+                    self.__free_index[cell] = -1
+                elif count == 0:
+                    self.__free_index[cell] = len(self.__free)
+                    self.__free.append(cell)
+
+    def block(self, rect):
+
+        """
+        Permanently blocks the cells touched by rect, e.g. for the destroyer.
+        """
+
+        cell_range = self.__cell_range(rect)
+        if cell_range is not None:
+            self.__change(cell_range, 1)
+
+    def set_rect(self, key, rect):
+        cell_range = self.__cell_range(rect)
+        old_range = self.__ranges.get(key)
+        if cell_range == old_range:
+            return
+        if old_range is not None:
+            self.__change(old_range, -1)
+        if cell_range is not None:
+            self.__change(cell_range, 1)
+        self.__ranges[key] = cell_range
+
+    def remove(self, key):
+        old_range = self.__ranges.pop(key, None)
+        if old_range is not None:
+            self.__change(old_range, -1)
+
+    def pick(self):
+
+        """
+        Returns the x, y position of the top left corner of a random free cell or None if all cells are blocked.
+
+        :returns: set
+        """
+
+        if len(self.__free) == 0:
+            return None
+        cell = self.__free[get_random().randrange(len(self.__free))]
+        return (self.__x + (cell % self.__columns) * self.__cell_size,
+                self.__y + (cell // self.__columns) * self.__cell_size)
+
+    def get_cell_size(self):
+        return self.__cell_size
+
+    def get_state(self):
+
+        """
+        Returns the cell counts, the free list in its current order and the registered rectangles as plain data for
+        saving the game state. The order of the free list decides which cell pick returns, so it is saved as well.
+        Keys are saved as lists and restored as tuples, as the slot map handles they are.
+
+        :returns: dictionary
+        """
+
+        return {
+            "counts": list(self.__counts),
+            "free": list(self.__free),
+            "ranges": [[list(key), list(cell_range) if cell_range is not None else None]
+                       for key, cell_range in self.__ranges.items()]
+        }
+
+    def set_state(self, state):
+        if len(state["counts"]) != len(self.__counts):
+            raise ValueError("Occupancy grid state does not match the grid size")
+        self.__counts = list(state["counts"])
+        self.__free = list(state["free"])
+        self.__free_index = [-1] * len(self.__counts)
+        for i, cell in enumerate(self.__free):
+            self.__free_index[cell] = i
+        self.__ranges = dict((tuple(key), tuple(cell_range) if cell_range is not None else None)
+                             for key, cell_range in state["ranges"])
+
+    def get_free_count(self):
+        return len(self.__free)
+
 
 class Enemies():
     """
-    Ship_ratios is specified of number ranges between 1 and 100 for the different ship types. If ship type 1 is
-    to have a 70% chance of appearing and it is first in the list, then the range should be defined as (1,70)
-    and if ship type 2 then is supposed to have a 30% chance of appearing, the range has to be specified as
-    (70,100). The ship type class that will be initiated based on the randomized number is defined in add_enemy
-
-    Ship type 0: Submarine
-    Ship type 1: Gun ship
-    Ship type 2: Torpedo boat
-    Ship type 3: Fregatte
+    The ship types and their chance of appearing per game level are defined in the unit catalog
+    (./media/catalog.json, see Unit_catalog).
     """
 
-    __ship_ratios_per_level = {
-        0:[(1,30), (30,70), (70,100), (100,101)],
-        1:[(1,30), (30,40), (40,100), (100,101)],
-        2:[(1,30), (30,45), (45,100), (100,101)],
-        3:[(0,1), (1,45), (45,100), (100,101)],
-        4:[(1,30), (30,45), (45,100), (100,101)],
-        5:[(1,30), (30,50), (50,100), (100,101)],
-        6:[(1,30), (30,50), (50,100), (100,101)],
-        7:[(1,30), (30,60), (60,100), (100,101)],
-        8:[(1,30), (30,60), (60,100), (100,101)],
-        9:[(1,30), (30,60), (60,100), (100,101)]
-    }
-
-    def __init__(self, timer, wait_time_range, max_enemies, torpedos, crates, bullets,  game_level, window_size,
-                 top_distance, max_torpedos=1):
+    def __init__(self, timer, scheduler, wait_time_range, max_enemies, torpedos, crates, bullets,  game_level,
+                 window_size, top_distance, max_torpedos=1, store=None, catalog=None):
         """
-        Class for handling all enemy ship objects.
+        Class for handling all enemy ship objects. The next spawn and the shots of the ship guns are events of the
+        scheduler.
+        :param scheduler        : game instance of the Scheduler class
         :param wait_time_range  : range of minimum wait time to maximum wait time for spawn of next enemy
         :param max_enemies      : maximum numbers of enemies at once on the screen
         :param torpedos         : game instance of Torpedos class
@@ -55,6 +277,9 @@ class Enemies():
         :param window_size      : window size in x,y
         :param top_distance     : minimum y position for spwaning enemies in order to avoid HUD
         :param max_torpedos     : maximum number of torpedos on the screen at the same time
+        :param store            : optional entity store, the enemies are attached to it and moved by it
+        :param catalog          : unit catalog for ship, torpedo and gun types, defaults to the shared catalog
+        :type scheduler         : Scheduler
         :type wait_time_range   : set
         :type max_enemies       : int
         :type torpedos          : Torpedos
@@ -63,137 +288,141 @@ class Enemies():
         :type window_size       : list
         :type top_distance      : int
         :type max_torpedos      : int
+        :type store             : Entity_store
+        :type catalog           : Unit_catalog
 
 
         :returns:
         """
         self.__timer = timer
-        self.__enemy_list = []
+        self.__scheduler = scheduler
+        self.__scheduler.register("enemies.spawn", self.__spawn_due)
+        self.__scheduler.register("enemies.fire", self.__fire)
+        self.__enemy_list = Slot_map()
         self.__wait_time_range = wait_time_range
         self.__max_enemies = max_enemies
-        self.__next_enemy_in = 0
+        self.__spawn_event = None
+        self.__is_spawn_due = False
         self.__window_size = window_size
         self.__game_level = game_level
-        self.__ship_ratios = self.__ship_ratios_per_level[self.__game_level.get_level()]
+        self.__catalog = catalog if catalog is not None else get_catalog()
         self.__torpedos = torpedos
         self.__bullets = bullets
         self.__crates = crates
         self.__top_distance = top_distance
         self.__max_torpedos = max_torpedos
+        self.__store = store
         self.__total_enemies = 0
         self.__sunk_enemies_count = 0
-        self.__total_time = 0
-        self.__unit_type_count = {i:0 for i in range(len(self.__ship_ratios[0]))}
+        self.__lanes = Lane_index(self.__top_distance + 10, self.__window_size[1] - 10)
+        self.__occupancy = crates.get_grid()
+        self.__full_screen_count = 0
 
     def add_enemy(self):
         """
-        Method for evaluating if an enemy is to be added, based on the actual number and the time passed since the
-        last spawn.
+        Method for evaluating if an enemy is to be added, based on the actual number and the spawn event scheduled
+        at the last spawn. If there are no enemies, one is added right away. The y position of a new ship is taken
+        from the free lanes of the lane index. If there is no free lane, no ship is spawned, the full screen is
+        counted (see get_full_screen_count) and the spawn is tried again on the next call.
 
         :returns:
         """
 
-        def check_y_position(y):
-            """
-            Method to check if any other enemy is on the same position or within a frame of 80 pixels. If so, the
-            position is regarded as bad and a new ship will not be spawned within that range.
-
-            :returns: boolean
-            """
-
-            for e in self.__enemy_list:
-                rect = e.get_extent()
-                if rect[1] - 40 < y < rect[3] + 40:
-                    return True
-            return False
-
-        def build_my_ship(ship_type, speed, origin, direction):
-            if ship_type == 0:
-                ship = Submarine(speed, origin, direction)
-            elif ship_type == 1 :
-                ship = Gunboat(speed, origin, direction)
-            elif ship_type == 2 :
-                ship = Torpedoboat(speed, origin, direction)
-            elif ship_type == 3:
-                ship = Fregatte(speed, origin, direction)
-            return ship
-
         def make_ship():
 
             """
-            Function to randomize a ship and its params based on the ratios specified in __ship_ratios.
+            Function to randomize a ship and its params based on the weights of the game level in the unit catalog.
             """
 
-            ship_type = randrange(1,100,1)
-            ship_type_count = len(self.__ship_ratios)
-            self.__ship_ratios = self.__ship_ratios_per_level[self.__game_level.get_level()]
-            for i in range(ship_type_count):
-                if ship_type in range(self.__ship_ratios[i][0], self.__ship_ratios[i][1]):
-                    ship_type = i
-                    break
-
-            #Define ship types
-            if ship_type == 0:
-                param_dict = Submarine.get_params()
-            elif ship_type == 1:
-                param_dict = Gunboat.get_params()
-            elif ship_type == 2:
-                param_dict = Torpedoboat.get_params()
-            elif ship_type == 3:
-                param_dict = Fregatte.get_params()
-
-            speed = randrange(param_dict["min_speed"], param_dict["max_speed"], 1)
-
-            if param_dict["spawn_method"] == 1:
-                spawn_origin = param_dict["fixed_spawn"][0]
-                x = spawn_origin[0] if spawn_origin[0] is not -1 else self.__window_size[2]
-                y = spawn_origin[1] if spawn_origin[1] is not -1 else self.__window_size[3]
-                direction = param_dict["fixed_spawn"][1]
-                return build_my_ship(ship_type, speed, (x,y), direction)
+            ship_class = self.__catalog.sample_ship(self.__game_level.get_level())
+            params = ship_class.get_params()
 
-            good_y = False
+            speed = get_random().randrange(params.min_speed, params.max_speed, 1)
 
-            while not good_y:
-                y_rand = randrange(0,2,1)
-                if y_rand == 0:
-                    y = randrange(self.__top_distance + 10, self.__window_size[1]/2-param_dict["min_dist"])
-                if y_rand == 1:
-                    y = randrange(self.__window_size[1]/2+param_dict["min_dist"], self.__window_size[1]-10)
+            if params.spawn_method == 1:
+                spawn_origin = params.fixed_spawn[0]
+                x = spawn_origin[0] if spawn_origin[0] is not -1 else self.__window_size[2]
+                y = spawn_origin[1] if spawn_origin[1] is not -1 else self.__window_size[3]
+                direction = params.fixed_spawn[1]
+                return ship_class(speed, (x,y), direction)
 
-                if not check_y_position(y):
-                    good_y = True
+            center = self.__window_size[1]//2
+            y = self.__lanes.sample(((self.__top_distance + 10, center - params.min_dist),
+                                     (center + params.min_dist, self.__window_size[1] - 10)))
+            if y is None:
+                return None
 
-            dir_rand = randrange(0,2,1)
+            dir_rand = get_random().randrange(0,2,1)
             direction = 1 if dir_rand == 0 else 3
             if direction == 1:
                 origin = -150,y
             if direction == 3:
                 origin = self.__window_size[0], y
 
-            return build_my_ship(ship_type, speed, origin, direction)
-
-        self.__total_time += self.__timer.get_delta()
-        if len(self.__enemy_list) == 0:
-            self.__enemy_list.append(make_ship())
+            return ship_class(speed, origin, direction)
+
+        def spawn():
+            ship = make_ship()
+            if ship is None:
+                self.__full_screen_count += 1
+                return False
+            if self.__store is not None:
+                ship.attach(self.__store)
+            handle = self.__enemy_list.add(ship)
+            self.__occupancy.set_rect(handle, ship.get_rect())
+            if ship.get_direction() in (1, 3):
+                self.__lanes.block(handle, ship.get_position()[1], ship.get_rect()[3])
+            wait = ship.next_shot()
+            if wait is not None:
+                self.__scheduler.schedule(wait, "enemies.fire", handle)
+            return True
+
+        if len(self.__enemy_list) == 0 or (self.__is_spawn_due and len(self.__enemy_list) < self.__max_enemies):
+            if not spawn():
+                return
             self.__total_enemies += 1
-            self.__next_enemy_in = randrange(self.__wait_time_range[0], self.__wait_time_range[1], 1)
-            self.__total_time = 0
-        else:
-            if len(self.__enemy_list) < self.__max_enemies:
-                if self.__total_time > self.__next_enemy_in:
-                    self.__enemy_list.append(make_ship())
-                    self.__total_enemies += 1
-                    self.__next_enemy_in = randrange(self.__wait_time_range[0], self.__wait_time_range[1], 1)
-                    self.__total_time = 0
+            if self.__spawn_event is not None:
+                self.__scheduler.cancel(self.__spawn_event)
+            self.__is_spawn_due = False
+            wait = get_random().randrange(self.__wait_time_range[0], self.__wait_time_range[1], 1)
+            self.__spawn_event = self.__scheduler.schedule(wait, "enemies.spawn")
+
+    def __spawn_due(self):
+        self.__spawn_event = None
+        self.__is_spawn_due = True
+
+    def __fire(self, handle):
+
+        """
+        Fires the gun of the ship with the handle towards the destroyer and schedules its next shot. Ships that have
+        been removed in the meantime are ignored.
+        """
+
+        e = self.__enemy_list.get(handle)
+        if e is None:
+            return
+        bullet_class = self.__catalog.get_gun_class(e.get_gun_type())
+        if bullet_class is not None:
+            bearing = get_bearing(e.get_center_point(), (self.__window_size[0]/2, self.__window_size[1]/2))[0]
+            self.__bullets.add_bullet(bullet_class, e.get_center_point(), bearing)
+        wait = e.next_shot()
+        if wait is not None:
+            self.__scheduler.schedule(wait, "enemies.fire", handle)
 
     def move(self):
 
         """
-        Move all ships.
+        Move all ships. Ships attached to the entity store are moved with one vectorized step. The crate occupancy
+        grid follows the ships, it is only touched when a ship enters new cells.
         """
 
-        for e in self.__enemy_list:
-            e.move(self.__timer.get_delta(), self.__game_level.get_level())
+        if self.__store is not None:
+            self.__store.step(self.__timer.get_delta(), self.__game_level.get_level())
+        else:
+            for e in self.__enemy_list:
+                e.move(self.__timer.get_delta(), self.__game_level.get_level())
+        for h, e in self.__enemy_list.items():
+            self.__occupancy.set_rect(h, e.get_rect())
 
     def shoot(self):
 
@@ -201,7 +430,7 @@ class Enemies():
         Method for making the existing ships shoot torpedos under defined cicumstances, being that they have are on
         or have passed the center of the screen, they are equipped with a torpedo (which is defined in the parameter
         dictionary in the ship class) and there are less than the allowed maximum amount of torpedos on the screen at
-        this point in time. If there are more, the ship looses it's torpedo.
+        this point in time. If there are more, the ship looses it's torpedo. The guns are fired by scheduled events.
 
         :returns:
         """
@@ -219,18 +448,7 @@ class Enemies():
                             else:
                                 direction = 0
 
-                            torpedo_type = e.get_params()["torpedo_type"]
-
-                            if torpedo_type == 0:
-                                self.__torpedos.add_torpedo(Torpedo_0(Torpedo_0.get_params()["min_speed"],
-                                                                      center_point,direction))
-                            if torpedo_type == 1:
-                                self.__torpedos.add_torpedo(Torpedo_1(Torpedo_1.get_params()["min_speed"],
-                                                                      center_point,direction))
-                            if torpedo_type == 2:
-                                self.__torpedos.add_torpedo(Torpedo_2(Torpedo_2.get_params()["min_speed"],
-                                                                      center_point, direction))
-
+                            self.__add_torpedo(e, center_point, direction)
                             e.set_torpedo_shot()
 
                 if e.get_direction() == 3:
@@ -244,46 +462,47 @@ class Enemies():
                             else:
                                 direction = 0
 
-                            torpedo_type = e.get_params()["torpedo_type"]
-                            if torpedo_type == 0:
-                                self.__torpedos.add_torpedo(Torpedo_0(Torpedo_0.get_params()["min_speed"],
-                                                                      center_point,direction))
-                            if torpedo_type == 1:
-                                self.__torpedos.add_torpedo(Torpedo_1(Torpedo_1.get_params()["min_speed"],
-                                                                      center_point,direction))
+                            self.__add_torpedo(e, center_point, direction)
                             e.set_torpedo_shot()
 
-            if e.shoot(self.__timer.get_delta()):
-                if e.get_gun_type() == 0:
-                    bearing = get_bearing(e.get_center_point(), (self.__window_size[0]/2, self.__window_size[1]/2))[0]
-                    self.__bullets.add_bullet(Standard_enemy_bullet(self.__timer, e.get_center_point(), bearing))
-
-                elif e.get_gun_type() == 1:
-                    try:
-                        bearing = get_bearing(e.get_center_point(), (self.__window_size[0]/2, self.__window_size[1]/2))[0]
-                        self.__bullets.add_bullet(Fregatte_bullet(self.__timer, e.get_center_point(), bearing))
-                    except:
-                        pass
+    def __add_torpedo(self, ship, origin, direction):
+        torpedo_class = self.__catalog.get_torpedo_class(ship.get_instance_params().torpedo_type)
+        if torpedo_class is not None:
+            self.__torpedos.add_torpedo(torpedo_class(torpedo_class.get_params().min_speed, origin, direction))
 
 
     def get_enemies(self):
-        return self.__enemy_list
+        return self.__enemy_list.values()
 
-    def remove_enemies(self, indices):
+    def get_entries(self):
+        return self.__enemy_list.items()
+
+    def remove_enemies(self, handles):
 
         """
-        Removes the enemies at given indices. Called from the Destroyer_logic class game instance.
-        indices (list of int) : indices of the enemies that are to be deleted.
+        Removes the enemies with the given handles. Called from the Destroyer_logic class game instance. Handles of
+        enemies that have been removed already are ignored.
+        handles (iterable of handles) : handles of the enemies that are to be deleted, see get_entries.
 
         :returns:
         """
 
-        if len(indices) > 0:
-            new_list = []
-            for e,v in enumerate(self.__enemy_list):
-                if not e in indices:
-                    new_list.append(v)
-            self.__enemy_list = new_list
+        for h in handles:
+            enemy = self.__enemy_list.remove(h)
+            if enemy is not None:
+                enemy.detach()
+                self.__lanes.release(h)
+                self.__occupancy.remove(h)
+
+    def get_full_screen_count(self):
+
+        """
+        Returns how often a ship could not be spawned because all lanes were taken.
+
+        :returns: integer
+        """
+
+        return self.__full_screen_count
 
     def set_max_enemies(self, count):
         self.__max_enemies = count
@@ -303,69 +522,182 @@ class Enemies():
     def set_wait_time_range(self, range):
         self.__wait_time_range = range
 
+    def get_state(self):
+
+        """
+        Returns the ships, the spawn state, the counters and the lanes as plain data for saving the game state. The
+        pending gun shots are events of the scheduler and saved with it.
+
+        :returns: dictionary
+        """
+
+        return {
+            "enemies": self.__enemy_list.get_state(Enemy.get_state),
+            "spawn_event": self.__spawn_event,
+            "is_spawn_due": self.__is_spawn_due,
+            "wait_time_range": list(self.__wait_time_range),
+            "max_enemies": self.__max_enemies,
+            "total_enemies": self.__total_enemies,
+            "sunk_enemies_count": self.__sunk_enemies_count,
+            "full_screen_count": self.__full_screen_count,
+            "lanes": self.__lanes.get_state()
+        }
+
+    def set_state(self, state):
+
+        """
+        Replaces the ships and the spawn state with a state returned by get_state. The crate occupancy grid is not
+        updated, it is restored together with the crates (see Crates.set_state).
+
+        :returns:
+        """
+
+        for e in self.__enemy_list:
+            e.detach()
+        self.__enemy_list.set_state(state["enemies"], lambda s: Enemy.from_state(s, self.__store))
+        self.__spawn_event = state["spawn_event"]
+        self.__is_spawn_due = state["is_spawn_due"]
+        self.__wait_time_range = tuple(state["wait_time_range"])
+        self.__max_enemies = state["max_enemies"]
+        self.__total_enemies = state["total_enemies"]
+        self.__sunk_enemies_count = state["sunk_enemies_count"]
+        self.__full_screen_count = state["full_screen_count"]
+        self.__lanes.set_state(state["lanes"])
+
 class Torpedos(object):
-    def __init__(self, timer):
-        self.__torpedo_list = []
+    def __init__(self, timer, store=None):
+        """
+        Class holding all torpedos in the game. If an Entity_store is given, the torpedos are attached to it and moved
+        by it.
+        """
+        self.__torpedo_list = Slot_map()
         self.__timer = timer
+        self.__store = store
 
     def get_torpedos(self):
-        return self.__torpedo_list
+        return self.__torpedo_list.values()
+
+    def get_entries(self):
+        return self.__torpedo_list.items()
 
     def add_torpedo(self, torpedo):
-        self.__torpedo_list.append(torpedo)
+        if self.__store is not None:
+            torpedo.attach(self.__store)
+        self.__torpedo_list.add(torpedo)
 
     def move(self):
+        if self.__store is not None:
+            self.__store.step(self.__timer.get_delta())
+            return
         for t in self.__torpedo_list:
             t.move(self.__timer.get_delta())
 
-    def remove_torpedos(self, indices):
-        if len(indices) > 0:
-            new_list = []
-            for e,v in enumerate(self.__torpedo_list):
-                if not e in indices:
-                    new_list.append(v)
-            self.__torpedo_list = new_list
+    def remove_torpedos(self, handles):
+        for h in handles:
+            torpedo = self.__torpedo_list.remove(h)
+            if torpedo is not None:
+                torpedo.detach()
 
     def count(self):
         return len(self.__torpedo_list)
 
+    def get_state(self):
+        return {"torpedos": self.__torpedo_list.get_state(Enemy.get_state)}
+
+    def set_state(self, state):
+        for t in self.__torpedo_list:
+            t.detach()
+        self.__torpedo_list.set_state(state["torpedos"], lambda s: Enemy.from_state(s, self.__store))
+
 
 class Bullets(object):
 
-    def __init__(self, timer, origin, window_size):
+    def __init__(self, timer, origin, window_size, trails=None, store=None, pool_size=256):
+        """
+        Class holding all bullets in the game. If a Trails instance is given, the trail segments of moving bullets are
+        emitted into it. If an Entity_store is given, the bullets are attached to it, moved with one vectorized step
+        and bullets that left the window are dropped right away. Removed bullets are reused through an Object_pool,
+        which keeps up to pool_size bullets per bullet class.
+        """
         self.__timer = timer
         self.__origin = origin
         self.__window_size = window_size
-        self.__bullet_list = []
+        self.__trails = trails
+        self.__store = store
+        self.__pool = Object_pool(pool_size)
+        self.__bullet_list = Slot_map()
 
-    def add_bullet(self, bullet):
-        self.__bullet_list.append(bullet)
+    def add_bullet(self, bullet_class, origin, direction):
 
-    def move(self):
-        pop_list = []
-        for i in range(len(self.__bullet_list)):
-            if self.__bullet_list[i].move() == -1:
-                pop_list.append(i)
+        """
+        Adds a bullet of the given Bullet subclass, fired from origin in direction (bearing).
+        """
 
-        for p in pop_list:
-            self.__bullet_list.pop(p)
+        bullet = self.__pool.acquire(bullet_class, self.__timer, origin, direction)
+        if self.__store is not None:
+            bullet.attach(self.__store)
+        self.__bullet_list.add(bullet)
+
+    def __release(self, bullet):
+        bullet.detach()
+        self.__pool.release(bullet)
+
+    def move(self):
+        if self.__store is not None:
+            self.__move_stored()
+            return
+
+        #Bullets that left the window are removed by the collision checks (see Destroyer_logic)
+        for b in self.__bullet_list:
+            b.move()
+            if self.__trails is not None:
+                trail = b.get_trail()
+                if trail is not None:
+                    self.__trails.emit(*trail)
+
+    def __move_stored(self):
+        self.__store.step(self.__timer.get_delta())
+        outside = self.__store.outside(0, 0, self.__window_size[0], self.__window_size[1])
+        if len(outside) > 0:
+            outside = set(outside)
+            for h, b in self.__bullet_list.items():
+                if b.get_slot() in outside:
+                    self.__bullet_list.defer_remove(h)
+            for b in self.__bullet_list.flush():
+                self.__release(b)
+
+        if self.__trails is not None:
+            for b in self.__bullet_list:
+                if b.has_trail():
+                    b.move()
+                    self.__trails.emit(*b.get_trail())
 
     def get_bullets(self):
-        return self.__bullet_list
+        return self.__bullet_list.values()
 
-    def remove_bullets(self, indices):
-        if len(indices)>0:
-            new_list = []
-            for b,v in enumerate(self.__bullet_list):
-                if not b in indices:
-                    new_list.append(v)
-            self.__bullet_list = new_list
+    def get_entries(self):
+        return self.__bullet_list.items()
 
+    def remove_bullets(self, handles):
+        for h in handles:
+            bullet = self.__bullet_list.remove(h)
+            if bullet is not None:
+                self.__release(bullet)
 
-class Crates(object):
-    """Repair, Armor, Life, Bomb, Mine, Machine gun"""
+    def get_pool_stats(self):
+        return self.__pool.get_stats()
+
+    def get_state(self):
+        return {"bullets": self.__bullet_list.get_state(Bullet.get_state)}
+
+    def set_state(self, state):
+        for b in self.__bullet_list:
+            self.__release(b)
+        self.__bullet_list.set_state(state["bullets"], lambda s: Bullet.from_state(s, self.__timer, self.__store))
 
-    __crate_ratios = [(1,20), (20,30), (30,35), (35,60), (60,80), (80,100)]
+
+class Crates(object):
+    """The crate types and their chance of appearing are defined in the unit catalog (./media/catalog.json)."""
 
     __wait_range_per_level = {
         0:(20,25),
@@ -380,28 +712,36 @@ class Crates(object):
         9:(10,15),
     }
 
-    def __init__(self, timer, window_size, y_margin, destroyer, game_level, timeout=8, max_crates=2):
+    def __init__(self, timer, scheduler, window_size, y_margin, destroyer, game_level, timeout=8, max_crates=2,
+                 catalog=None):
         """
         Class for handling crates in the game. Crates appear on randomized positions in the game at random time
-        intervals.
+        intervals. The next spawn and the expiry of each crate are events of the scheduler.
 
         :param timer        : timer game instance
+        :param scheduler    : game instance of the Scheduler class
         :param window_size  : game window size as x,y
         :param y_margin     : y margin for crate positions based for avoiding HUD
         :param destroyer    : Destroyer game instance
         :param game_level   : game instance of the game level class
         :param timeout      : defines how long in seconds crates are in existence after spawning.
         :param max_crates   : the maximum number of crates on the screen at the same point in time
+        :param catalog      : unit catalog for the crate types, defaults to the shared catalog
+        :type scheduler     : Scheduler
         :type window_size   : list
         :type y_margin      : int
         :type destroyer     : Destroyer
         :type game_level    : Game_level
         :type timeout       : int
         :type max_crates    : int
+        :type catalog       : Unit_catalog
 
         :returns:
         """
         self._timer = timer
+        self._scheduler = scheduler
+        self._scheduler.register("crates.spawn", self.__spawn_due)
+        self._scheduler.register("crates.expire", self.__expire)
         self._window_size = window_size
         self._game_level = game_level
         self._wait_range = self.__wait_range_per_level[self._game_level.get_level()]
@@ -409,86 +749,100 @@ class Crates(object):
         self._y_margin = y_margin
         self._destroyer = destroyer
         self._enemies = None
-        self._crates_list = []
-        self._total_time = 0
-        self._pause = randrange(self._wait_range[0], self._wait_range[1], 1)
+        self._crates_list = Slot_map()
+        self._is_spawn_due = False
+        self.__schedule_spawn()
         self._timeout = timeout
+        self._catalog = catalog if catalog is not None else get_catalog()
+        self._crate_size = Crate.get_size()
+        self._crowded_count = 0
+        self._grid = Occupancy_grid((50, y_margin, window_size[0] - 100, window_size[1] - 50 - y_margin),
+                                    max(32, self._crate_size[0], self._crate_size[1]))
+        self._grid.block(destroyer.get_image()[1])
 
     def make_crate(self, timer):
 
         """
-        Checks if the time randomized during the last crate spawning event has elapsed. If that is the case, a new
-        crate is created based on randomized values. The randomized values are checked against existing ship and the
-        destroyer positions. The values are randomized until no collision is found.
-        TODO: Randomize crate types
+        Checks if the spawn event scheduled during the last crate spawning event has fired. If that is the case, a new
+        crate is created based on randomized values and its expiry is scheduled. The position is a random free cell
+        of the occupancy grid, which blocks the destroyer permanently and is kept up to date by Enemies as the ships
+        move (see get_grid). If no cell is free, the spawn is retried on the next tick.
 
         :returns:
         """
 
-        self._total_time += self._timer.get_delta()
-        if self._total_time > self._pause:
-            rand = randrange(1,100,1)
-
-            for i in range(len(self.__crate_ratios)):
-                if self.__crate_ratios[i][0] <= rand < self.__crate_ratios[i][1]:
-                    crate_type = i
-                    break
-
-            good_pos = False
-            enemies = self._enemies.get_enemies()
-            destroyer = self._destroyer.get_image()
-            crate_size = Crate.get_size()
-
-            while not good_pos:
-                good_pos_int = 0
-                x = randrange(50,self._window_size[0]-50, 1)
-                y = randrange(self._y_margin, self._window_size[1] - 50, 1)
-
-                for e in enemies:
-                    #rect = pygame.Rect(0, e.get_rect()[1], self._window_size[0], e.get_rect()[3])
-                    if e.get_rect().colliderect(pygame.Rect(x,y,crate_size[0], crate_size[1])):
-                        good_pos_int += 1
-
-                if destroyer[1].colliderect(pygame.Rect(x,y,crate_size[0], crate_size[1])):
-                    good_pos_int += 1
-
-                if good_pos_int == 0:
-                    good_pos = True
-
-            if crate_type == 0:
-                self._crates_list.append(Repair_crate((x,y),100, 100))
-            if crate_type == 1:
-                self._crates_list.append(Armor_crate((x,y),100, 100))
-            if crate_type == 2:
-                self._crates_list.append(Life_crate((x,y),100, 100))
-            if crate_type == 3:
-                self._crates_list.append(Bomb_crate((x,y),100, 100))
-            if crate_type == 4:
-                self._crates_list.append(Mine_crate((x,y),100, 100))
-            if crate_type == 5:
-                self._crates_list.append(MG_crate((x,y),100,100))
+        if self._is_spawn_due:
+            cell = self._grid.pick()
+            if cell is None:
+                self._crowded_count += 1
+                return
+
+            crate_class, crate_args = self._catalog.sample_crate()
+
+            cell_size = self._grid.get_cell_size()
+            x = cell[0] + get_random().randrange(cell_size - self._crate_size[0] + 1)
+            y = cell[1] + get_random().randrange(cell_size - self._crate_size[1] + 1)
+
+            handle = self._crates_list.add(crate_class((x,y), *crate_args))
+            self._scheduler.schedule(self._timeout, "crates.expire", handle)
 
             self._wait_range = self.__wait_range_per_level[self._game_level.get_level()]
-            self._pause = randrange(self._wait_range[0], self._wait_range[1], 1)
-            self._total_time = 0
+            self._is_spawn_due = False
+            self.__schedule_spawn()
+
+    def __schedule_spawn(self):
+        self._scheduler.schedule(get_random().randrange(self._wait_range[0], self._wait_range[1], 1), "crates.spawn")
+
+    def __spawn_due(self):
+        self._is_spawn_due = True
+
+    def __expire(self, handle):
+
+        """
+        Removes a crate that has exceeded its timeout, if it is still there.
+        """
+
+        self._crates_list.remove(handle)
 
     def get_crates(self):
-        return self._crates_list
-
-    def remove_crates(self, indices):
-        if len(indices)>0:
-            new_list = []
-            for b,v in enumerate(self._crates_list):
-                if not b in indices:
-                    new_list.append(v)
-            self._crates_list = new_list
-
-    def check(self):
-        remove_list = []
-        for c,v in enumerate(self._crates_list):
-            if v.get_age() > self._timeout:
-                remove_list.append(c)
-        self.remove_crates(remove_list)
+        return self._crates_list.values()
+
+    def get_entries(self):
+        return self._crates_list.items()
+
+    def get_crowded_count(self):
+        return self._crowded_count
+
+    def get_grid(self):
+        return self._grid
+
+    def get_state(self):
+
+        """
+        Returns the crates, the spawn state and the occupancy grid as plain data for saving the game state. The
+        pending spawn and expiry events are saved with the scheduler.
+
+        :returns: dictionary
+        """
+
+        return {
+            "crates": self._crates_list.get_state(Crate.get_state),
+            "is_spawn_due": self._is_spawn_due,
+            "wait_range": list(self._wait_range),
+            "crowded_count": self._crowded_count,
+            "grid": self._grid.get_state()
+        }
+
+    def set_state(self, state):
+        self._crates_list.set_state(state["crates"], Crate.from_state)
+        self._is_spawn_due = state["is_spawn_due"]
+        self._wait_range = tuple(state["wait_range"])
+        self._crowded_count = state["crowded_count"]
+        self._grid.set_state(state["grid"])
+
+    def remove_crates(self, handles):
+        for h in handles:
+            self._crates_list.remove(h)
 
     def set_enemies(self, enemies):
 
@@ -14,12 +14,19 @@
 # If not, see <http://www.gnu.org/licenses/>.                                                                          #
 ########################################################################################################################
 
-from math import sin, asin, cos, radians, sqrt, atan, degrees
+from math import sin, cos, radians, sqrt, atan2, degrees
 import pygame
-import datetime
-from math import floor
-from random import randrange
+from math import floor, ceil
+from rng import get_random
+from collections import namedtuple
 import sprite
+from assets import assets, load_image, Rotation_table, Lru_cache
+from clock import get_clock
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
 
 
 def project_point(original_x, original_y, bearing, distance):
@@ -40,9 +47,9 @@ def project_point(original_x, original_y, bearing, distance):
     :returns: list of integer
     """
 
-    if bearing >= 360:
-        bearing = bearing -360
+    bearing %= 360
 
+    #The axis directions are kept exact
     if bearing == 0:
         return [original_x, original_y - distance]
     if bearing == 90:
@@ -52,85 +59,210 @@ def project_point(original_x, original_y, bearing, distance):
     if bearing == 270:
         return [original_x - distance, original_y]
 
-    if 0 <= bearing < 90:
-        angle = bearing
-        move_x = sin(radians(angle))*distance
-        move_y = cos(radians(angle))*distance
-        return [original_x + move_x, original_y - move_y]
-
-    if 90 <= bearing < 180:
-        angle = bearing - 90
-        move_x = cos(radians(angle))*distance
-        move_y = sin(radians(angle))*distance
-        return [original_x + move_x, original_y + move_y]
-
-    if 180 <= bearing < 270:
-        angle = bearing - 180
-        move_x = sin(radians(angle))*distance
-        move_y = cos(radians(angle))*distance
-        return [original_x - move_x, original_y + move_y]
-
-    if 270 <= bearing < 360:
-        angle = bearing - 270
-        move_x = cos(radians(angle))*distance
-        move_y = sin(radians(angle))*distance
-        return [original_x - move_x, original_y - move_y]
+    angle = radians(bearing)
+    return [original_x + sin(angle)*distance, original_y - cos(angle)*distance]
 
 
 def get_bearing(point_1, point_2):
     """
-    Function for calculating the bearing and distance (azimuth) between two points
+    Function for calculating the bearing and distance (azimuth) between two points. The bearing is 0 for two equal
+    points.
 
     :param point_1: coordinates of first point as set(x,y)
     :param point_2: coorindate of second point as set(x,y)
-    :return: bearing as int, distance as int
+    :return: bearing as float between 0 and 360, distance as float
     """
     delta_x = (point_2[0] - point_1[0])
     delta_y = (point_2[1] - point_1[1])
 
-    distance = sqrt(pow(delta_x, 2)+pow(delta_y, 2))
-
     if delta_x == 0 and delta_y == 0:
-        return 0,0
-    if delta_x == 0 and delta_y < 0:
-        return 0
-    if delta_x == 0 and delta_y > 0:
-        return 180
-    if delta_x < 0 and delta_y == 0:
-        return 270
-    if delta_x > 0 and delta_y == 0:
-        return 90
+        return 0, 0
+
+    distance = sqrt(delta_x*delta_x + delta_y*delta_y)
+    return degrees(atan2(delta_x, -delta_y)) % 360, distance
+
+
+class Trig_table(object):
+
+    def __init__(self, resolution=1):
+        """
+        Precomputed sine and cosine values for bearings quantized to the angular resolution, for use with
+        project_points. Requires numpy.
+
+        :param resolution   : angular resolution in degrees
+        :type resolution    : float
+        """
+
+        if numpy is None:
+            raise ImportError("Trig_table requires numpy")
+        self.__resolution = resolution
+        self.__steps = int(round(360.0 / resolution))
+        angles = numpy.radians(numpy.arange(self.__steps) * float(resolution))
+        self.__sin = numpy.sin(angles)
+        self.__cos = numpy.cos(angles)
+
+    def lookup(self, bearings):
+
+        """
+        Returns the sine and cosine of the bearings, quantized to the resolution of the table.
+
+        :returns: numpy.ndarray, numpy.ndarray
+        """
+
+        steps = numpy.rint(numpy.asarray(bearings, dtype=numpy.float64) / self.__resolution).astype(numpy.intp)
+        steps %= self.__steps
+        return self.__sin[steps], self.__cos[steps]
+
+    def get_resolution(self):
+        return self.__resolution
+
+
+def project_points(origins_x, origins_y, bearings, distances, table=None):
+
+    """
+    Batch version of project_point. Projects arrays of x,y positions by arrays of bearings and distances, all
+    arguments can also be scalars and are broadcast against each other. If a Trig_table is given, the bearings are
+    quantized to its resolution and sine and cosine are looked up instead of computed. Requires numpy.
+
+    :param origins_x    : x origins
+    :param origins_y    : y origins
+    :param bearings     : bearings in degrees with 0/360 degrees as north
+    :param distances    : distances in pixels
+    :param table        : optional lookup table for sine and cosine
+    :type origins_x     : numpy.ndarray
+    :type origins_y     : numpy.ndarray
+    :type bearings      : numpy.ndarray
+    :type distances     : numpy.ndarray
+    :type table         : Trig_table
+
+    :returns: numpy.ndarray x, numpy.ndarray y
+    """
+
+    if table is not None:
+        sin_values, cos_values = table.lookup(bearings)
+    else:
+        angles = numpy.radians(numpy.asarray(bearings, dtype=numpy.float64))
+        sin_values, cos_values = numpy.sin(angles), numpy.cos(angles)
+    distances = numpy.asarray(distances, dtype=numpy.float64)
+    return origins_x + sin_values*distances, origins_y - cos_values*distances
+
+
+def get_bearings(points_1, points_2):
+
+    """
+    Batch version of get_bearing. Calculates bearings and distances between two arrays of points with the shape (n, 2),
+    either of them can also be a single x,y point. Requires numpy.
+
+    :param points_1 : coordinates of the first points
+    :param points_2 : coordinates of the second points
+    :type points_1  : numpy.ndarray
+    :type points_2  : numpy.ndarray
+
+    :returns: numpy.ndarray bearings between 0 and 360, numpy.ndarray distances
+    """
+
+    deltas = numpy.asarray(points_2, dtype=numpy.float64) - numpy.asarray(points_1, dtype=numpy.float64)
+    delta_x = deltas[..., 0]
+    delta_y = deltas[..., 1]
+    bearings = numpy.degrees(numpy.arctan2(delta_x, -delta_y)) % 360
+    return bearings, numpy.hypot(delta_x, delta_y)
+
+
+def interpolate_rect(previous, current, alpha):
+
+    """
+    Function for interpolating the position of a rectangle between two simulation ticks. Used for drawing moving
+    objects between ticks.
+
+    :param previous : rectangle at the previous tick, can be None
+    :param current  : rectangle at the current tick
+    :param alpha    : position between the ticks, 0.0 is the previous and 1.0 the current tick
+    :type previous  : pygame.Rect
+    :type current   : pygame.Rect
+    :type alpha     : float
+
+    :returns: pygame.Rect
+    """
+
+    if previous is None or alpha >= 1:
+        return current
+    return pygame.Rect(previous[0] + (current[0] - previous[0]) * alpha,
+                       previous[1] + (current[1] - previous[1]) * alpha, current[2], current[3])
+
+
+def rect_to_state(rect):
+    return list(rect) if rect is not None else None
+
+
+def rect_from_state(state):
+    return pygame.Rect(state) if state is not None else None
+
+
+def tuples_from_state(value):
 
-    if delta_y < 0 < delta_x:
-        return degrees(asin(delta_x/distance)),distance
+    """
+    Turns the lists of a saved state value back into tuples, also nested ones.
+    """
+
+    if isinstance(value, list):
+        return tuple(tuples_from_state(v) for v in value)
+    return value
+
+
+def get_unit_class(name, base):
+
+    """
+    Returns the unit class with the given name from this module, which has to be a subclass of base. Used for
+    restoring saved game state, which refers to the unit classes by name. Raises ValueError for any other name.
+
+    :param name : class name
+    :param base : required base class, e.g. Enemy
+    :type name  : str
+    :type base  : class
 
-    elif delta_x > 0 and delta_y > 0:
-        return 180 - degrees(asin(delta_x/distance)), distance
+    :returns: class
+    """
+
+    cls = globals().get(name)
+    if not isinstance(cls, type) or not issubclass(cls, base):
+        raise ValueError("Unknown {} class: {}".format(base.__name__, name))
+    return cls
+
+
+#Immutable per type parameters of the enemy and bullet classes. Each class holds one record that is shared by all
+#its instances, see Enemy and Bullet for the meaning of the fields. Fields that are not given default to None.
+Ship_params = namedtuple("Ship_params", ["max_instances", "hp", "min_speed", "max_speed", "game_speed_multiplier",
+                                         "min_dist", "has_torpedo", "torpedo_type", "torpedo_speed", "torpedo_chance",
+                                         "has_gun", "gun_type", "gun_pattern", "points", "damage", "spawn_method",
+                                         "fixed_spawn"])
+Ship_params.__new__.__defaults__ = (None,) * len(Ship_params._fields)
 
-    elif delta_x < 0 < delta_y:
-        return 180 - degrees(asin(delta_x/distance)), distance
+Bullet_params = namedtuple("Bullet_params", ["speed", "damage", "is_friendly", "has_trail", "trail_type"])
+Bullet_params.__new__.__defaults__ = (None,) * len(Bullet_params._fields)
 
-    elif delta_x < 0 and delta_y < 0:
-        return 360 + degrees(asin(delta_x/distance)), distance
 
 class Destroyer_options(object):
-    def __init__(self, timer):
+    def __init__(self, timer, scheduler):
         """This class handles the Destroyer class options related to the destroyer weapon, such as reload time, power
         reduction etc. When setting one of the options, a timer can be passed with the set method. If no timer is
         passed, the change of the option will be permanent. With a timer, the change will be reverted to the default
-        options specified below. The timer is run by calling the check() method from the main game loop.
+        options specified below by an event of the scheduler.
+
+        :param timer        : timer game instance
+        :param scheduler    : game instance of the Scheduler class
+        :type timer         : Timer
+        :type scheduler     : Scheduler
         """
 
         self.__timer = timer
+        self.__scheduler = scheduler
+        self.__scheduler.register("options.reset", self.__reset)
+        self.__scheduler.register("options.countdown", self.__set_countdown)
 
-        #Default timer values
-        self.__b_type_timer = -1
-        self.__r_time_timer = -1
-        self.__p_reduction_timer = -1
-        self.__p_refill_timer = -1
-        self.__t_turn_speed_timer = -1
-        self.__text_timer = -1
-        self.__last_second = -1
+        #Pending reset events by option and the pending countdown events
+        self.__reset_events = {}
+        self.__countdown_events = []
+        self.__countdown = None
 
         #Default option values
         self.__b_type = 0
@@ -146,99 +278,150 @@ class Destroyer_options(object):
         self.__power_refill = self.__p_refill
         self.__turn_speed = self.__t_speed
 
+    def __set_timer(self, option, timer):
+        event_id = self.__reset_events.pop(option, None)
+        if event_id is not None:
+            self.__scheduler.cancel(event_id)
+        if timer > 0:
+            self.__reset_events[option] = self.__scheduler.schedule(timer, "options.reset", option)
+
+    def __reset(self, option):
+        self.__reset_events.pop(option, None)
+        if option == "bullet_type":
+            self.reset_bullet_type()
+        elif option == "reload_time":
+            self.reset_reload_time()
+        elif option == "power_reduction":
+            self.reset_power_reduction()
+        elif option == "power_refill":
+            self.reset_power_refill()
+
     def set_bullet_type(self, bullet_type, timer=-1):
         self.__bullet_type = bullet_type
-        self.__b_type_timer = timer
+        self.__set_timer("bullet_type", timer)
 
     def get_bullet_type(self):
         return self.__bullet_type
 
     def set_reload_time(self, time, timer=-1):
         self.__reload_time = time
-        self.__r_time_timer = timer
+        self.__set_timer("reload_time", timer)
 
     def get_reload_time(self):
         return self.__reload_time
 
     def set_power_reduction(self, reduction, timer=-1):
         self.__power_reduction = reduction
-        self.__p_reduction_timer = timer
+        self.__set_timer("power_reduction", timer)
 
     def get_power_reduction(self):
         return self.__power_reduction
 
     def set_power_refill(self, refill, timer=-1):
         self.__power_refill = refill
-        self.__p_refill_timer = timer
+        self.__set_timer("power_refill", timer)
 
     def get_power_refill(self):
         return self.__power_refill
 
     def reset_bullet_type(self):
         self.__bullet_type = self.__b_type
-        self.__b_type_timer = -1
+        self.__set_timer("bullet_type", -1)
 
     def reset_reload_time(self):
         self.__reload_time = self.__r_time
-        self.__r_time_timer = -1
+        self.__set_timer("reload_time", -1)
 
     def reset_power_reduction(self):
         self.__power_reduction = self.__p_reduction
-        self.__p_reduction_timer = -1
+        self.__set_timer("power_reduction", -1)
 
     def reset_power_refill(self):
         self.__power_refill = self.__p_refill
-        self.__p_refill_timer = -1
+        self.__set_timer("power_refill", -1)
 
     def set_text_timer(self, time):
-        self.__text_timer = time
-        self.__last_second = time
+
+        """
+        Starts a countdown of time seconds. Each full second left is returned once by check(), starting with the
+        seconds rounded up.
+        """
+
+        for event_id in self.__countdown_events:
+            self.__scheduler.cancel(event_id)
+        seconds = int(ceil(time))
+        self.__countdown_events = [self.__scheduler.schedule(0, "options.countdown", seconds)]
+        for second in range(seconds - 1, 0, -1):
+            self.__countdown_events.append(self.__scheduler.schedule(time - second, "options.countdown", second))
+
+    def __set_countdown(self, second):
+        self.__countdown = second
 
     def check(self):
 
-        if self.__b_type_timer <= 0.0:
-            self.reset_bullet_type()
-        elif self.__b_type_timer > 0:
-            self.__b_type_timer -= self.__timer.get_delta()
+        """
+        Returns the second of the countdown that was reached since the last call or None.
 
-        if self.__r_time_timer <= 0.0:
-            self.reset_reload_time()
-        elif self.__r_time_timer > 0:
-            self.__r_time_timer -= self.__timer.get_delta()
+        :returns: integer
+        """
 
-        if self.__p_reduction_timer <= 0.0:
-            self.reset_power_reduction()
-        elif self.__p_reduction_timer > 0:
-            self.__p_reduction_timer -= self.__timer.get_delta()
+        second = self.__countdown
+        self.__countdown = None
+        return second
+
+    def get_state(self):
+
+        """
+        Returns the option values and the ids of their pending scheduler events as plain data for saving the game
+        state.
+
+        :returns: dictionary
+        """
+
+        return {
+            "bullet_type": self.__bullet_type,
+            "reload_time": self.__reload_time,
+            "power_reduction": self.__power_reduction,
+            "power_refill": self.__power_refill,
+            "turn_speed": self.__turn_speed,
+            "reset_events": sorted([option, event_id] for option, event_id in self.__reset_events.items()),
+            "countdown_events": list(self.__countdown_events),
+            "countdown": self.__countdown
+        }
+
+    def set_state(self, state):
+        self.__bullet_type = state["bullet_type"]
+        self.__reload_time = state["reload_time"]
+        self.__power_reduction = state["power_reduction"]
+        self.__power_refill = state["power_refill"]
+        self.__turn_speed = state["turn_speed"]
+        self.__reset_events = dict((str(option), event_id) for option, event_id in state["reset_events"])
+        self.__countdown_events = list(state["countdown_events"])
+        self.__countdown = state["countdown"]
 
-        if self.__p_refill_timer <= 0.0:
-            self.reset_power_refill()
-        elif self.__p_refill_timer > 0:
-            self.__p_refill_timer -= self.__timer.get_delta()
-
-        if self.__text_timer <= 0:
-            self.__text_timer = -1
-        elif self.__text_timer > 0:
-            self.__text_timer -= self.__timer.get_delta()
-            if self.__text_timer < self.__last_second:
-                self.__last_second = floor(self.__text_timer)
-                return int(self.__last_second) + 1
-        return None
 
 class Destroyer(object):
 
-    def __init__(self, type, hp, options, window_size):
+    def __init__(self, type, hp, options, window_size, tower_resolution=1, tower_cache_bytes=None, clock=None):
 
         """
         Class for the players ship.
-        :param type         : Destroyer type. So far only 0 is implemented
-        :param reload_time  : reload time between shots in ms
-        :param hp           : HP for destroyer
-        :param window_size  : window size as x,y
-        :type type          : int
-        :type reload_time   : int
-        :type hp            : int
-        :type window_size   : list
+        :param type                 : Destroyer type. So far only 0 is implemented
+        :param reload_time          : reload time between shots in ms
+        :param hp                   : HP for destroyer
+        :param window_size          : window size as x,y
+        :param tower_resolution     : angular resolution of the pre rotated tower and muzzle flash images in degrees
+        :param tower_cache_bytes    : memory bound for each of the tower and muzzle flash rotation tables in bytes.
+                                      None keeps all rotations.
+        :param clock                : clock service used for reloading and power regeneration. Defaults to the
+                                      shared clock.
+        :type type                  : int
+        :type reload_time           : int
+        :type hp                    : int
+        :type window_size           : list
+        :type tower_resolution      : float
+        :type tower_cache_bytes     : int
+        :type clock                 : Clock
 
         :returns:
         """
@@ -250,15 +433,16 @@ class Destroyer(object):
         self.__max_hp = hp
         self.__last_shot = None
         self.__window_size = window_size
+        self.__clock = clock if clock is not None else get_clock()
         self.__shooting_power = 100
-        self.__last_shooting_power_check = datetime.datetime.now()
+        self.__last_shooting_power_check = self.__clock.now()
         self.__options = options
         self.__tower_height = None
 
         if type == 0:
             self.__pipe_length = 30
 
-            self.__image = pygame.image.load("./media/warship.png")
+            self.__image = load_image("./media/warship.png")
             rect = self.__image.get_rect()
             self.__image_size = rect[2], rect[3]
 
@@ -266,15 +450,17 @@ class Destroyer(object):
                                       self.__window_size[1]/2 - self.__image_size[1]/2,
                                       self.__image_size[0], self.__image_size[1])
 
-            self.__tower_image_orig = pygame.image.load("./media/tower.png")
+            self.__tower_image_orig = load_image("./media/tower.png")
             self.__tower_height = self.__tower_image_orig.get_rect().height
             self.__center = (window_size[0]/2, window_size[1]/2)
-            self.__tower_image = pygame.transform.rotate(self.__tower_image_orig, self.__tower_direction)
-            self.__tower_rect = self.__tower_image.get_rect(center=self.__center)
+            self.__tower_rotations = Rotation_table(self.__tower_image_orig, self.__center, tower_resolution,
+                                                    tower_cache_bytes)
+            self.__tower_image, self.__tower_rect = self.__tower_rotations.get(self.__tower_direction)
 
-            self.__muzzle_image = pygame.image.load("./media/muzzle_flash.png")
-            self.__muzzle_flash = pygame.transform.rotate(self.__muzzle_image, self.__tower_direction)
-            self.__muzzle_rect = self.__muzzle_flash.get_rect(center=self.__center)
+            self.__muzzle_image = load_image("./media/muzzle_flash.png")
+            self.__muzzle_rotations = Rotation_table(self.__muzzle_image, self.__center, tower_resolution,
+                                                     tower_cache_bytes)
+            self.__muzzle_flash, self.__muzzle_rect = self.__muzzle_rotations.get(self.__tower_direction)
 
         self.__reload_time = options.get_reload_time()
 
@@ -289,11 +475,8 @@ class Destroyer(object):
                 self.__tower_direction = self.__tower_direction + 360
             self.__tower_direction -= steps
 
-        self.__tower_image = pygame.transform.rotate(self.__tower_image_orig, -self.__tower_direction)
-        self.__tower_rect = self.__tower_image.get_rect(center=self.__center)
-
-        self.__muzzle_flash = pygame.transform.rotate(self.__muzzle_image, -self.__tower_direction)
-        self.__muzzle_rect = self.__muzzle_flash.get_rect(center=self.__center)
+        self.__tower_image, self.__tower_rect = self.__tower_rotations.get(self.__tower_direction)
+        self.__muzzle_flash, self.__muzzle_rect = self.__muzzle_rotations.get(self.__tower_direction)
 
     def get_image(self):
         return self.__image, self.__rect
@@ -312,12 +495,12 @@ class Destroyer(object):
             return False
         else:
             if self.__last_shot is None:
-                self.__last_shot = datetime.datetime.now()
+                self.__last_shot = self.__clock.now()
                 return True
             else:
-                delta = datetime.datetime.now() - self.__last_shot
-                if delta.total_seconds()*1000 > self.__options.get_reload_time():
-                    self.__last_shot = datetime.datetime.now()
+                delta = self.__clock.now() - self.__last_shot
+                if delta*1000 > self.__options.get_reload_time():
+                    self.__last_shot = self.__clock.now()
                     if self.__shooting_power < 80:
                         self.__shooting_power -= self.__options.get_power_reduction()
                     else:
@@ -334,8 +517,8 @@ class Destroyer(object):
         using permanent fire. Fast regeneration above 50 to not drain too much when using single shots.
         :return:
         """
-        new_time = datetime.datetime.now()
-        delta = (new_time - self.__last_shooting_power_check).total_seconds()
+        new_time = self.__clock.now()
+        delta = new_time - self.__last_shooting_power_check
         if self.__shooting_power > 20:
             self.__shooting_power += self.__options.get_power_refill() * delta
         else:
@@ -384,28 +567,41 @@ class Destroyer(object):
     def increase_max_hp(self, hp):
         self.__max_hp += hp
 
+    def get_state(self):
+
+        """
+        Returns the tower direction, hp, shooting power and reload state as plain data for saving the game state.
+
+        :returns: dictionary
+        """
+
+        return {
+            "tower_direction": self.__tower_direction,
+            "hp": self.__hp,
+            "max_hp": self.__max_hp,
+            "last_shot": self.__last_shot,
+            "shooting_power": self.__shooting_power,
+            "last_shooting_power_check": self.__last_shooting_power_check
+        }
+
+    def set_state(self, state):
+        self.__tower_direction = state["tower_direction"]
+        self.__hp = state["hp"]
+        self.__max_hp = state["max_hp"]
+        self.__last_shot = state["last_shot"]
+        self.__shooting_power = state["shooting_power"]
+        self.__last_shooting_power_check = state["last_shooting_power_check"]
+        self.__tower_image, self.__tower_rect = self.__tower_rotations.get(self.__tower_direction)
+        self.__muzzle_flash, self.__muzzle_rect = self.__muzzle_rotations.get(self.__tower_direction)
+
 
 class Enemy(object):
 
-    _param_dict = {
-        "max_instances":None,
-        "hp":None,
-        "min_speed":None,
-        "max_speed": None,
-        "game_speed_multiplier":None,
-        "min_dist":None,
-        "has_torpedo":None,
-        "torpedo_type":None,
-        "torpedo_speed":None,
-        "torpedo_chance":None,
-        "has_gun":None,
-        "gun_type": None,
-        "gun_pattern":None,
-        "points":None,
-        "damage":None,
-        "spawn_method":None,
-        "fixed_spawn":[(),None]
-    }
+    __slots__ = ("_hp", "_position", "_real_position", "_direction", "_px_per_second", "_image", "_image_size",
+                 "_rect", "_previous_rect", "_has_torpedo", "_torpedo_shot", "_gun_pattern_pos",
+                 "_store", "_slot", "_params")
+
+    params = Ship_params(fixed_spawn=((), None))
 
     def __init__(self, hp, px_per_second, origin, direction):
 
@@ -422,11 +618,12 @@ class Enemy(object):
         :type direction         : int
 
         The enemies are initialized by the game instance of the Enemies class by randomizing the type of enemy to be
-        spawned, pull the parameter dictionary (param_dict) from that class, randomizing the starting position of
+        spawned, pull the parameter record (params) from that class, randomizing the starting position of
         the boat, the speed and if it has a torpedo. The randomized parameters are then used to initiate the
         instance of the enemy class.
 
-        The parameters in the param_dict dictionary are to be defined as followed:
+        The parameter record is shared by all instances of a class and must not be changed, set_ship_param gives a
+        single instance its own modified copy. The fields of the Ship_params record are to be defined as followed:
         "strength" (int)                  : enemy strength points
         "min_speed" (int)                 : minimum unit speed in px/sec
         "max_speed" (int)                 : maximum unit speed int px/sec
@@ -439,16 +636,16 @@ class Enemy(object):
         "has_gun"(bool)                   : defines if the ship has a gun
         "gun_type" (int)                  : what type of gun, i.e. what bullet will be shot. Bullets are handled in the
                                             Enemies class
-        "gun_pattern"(list of float)      : enemy shooting pattern. Waiting time in seconds. [2.0,0.2,0.2] means three
+        "gun_pattern"(set of float)       : enemy shooting pattern. Waiting time in seconds. (2.0,0.2,0.2) means three
                                             shots will be fired. The first after 2 seconds, the second after a 0.2
                                             seconds pause and the third after a 0.2 seconds pause. Then the pattern is
                                             restarted. Enables shooing of salvos.
         "points (int)                     : points awarded to player when enemy is shot
         "spawn_type" (int)                : sets wether the start point of the ship is randomized (value 0) or defined
                                             by the origin parameter
-        "fixed_spawn" (list)              : origin as x,y and direction (0-3). Either the x or y of the origin can be
+        "fixed_spawn" (set)               : origin as x,y and direction (0-3). Either the x or y of the origin can be
                                             defined as -1, so the enemy is spawned at the edge of the game window.
-                                            Example: [(-1, 50), 3] will give a ship that is spawned on the right outer
+                                            Example: ((-1, 50), 3) will give a ship that is spawned on the right outer
                                             limit of the game window at 50 pixels down and go towards west.
 
         :returns:
@@ -463,29 +660,69 @@ class Enemy(object):
         self._image = None
         self._image_size = None
         self._rect = None
+        self._previous_rect = None
         self._has_torpedo = None
         self._torpedo_shot = False
-        self._gun_time_delta = 0
         self._gun_pattern_pos = 0
+        self._store = None
+        self._slot = None
+        self._params = self.params
+
+    def attach(self, store):
+
+        """
+        Moves the position, speed, rectangle and hp of the enemy into a slot of an Entity_store. From then on the
+        enemy is a view on that slot and is moved by Entity_store.step instead of move().
+
+        :param store    : entity store
+        :type store     : Entity_store
+        """
+
+        direction_x, direction_y = ((0, -1), (1, 0), (0, 1), (-1, 0))[self._direction]
+        if self._direction in (0, 2):
+            offset = -(self._image_size[0]/2), 0
+        else:
+            offset = 0, -(self._image_size[1]/2)
+        self._slot = store.add(self._real_position[0], self._real_position[1], direction_x, direction_y,
+                               self._px_per_second, self._image_size[0], self._image_size[1], offset[0], offset[1],
+                               hp=self._hp, speed_scale=self._params.game_speed_multiplier)
+        self._store = store
+
+    def detach(self):
+        if self._store is not None:
+            self._real_position = self._store.get_position(self._slot)
+            self._position = int(round(self._real_position[0], 0)), int(round(self._real_position[1], 0))
+            self._rect = self._store.get_rect(self._slot).copy()
+            self._hp = self._store.get_hp(self._slot)
+            self._store.remove(self._slot)
+            self._store = None
+            self._slot = None
 
     def get_extent(self):
-        return pygame.Rect(self._position[0], self._position[1], self._position[0] + self._rect[2], self._position[1] + \
-               self._rect[3])
+        position = self.get_position()
+        rect = self.get_rect()
+        return pygame.Rect(position[0], position[1], position[0] + rect[2], position[1] + rect[3])
 
     def get_rect(self):
+        if self._store is not None:
+            return self._store.get_rect(self._slot)
         return self._rect
 
     def get_direction(self):
         return self._direction
 
     def get_position(self):
+        if self._store is not None:
+            x, y = self._store.get_position(self._slot)
+            return int(round(x, 0)), int(round(y, 0))
         return self._position
 
     def set_direction(self, direction):
         self._direction = direction
 
     def get_center_point(self):
-        return self._position[0] + self._image_size[0]/2, self._position[1] + self._image_size[1]/2
+        position = self.get_position()
+        return position[0] + self._image_size[0]/2, position[1] + self._image_size[1]/2
 
     def move(self, time_delta, level=0):
 
@@ -499,8 +736,9 @@ class Enemy(object):
 
         """
 
+        self._previous_rect = self._rect
         vector_delta = time_delta * (self._px_per_second + (self._px_per_second *
-                                                     self._param_dict["game_speed_multiplier"] *
+                                                     self._params.game_speed_multiplier *
                                                      level))
 
         if self._direction == 0:
@@ -526,7 +764,12 @@ class Enemy(object):
         self._position = int(round(self._real_position[0],0)), int(round(self._real_position[1],0))
 
     def get_image(self):
-        return self._image, self._rect
+        return self._image, self.get_rect()
+
+    def get_draw_rect(self, alpha=1.0):
+        if self._store is not None and alpha < 1:
+            return interpolate_rect(self._store.get_previous_rect(self._slot), self._store.get_rect(self._slot), alpha)
+        return interpolate_rect(self._previous_rect, self.get_rect(), alpha)
 
     def has_torpedo(self):
 
@@ -538,10 +781,10 @@ class Enemy(object):
         :returns: boolean
         """
 
-        if self._param_dict["has_torpedo"]:
+        if self._params.has_torpedo:
             if self._has_torpedo is None:
-                chance = self._param_dict["torpedo_chance"]*10
-                rand = randrange(1,10,1)
+                chance = self._params.torpedo_chance*10
+                rand = get_random().randrange(1,10,1)
                 if rand <= chance:
                     self._has_torpedo = True
                     return True
@@ -558,20 +801,23 @@ class Enemy(object):
             return False
 
     def get_gun_type(self):
-        return self._param_dict["gun_type"]
-
-    def shoot(self, time_delta):
-        self._gun_time_delta += time_delta
-        if self._param_dict["has_gun"]:
-            gun_pattern = self._param_dict["gun_pattern"]
-            if self._gun_time_delta >= gun_pattern[self._gun_pattern_pos]:
-                self._gun_time_delta = 0
-                if self._gun_pattern_pos == len(gun_pattern)-1:
-                    self._gun_pattern_pos = 0
-                else:
-                    self._gun_pattern_pos += 1
-                return True
-        return False
+        return self._params.gun_type
+
+    def next_shot(self):
+
+        """
+        Returns the waiting time in seconds until the next shot of the gun pattern and moves on in the pattern, or None
+        if the ship has no gun. The shots are scheduled by the Enemies class.
+
+        :returns: float
+        """
+
+        if not self._params.has_gun:
+            return None
+        gun_pattern = self._params.gun_pattern
+        wait = gun_pattern[self._gun_pattern_pos]
+        self._gun_pattern_pos = (self._gun_pattern_pos + 1) % len(gun_pattern)
+        return wait
 
     def set_torpedo_shot(self):
         self._torpedo_shot = True
@@ -589,6 +835,8 @@ class Enemy(object):
         :returns: integer
         """
 
+        if self._store is not None:
+            return self._store.reduce_hp(self._slot, hp) <= 0
         self._hp -= hp
         if self._hp <= 0:
             return True
@@ -596,48 +844,123 @@ class Enemy(object):
             return False
 
     def get_hp(self):
+        if self._store is not None:
+            return self._store.get_hp(self._slot)
         return self._hp
 
+    def get_instance_params(self):
+
+        """
+        Returns the parameter record of this instance. That is the record of the class, unless it has been changed for
+        this instance with set_ship_param.
+
+        :returns: Ship_params
+        """
+
+        return self._params
+
     def set_ship_param(self, param, value):
+
+        """
+        Changes a parameter for this instance only. The class record is left untouched. Returns 1 for an unknown
+        parameter.
+        """
+
         try:
-            self._param_dict[param] = value
-        except:
+            self._params = self._params._replace(**{param: value})
+        except ValueError:
             return 1
 
+    def get_state(self):
 
-class Submarine(Enemy):
+        """
+        Returns the state of the enemy as plain data for saving the game state, including its slot of the entity
+        store if it is attached to one. The parameter record is only saved if it has been changed for this instance.
 
-    param_dict = {
-        "max_instances":None,
-        "hp":200,
-        "min_speed":60,
-        "max_speed":80,
-        "game_speed_multiplier":0.1,
-        "min_dist":100,
-        "has_torpedo":True,
-        "torpedo_type":1,
-        "torpedo_speed":30,
-        "torpedo_chance":0.3,
-        "has_gun":None,
-        "gun_type": None,
-        "gun_pattern":None,
-        "points":100,
-        "damage":None,
-        "spawn_method":0,
-        "fixed_spawn":[(),None]
-    }
+        :returns: dictionary
+        """
 
-    def __init__(self, px_per_second, origin, direction):
+        return {
+            "type": type(self).__name__,
+            "hp": self._hp,
+            "position": list(self._position),
+            "real_position": list(self._real_position),
+            "direction": self._direction,
+            "px_per_second": self._px_per_second,
+            "rect": rect_to_state(self._rect),
+            "previous_rect": rect_to_state(self._previous_rect),
+            "has_torpedo": self._has_torpedo,
+            "torpedo_shot": self._torpedo_shot,
+            "gun_pattern_pos": self._gun_pattern_pos,
+            "params": dict(self._params._asdict()) if self._params is not self.params else None,
+            "entity": self._store.get_entity(self._slot) if self._store is not None else None
+        }
+
+    @classmethod
+    def from_state(cls, state, store=None):
+
+        """
+        Creates an enemy from a state returned by get_state. The class is looked up by name and has to be a subclass
+        of the class this is called on.
+
+        :param state    : state from get_state
+        :param store    : entity store the enemy is attached to, None if it is not attached
+        :type state     : dictionary
+        :type store     : Entity_store
+
+        :returns: Enemy
+        """
+
+        enemy = get_unit_class(state["type"], cls)(state["px_per_second"], tuple(state["real_position"]),
+                                                   state["direction"])
+        enemy._hp = state["hp"]
+        enemy._position = tuple(state["position"])
+        enemy._real_position = tuple(state["real_position"])
+        enemy._rect = rect_from_state(state["rect"])
+        enemy._previous_rect = rect_from_state(state["previous_rect"])
+        enemy._has_torpedo = state["has_torpedo"]
+        enemy._torpedo_shot = state["torpedo_shot"]
+        enemy._gun_pattern_pos = state["gun_pattern_pos"]
+        if state["params"] is not None:
+            enemy._params = Ship_params(**dict((str(k), tuples_from_state(v)) for k, v in state["params"].items()))
+        if store is not None:
+            enemy.attach(store)
+            store.set_entity(enemy._slot, state["entity"])
+        return enemy
+
+
+class Submarine(Enemy):
+    __slots__ = ()
+
+    params = Ship_params(
+        max_instances=None,
+        hp=200,
+        min_speed=60,
+        max_speed=80,
+        game_speed_multiplier=0.1,
+        min_dist=100,
+        has_torpedo=True,
+        torpedo_type=1,
+        torpedo_speed=30,
+        torpedo_chance=0.3,
+        has_gun=None,
+        gun_type=None,
+        gun_pattern=None,
+        points=100,
+        damage=None,
+        spawn_method=0,
+        fixed_spawn=((), None)
+    )
 
-        Enemy.__init__(self, self.param_dict["hp"], px_per_second, origin, direction)
+    def __init__(self, px_per_second, origin, direction):
 
-        #Handing over parameter dict to parent
-        self._param_dict = self.param_dict
+        Enemy.__init__(self, self.params.hp, px_per_second, origin, direction)
 
         #Setting image related parameters
-        self._image = pygame.image.load("./media/submarine.png")
         if self._direction == 1:
-            self._image = pygame.transform.rotate(self._image, 180)
+            self._image = assets.get_rotated("./media/submarine.png", 180)
+        else:
+            self._image = load_image("./media/submarine.png")
 
         rect = self._image.get_rect()
         self._image_size = rect[2], rect[3]
@@ -646,42 +969,41 @@ class Submarine(Enemy):
 
     @classmethod
     def get_params(cls):
-        return cls.param_dict
+        return cls.params
 
 
 class Fregatte(Enemy):
-
-    param_dict = {
-        "max_instances":None,
-        "hp":500,
-        "min_speed":60,
-        "max_speed":80,
-        "game_speed_multiplier":0,
-        "min_dist":200,
-        "has_torpedo":True,
-        "torpedo_type":1,
-        "torpedo_speed":30,
-        "torpedo_chance":1,
-        "has_gun":True,
-        "gun_type": 1,
-        "gun_pattern":[3,0.2,0.2,0.2],
-        "points":500,
-        "damage":None,
-        "spawn_method":0,
-        "fixed_spawn":[(),None]
-    }
+    __slots__ = ()
+
+    params = Ship_params(
+        max_instances=None,
+        hp=500,
+        min_speed=60,
+        max_speed=80,
+        game_speed_multiplier=0,
+        min_dist=200,
+        has_torpedo=True,
+        torpedo_type=1,
+        torpedo_speed=30,
+        torpedo_chance=1,
+        has_gun=True,
+        gun_type=1,
+        gun_pattern=(3, 0.2, 0.2, 0.2),
+        points=500,
+        damage=None,
+        spawn_method=0,
+        fixed_spawn=((), None)
+    )
 
     def __init__(self, px_per_second, origin, direction):
 
-        Enemy.__init__(self, self.param_dict["hp"], px_per_second, origin, direction)
-
-        #Handing over parameter dict to parent
-        self._param_dict = self.param_dict
+        Enemy.__init__(self, self.params.hp, px_per_second, origin, direction)
 
         #Setting image related parameters
-        self._image = pygame.image.load("./media/fregatte.png")
         if self._direction == 1:
-            self._image = pygame.transform.rotate(self._image, 180)
+            self._image = assets.get_rotated("./media/fregatte.png", 180)
+        else:
+            self._image = load_image("./media/fregatte.png")
 
         rect = self._image.get_rect()
         self._image_size = rect[2], rect[3]
@@ -690,42 +1012,41 @@ class Fregatte(Enemy):
 
     @classmethod
     def get_params(cls):
-        return cls.param_dict
+        return cls.params
 
 
 class Gunboat(Enemy):
-
-    param_dict = {
-        "max_instances":1,
-        "hp":100,
-        "min_speed":120,
-        "max_speed":150,
-        "game_speed_multiplier":0.1,
-        "min_dist":100,
-        "has_torpedo":False,
-        "torpedo_type":None,
-        "torpedo_speed":None,
-        "torpedo_chance":None,
-        "has_gun":True,
-        "gun_type": 0,
-        "gun_pattern":[3,0.05, 0.07],
-        "points":100,
-        "damage":None,
-        "spawn_method":0,
-        "fixed_spawn":[(),None]
-    }
+    __slots__ = ()
+
+    params = Ship_params(
+        max_instances=1,
+        hp=100,
+        min_speed=120,
+        max_speed=150,
+        game_speed_multiplier=0.1,
+        min_dist=100,
+        has_torpedo=False,
+        torpedo_type=None,
+        torpedo_speed=None,
+        torpedo_chance=None,
+        has_gun=True,
+        gun_type=0,
+        gun_pattern=(3, 0.05, 0.07),
+        points=100,
+        damage=None,
+        spawn_method=0,
+        fixed_spawn=((), None)
+    )
 
     def __init__(self, px_per_second, origin, direction):
 
-        Enemy.__init__(self, self.param_dict["hp"], px_per_second, origin, direction)
-
-        #Handing over parameter dict to parent
-        self._param_dict = self.param_dict
+        Enemy.__init__(self, self.params.hp, px_per_second, origin, direction)
 
         #Setting image related parameters
-        self._image = pygame.image.load("./media/torpedoboat.png")
         if self._direction == 1:
-            self._image = pygame.transform.rotate(self._image, 180)
+            self._image = assets.get_rotated("./media/torpedoboat.png", 180)
+        else:
+            self._image = load_image("./media/torpedoboat.png")
         rect = self._image.get_rect()
         self._image_size = rect[2], rect[3]
         self._rect = pygame.Rect(self._position[0], self._position[1]-self._image_size[1]/2,
@@ -733,42 +1054,41 @@ class Gunboat(Enemy):
 
     @classmethod
     def get_params(cls):
-        return cls.param_dict
+        return cls.params
 
 
 class Torpedoboat(Enemy):
-
-    param_dict = {
-        "max_instances":None,
-        "hp":100,
-        "min_speed":140,
-        "max_speed":160,
-        "game_speed_multiplier":0.1,
-        "min_dist":100,
-        "has_torpedo":True,
-        "torpedo_type":1,
-        "torpedo_speed":0,
-        "torpedo_chance":0.35,
-        "has_gun":None,
-        "gun_type": None,
-        "gun_pattern":None,
-        "points":100,
-        "damage":None,
-        "spawn_method":0,
-        "fixed_spawn":[(),None]
-    }
+    __slots__ = ()
+
+    params = Ship_params(
+        max_instances=None,
+        hp=100,
+        min_speed=140,
+        max_speed=160,
+        game_speed_multiplier=0.1,
+        min_dist=100,
+        has_torpedo=True,
+        torpedo_type=1,
+        torpedo_speed=0,
+        torpedo_chance=0.35,
+        has_gun=None,
+        gun_type=None,
+        gun_pattern=None,
+        points=100,
+        damage=None,
+        spawn_method=0,
+        fixed_spawn=((), None)
+    )
 
     def __init__(self, px_per_second, origin, direction):
 
-        Enemy.__init__(self, self.param_dict["hp"], px_per_second, origin, direction)
-
-        #Handing over parameter dict to parent
-        self._param_dict = self.param_dict
+        Enemy.__init__(self, self.params.hp, px_per_second, origin, direction)
 
         #Setting image related parameters
-        self._image = pygame.image.load("./media/torpedoboat2.png")
         if self._direction == 1:
-            self._image = pygame.transform.rotate(self._image, 180)
+            self._image = assets.get_rotated("./media/torpedoboat2.png", 180)
+        else:
+            self._image = load_image("./media/torpedoboat2.png")
         rect = self._image.get_rect()
         self._image_size = rect[2], rect[3]
         self._rect = pygame.Rect(self._position[0], self._position[1]-self._image_size[1]/2,
@@ -776,41 +1096,40 @@ class Torpedoboat(Enemy):
 
     @classmethod
     def get_params(cls):
-        return cls.param_dict
+        return cls.params
 
 
 class Torpedo_0(Enemy):
-
-    param_dict = {
-        "hp":100,
-        "min_speed":80,
-        "max_speed":80,
-        "game_speed_multiplier":0.1,
-        "min_dist":100,
-        "has_torpedo":False,
-        "torpedo_type":0,
-        "torpedo_speed":0,
-        "torpedo_chance":0,
-        "has_gun":None,
-        "gun_type": None,
-        "gun_pattern":None,
-        "points":300,
-        "damage":50,
-        "spawn_method":0,
-        "fixed_spawn":[(),None]
-    }
+    __slots__ = ()
+
+    params = Ship_params(
+        hp=100,
+        min_speed=80,
+        max_speed=80,
+        game_speed_multiplier=0.1,
+        min_dist=100,
+        has_torpedo=False,
+        torpedo_type=0,
+        torpedo_speed=0,
+        torpedo_chance=0,
+        has_gun=None,
+        gun_type=None,
+        gun_pattern=None,
+        points=300,
+        damage=50,
+        spawn_method=0,
+        fixed_spawn=((), None)
+    )
 
     def __init__(self, px_per_second, origin, direction):
 
-        Enemy.__init__(self, self.param_dict["hp"], px_per_second, origin, direction)
-
-        #Handing over the parameter dict to the parent class
-        self._param_dict = self.param_dict
+        Enemy.__init__(self, self.params.hp, px_per_second, origin, direction)
 
         #Setting image related parameters
-        self._image = pygame.image.load("./media/torpedo1.png")
         if self._direction == 0:
-            self._image = pygame.transform.rotate(self._image, 180)
+            self._image = assets.get_rotated("./media/torpedo1.png", 180)
+        else:
+            self._image = load_image("./media/torpedo1.png")
         rect = self._image.get_rect()
         self._image_size = rect[2], rect[3]
         self._rect = pygame.Rect(self._position[0], self._position[1]-self._image_size[1]/2,
@@ -818,44 +1137,43 @@ class Torpedo_0(Enemy):
 
     @classmethod
     def get_params(cls):
-        return cls.param_dict
+        return cls.params
 
     def get_damage(self):
-        return self._param_dict["damage"]
+        return self._params.damage
 
 
 class Torpedo_2(Enemy):
-
-    param_dict = {
-        "hp":100,
-        "min_speed":60,
-        "max_speed":60,
-        "game_speed_multiplier":0,
-        "min_dist":100,
-        "has_torpedo":False,
-        "torpedo_type":0,
-        "torpedo_speed":0,
-        "torpedo_chance":0,
-        "has_gun":None,
-        "gun_type": None,
-        "gun_pattern":None,
-        "points":300,
-        "damage":100,
-        "spawn_method":None,
-        "fixed_spawn":[(),None]
-    }
+    __slots__ = ()
+
+    params = Ship_params(
+        hp=100,
+        min_speed=60,
+        max_speed=60,
+        game_speed_multiplier=0,
+        min_dist=100,
+        has_torpedo=False,
+        torpedo_type=0,
+        torpedo_speed=0,
+        torpedo_chance=0,
+        has_gun=None,
+        gun_type=None,
+        gun_pattern=None,
+        points=300,
+        damage=100,
+        spawn_method=None,
+        fixed_spawn=((), None)
+    )
 
     def __init__(self, px_per_second, origin, direction):
 
-        Enemy.__init__(self, self.param_dict["hp"], px_per_second, origin, direction)
-
-        #Handing over the parameter dict to the parent class
-        self._param_dict = self.param_dict
+        Enemy.__init__(self, self.params.hp, px_per_second, origin, direction)
 
         #Setting image related parameters
-        self._image = pygame.image.load("./media/torpedo2.png")
         if self._direction == 0:
-            self._image = pygame.transform.rotate(self._image, 180)
+            self._image = assets.get_rotated("./media/torpedo2.png", 180)
+        else:
+            self._image = load_image("./media/torpedo2.png")
         rect = self._image.get_rect()
         self._image_size = rect[2], rect[3]
         self._rect = pygame.Rect(self._position[0], self._position[1]-self._image_size[1]/2,
@@ -863,44 +1181,43 @@ class Torpedo_2(Enemy):
 
     @classmethod
     def get_params(cls):
-        return cls.param_dict
+        return cls.params
 
     def get_damage(self):
-        return self._param_dict["damage"]
+        return self._params.damage
 
 
 class Torpedo_1(Enemy):
-
-    param_dict = {
-        "hp":100,
-        "min_speed":60,
-        "max_speed":60,
-        "game_speed_multiplier":0,
-        "min_dist":100,
-        "has_torpedo":False,
-        "torpedo_type":0,
-        "torpedo_speed":0,
-        "torpedo_chance":0,
-        "has_gun":None,
-        "gun_type": None,
-        "gun_pattern":None,
-        "points":300,
-        "damage":80,
-        "spawn_method":None,
-        "fixed_spawn":[(),None]
-    }
+    __slots__ = ()
+
+    params = Ship_params(
+        hp=100,
+        min_speed=60,
+        max_speed=60,
+        game_speed_multiplier=0,
+        min_dist=100,
+        has_torpedo=False,
+        torpedo_type=0,
+        torpedo_speed=0,
+        torpedo_chance=0,
+        has_gun=None,
+        gun_type=None,
+        gun_pattern=None,
+        points=300,
+        damage=80,
+        spawn_method=None,
+        fixed_spawn=((), None)
+    )
 
     def __init__(self, px_per_second, origin, direction):
 
-        Enemy.__init__(self, self.param_dict["hp"], px_per_second, origin, direction)
-
-        #Handing over the parameter dict to the parent class
-        self._param_dict = self.param_dict
+        Enemy.__init__(self, self.params.hp, px_per_second, origin, direction)
 
         #Setting image related parameters
-        self._image = pygame.image.load("./media/torpedo1.png")
         if self._direction == 0:
-            self._image = pygame.transform.rotate(self._image, 180)
+            self._image = assets.get_rotated("./media/torpedo1.png", 180)
+        else:
+            self._image = load_image("./media/torpedo1.png")
         rect = self._image.get_rect()
         self._image_size = rect[2], rect[3]
         self._rect = pygame.Rect(self._position[0], self._position[1]-self._image_size[1]/2,
@@ -908,42 +1225,40 @@ class Torpedo_1(Enemy):
 
     @classmethod
     def get_params(cls):
-        return cls.param_dict
+        return cls.params
 
     def get_damage(self):
-        return self._param_dict["damage"]
+        return self._params.damage
 
 
 class Rowing_boat(Enemy):
-
-    param_dict = {
-        "hp":100,
-        "min_speed":30,
-        "max_speed":50,
-        "game_speed_multiplier":0.1,
-        "min_dist":100,
-        "has_torpedo":False,
-        "torpedo_type":0,
-        "torpedo_speed":0,
-        "torpedo_chance":0,
-        "has_gun":None,
-        "gun_type": None,
-        "gun_pattern":None,
-        "points":300,
-        "damage":50,
-        "spawn_method":1,
-        "fixed_spawn":[(-1,0),None]
-    }
+    __slots__ = ()
+
+    params = Ship_params(
+        hp=100,
+        min_speed=30,
+        max_speed=50,
+        game_speed_multiplier=0.1,
+        min_dist=100,
+        has_torpedo=False,
+        torpedo_type=0,
+        torpedo_speed=0,
+        torpedo_chance=0,
+        has_gun=None,
+        gun_type=None,
+        gun_pattern=None,
+        points=300,
+        damage=50,
+        spawn_method=1,
+        fixed_spawn=((-1, 0), None)
+    )
 
     def __init__(self, px_per_second, origin, direction):
 
-        Enemy.__init__(self, self.param_dict["hp"], px_per_second, origin, direction)
-
-        #Handing over the parameter dict to the parent class
-        self._param_dict = self.param_dict
+        Enemy.__init__(self, self.params.hp, px_per_second, origin, direction)
 
         #Setting image related parameters
-        self._image = pygame.image.load("./media/torpedo1.png")
+        self._image = load_image("./media/torpedo1.png")
         rect = self._image.get_rect()
         self._image_size = rect[2], rect[3]
         self._rect = pygame.Rect(self._position[0], self._position[1]-self._image_size[1]/2,
@@ -951,20 +1266,24 @@ class Rowing_boat(Enemy):
 
     @classmethod
     def get_params(cls):
-        return cls.param_dict
+        return cls.params
 
     def get_damage(self):
-        return self._param_dict["damage"]
+        return self._params.damage
+
+
+#Rotated bullet images shared by all bullet instances, keyed by bullet class and quantized bearing
+bullet_rotations = Lru_cache(max_entries=1024)
 
 
 class Bullet(object):
-    _param_dict = {
-        "speed":None,
-        "damage":None,
-        "is_friendly":None,
-        "has_trail":None,
-        "trail_type":None
-    }
+    __slots__ = ("_timer", "_position", "_direction", "_image", "_image_size", "_is_friendly", "_speed", "_damage",
+                 "_trail", "_rect", "_previous_rect", "_original_size_x", "_original_size_y", "_store", "_slot",
+                 "_shift_direction", "_params")
+
+    _rotation_resolution = 1
+
+    params = Bullet_params()
 
     def __init__(self, timer, origin, direction):
 
@@ -982,6 +1301,9 @@ class Bullet(object):
         :type direction     : int
         :type px_per_second : int
 
+        The per type parameters are held in the Bullet_params record (params) of the class: speed in px/sec, damage,
+        is_friendly, has_trail and trail_type.
+
         :returns:
         """
         self._timer = timer
@@ -991,11 +1313,14 @@ class Bullet(object):
         self._is_friendly = None
         self._speed = None
         self._damage = None
-        self._trail_image = None
         self._trail = None
+        self._rect = None
+        self._previous_rect = None
         self._original_size_x = None
         self._original_size_y = None
-
+        self._store = None
+        self._slot = None
+        self._params = self.params
 
         if 0 < self._direction <= 180:
             self._shift_direction = 180 + self._direction
@@ -1012,39 +1337,134 @@ class Bullet(object):
         Method for bullet movement. The movement distance is calculated by the elapsed time since the last call
         and the speed as defined at instance creation.
 
+        Bullets attached to an Entity_store are moved by Entity_store.step, for them move() only emits the trail.
+
         :returns:
         """
 
         time_delta = self._timer.get_delta()
         vector_delta = time_delta * self._speed
 
-        self._position = project_point(self._position[0], self._position[1], self._direction, vector_delta)
+        if self._store is None:
+            self._previous_rect = self._rect
+            self._position = project_point(self._position[0], self._position[1], self._direction, vector_delta)
+            self._rect = pygame.Rect(self._position[0] - self._image_size[0] / 2,
+                                     self._position[1] - self._image_size[1] / 2,
+                                     self._image_size[0], self._image_size[1])
 
-        self._rect = pygame.Rect(self._position[0] - self._image_size[0] / 2, self._position[1] - self._image_size[1] / 2,
-                                  self._image_size[0], self._image_size[1])
+        if self._params.has_trail:
+            #Projekt the center of the trail segment so it is right behind the rocket
+            rect = self.get_rect()
+            new_center = project_point(rect.center[0], rect.center[1], self._shift_direction,
+                                       floor(self._original_size_y/2) + floor(vector_delta/2))
+            self._trail = new_center[0], new_center[1], vector_delta + 2, self._direction, \
+                          self._params.trail_type
 
-        if self._param_dict["has_trail"]:
-            self._trail = sprite.Sprite(self._trail_image.extract_by_height(vector_delta +2 ))
+    def _get_rotated_image(self, path):
 
-            #Projekt the center of the trail sprite so it is right behind the rocket
-            new_center = project_point(self._rect.center[0], self._rect.center[1], self._shift_direction,
-                                       floor(self._original_size_y/2) + floor(vector_delta/2))
-            self._trail.rotate(self._direction)
-            self._trail.set_center(new_center[0], new_center[1])
+        """
+        Returns the bullet image rotated to the bullet direction and its size. The direction is quantized to the
+        rotation resolution of the bullet class and the rotated images are shared through the bullet_rotations
+        cache, so firing does not allocate new surfaces once a bearing has been used.
+
+        :param path : path to the unrotated image, pointing north
+        :type path  : string
+
+        :returns: pygame.Surface, (int, int)
+        """
+
+        steps = int(round(360.0 / self._rotation_resolution))
+        step = int(round(self._direction / float(self._rotation_resolution))) % steps
+        key = type(self), step
+        entry = bullet_rotations.get(key)
+        if entry is None:
+            image = pygame.transform.rotate(load_image(path), -step * self._rotation_resolution)
+            entry = image, image.get_size()
+            bullet_rotations.put(key, entry)
+        return entry
+
+    def attach(self, store):
+
+        """
+        Moves the position, direction, speed and rectangle of the bullet into a slot of an Entity_store. From then on
+        the bullet is a view on that slot and is moved by Entity_store.step.
+
+        :param store    : entity store
+        :type store     : Entity_store
+        """
+
+        direction = project_point(0, 0, self._direction, 1)
+        self._slot = store.add(self._position[0], self._position[1], direction[0], direction[1], self._speed,
+                               self._image_size[0], self._image_size[1],
+                               -(self._image_size[0] / 2), -(self._image_size[1] / 2))
+        self._store = store
+
+    def detach(self):
+        if self._store is not None:
+            self._position = list(self._store.get_position(self._slot))
+            self._rect = self._store.get_rect(self._slot).copy()
+            self._store.remove(self._slot)
+            self._store = None
+            self._slot = None
 
     def get_position(self):
+        if self._store is not None:
+            x, y = self._store.get_position(self._slot)
+            return [int(floor(x)), int(floor(y))]
         return [int(floor(self._position[0])), int(floor(self._position[1]))]
 
     def __del__(self):
         pass
 
+    def reinit(self, timer, origin, direction):
+
+        """
+        Reinitializes a released bullet taken from an Object_pool, the arguments are the same as for the constructor.
+        """
+
+        self.__init__(timer, origin, direction)
+
+    def reset(self):
+
+        """
+        Drops the references of a released bullet before it goes back into the Object_pool.
+        """
+
+        self._timer = None
+        self._image = None
+        self._rect = None
+        self._previous_rect = None
+        self._trail = None
+
+    def get_rect(self):
+        if self._store is not None:
+            return self._store.get_rect(self._slot)
+        return self._rect
+
     def get_image(self):
-        return self._image, self._rect
+        return self._image, self.get_rect()
+
+    def get_draw_rect(self, alpha=1.0):
+        if self._store is not None and alpha < 1:
+            return interpolate_rect(self._store.get_previous_rect(self._slot), self._store.get_rect(self._slot), alpha)
+        return interpolate_rect(self._previous_rect, self.get_rect(), alpha)
+
+    def get_slot(self):
+        return self._slot
+
+    def has_trail(self):
+        return bool(self._params.has_trail)
 
     def get_trail(self):
-        if self._trail is not None:
-            return self._trail
-        else: return None
+
+        """
+        Returns the trail segment emitted by the last move as center x, center y, length, direction and trail type,
+        or None if the bullet has no trail. The segments are drawn by the Trails particle system.
+
+        :returns: set
+        """
+
+        return self._trail
 
     def get_damage(self):
         return self._damage
@@ -1052,103 +1472,145 @@ class Bullet(object):
     def is_friendly(self):
         return self._is_friendly
 
+    def get_state(self):
+
+        """
+        Returns the state of the bullet as plain data for saving the game state, including its slot of the entity
+        store if it is attached to one.
+
+        :returns: dictionary
+        """
+
+        return {
+            "type": type(self).__name__,
+            "position": list(self._position),
+            "direction": self._direction,
+            "shift_direction": self._shift_direction,
+            "rect": rect_to_state(self._rect),
+            "previous_rect": rect_to_state(self._previous_rect),
+            "trail": list(self._trail) if self._trail is not None else None,
+            "entity": self._store.get_entity(self._slot) if self._store is not None else None
+        }
+
+    @classmethod
+    def from_state(cls, state, timer, store=None):
+
+        """
+        Creates a bullet from a state returned by get_state. The class is looked up by name and has to be a subclass
+        of the class this is called on.
+
+        :param state    : state from get_state
+        :param timer    : game timer instance
+        :param store    : entity store the bullet is attached to, None if it is not attached
+        :type state     : dictionary
+        :type timer     : Timer
+        :type store     : Entity_store
+
+        :returns: Bullet
+        """
+
+        bullet = get_unit_class(state["type"], cls)(timer, state["position"], state["direction"])
+        bullet._position = list(state["position"])
+        bullet._direction = state["direction"]
+        bullet._shift_direction = state["shift_direction"]
+        bullet._rect = rect_from_state(state["rect"])
+        bullet._previous_rect = rect_from_state(state["previous_rect"])
+        bullet._trail = tuple(state["trail"]) if state["trail"] is not None else None
+        if store is not None:
+            bullet.attach(store)
+            store.set_entity(bullet._slot, state["entity"])
+        return bullet
+
 
 class Destroyer_bullet_1(Bullet):
-    _param_dict = {
-        "speed":800,
-        "damage":100,
-        "is_friendly":True,
-        "has_trail":True,
-        "trail_type":0
-    }
+    __slots__ = ()
+
+    params = Bullet_params(
+        speed=800,
+        damage=100,
+        is_friendly=True,
+        has_trail=True,
+        trail_type=0
+    )
 
     def __init__(self, timer, origin, direction):
         Bullet.__init__(self, timer, origin, direction)
-        self._image = pygame.image.load("./media/missile1.png")
-        self._original_size_x = self._image.get_rect().width
-        self._original_size_y = self._image.get_rect().height
+        self._original_size_x, self._original_size_y = load_image("./media/missile1.png").get_size()
 
-        self._is_friendly = self._param_dict["is_friendly"]
-        self._damage = self._param_dict["damage"]
-        self._speed = self._param_dict["speed"]
+        self._is_friendly = self._params.is_friendly
+        self._damage = self._params.damage
+        self._speed = self._params.speed
 
-        self._image = pygame.transform.rotate(self._image, - self._direction)
-        rect = self._image.get_rect()
-        self._image_size = rect[2], rect[3]
+        self._image, self._image_size = self._get_rotated_image("./media/missile1.png")
 
         self._rect = pygame.Rect(self._position[0] - self._image_size[0] / 2, self._position[1] - self._image_size[1] / 2,
                                   self._image_size[0], self._image_size[1])
 
-        self._trail_image = sprite.Sprite("./media/trail.png")
-
 class Fregatte_bullet(Bullet):
-    _param_dict = {
-        "speed":600,
-        "damage":10,
-        "is_friendly":False,
-        "has_trail":True,
-        "trail_type":0
-    }
+    __slots__ = ()
+
+    params = Bullet_params(
+        speed=600,
+        damage=10,
+        is_friendly=False,
+        has_trail=True,
+        trail_type=0
+    )
 
     def __init__(self, timer, origin, direction):
         Bullet.__init__(self, timer, origin, direction)
-        self._image = pygame.image.load("./media/missile2.png")
-        self._original_size_x = self._image.get_rect().width
-        self._original_size_y = self._image.get_rect().height
+        self._original_size_x, self._original_size_y = load_image("./media/missile2.png").get_size()
 
-        self._is_friendly = self._param_dict["is_friendly"]
-        self._damage = self._param_dict["damage"]
-        self._speed = self._param_dict["speed"]
+        self._is_friendly = self._params.is_friendly
+        self._damage = self._params.damage
+        self._speed = self._params.speed
 
-        self._image = pygame.transform.rotate(self._image, - self._direction)
-        rect = self._image.get_rect()
-        self._image_size = rect[2], rect[3]
+        self._image, self._image_size = self._get_rotated_image("./media/missile2.png")
 
         self._rect = pygame.Rect(self._position[0] - self._image_size[0] / 2, self._position[1] - self._image_size[1] / 2,
                                  self._image_size[0], self._image_size[1])
 
-        self._trail_image = sprite.Sprite("./media/trail.png")
-
 class Standard_enemy_bullet(Bullet):
-    _param_dict = {
-        "speed":800,
-        "damage":10,
-        "is_friendly":False,
-        "has_trail":False,
-        "trail_type":None
-    }
+    __slots__ = ()
+
+    params = Bullet_params(
+        speed=800,
+        damage=10,
+        is_friendly=False,
+        has_trail=False,
+        trail_type=None
+    )
 
     def __init__(self, timer,origin, direction):
         Bullet.__init__(self, timer, origin, direction)
-        self._image = pygame.image.load("./media/canonball.png")
-        self._damage = self._param_dict["damage"]
-        self._speed = self._param_dict["speed"]
-        self._is_friendly = self._param_dict["is_friendly"]
+        self._damage = self._params.damage
+        self._speed = self._params.speed
+        self._is_friendly = self._params.is_friendly
 
-        self._image = pygame.transform.rotate(self._image, - self._direction)
-        rect = self._image.get_rect()
-        self._image_size = rect[2], rect[3]
+        self._image, self._image_size = self._get_rotated_image("./media/canonball.png")
 
         self._rect = pygame.Rect(self._position[0] - self._image_size[0] / 2, self._position[1] - self._image_size[1] / 2,
                                  self._image_size[0], self._image_size[1])
 
 
 class Mine(Bullet):
-    _param_dict = {
-        "speed":1,
-        "damage":500,
-        "is_friendly":True,
-        "has_trail":False,
-        "trail_type":None
-    }
+    __slots__ = ()
+
+    params = Bullet_params(
+        speed=1,
+        damage=500,
+        is_friendly=True,
+        has_trail=False,
+        trail_type=None
+    )
 
     def __init__(self, timer,origin, direction):
         Bullet.__init__(self, timer, origin, direction)
-        self._image = pygame.image.load("./media/mine.png")
-        self._damage = self._param_dict["damage"]
-        self._speed = self._param_dict["speed"]
-        self._is_friendly = self._param_dict["is_friendly"]
-        self._direction = randrange(0,359,1)
+        self._image = load_image("./media/mine.png")
+        self._damage = self._params.damage
+        self._speed = self._params.speed
+        self._is_friendly = self._params.is_friendly
+        self._direction = get_random().randrange(0,359,1)
 
         #self._image = pygame.transform.rotate(self._image, - self._direction)
         rect = self._image.get_rect()
@@ -1158,6 +1620,8 @@ class Mine(Bullet):
                                  self._image_size[0], self._image_size[1])
 
 class Crate(object):
+    __slots__ = ("_origin", "_return_points", "_effect_points", "_sprite", "_type")
+
     def __init__(self, origin, return_points, effect_points=100):
 
         """
@@ -1180,7 +1644,6 @@ class Crate(object):
 
         self._origin = origin
         self._return_points = return_points
-        self._create_time = datetime.datetime.now()
         self._effect_points = effect_points
 
     def get_image(self):
@@ -1192,17 +1655,6 @@ class Crate(object):
     def get_position(self):
         return self._sprite.get_rect()[0], self._sprite.get_rect()[1]
 
-    def get_age(self):
-
-        """
-        Returns the age of the crate in seconds. Used to check wether the instance of a crate has exceeded the
-        best before date and is ready for the trash bin...
-
-        :returns: integer
-        """
-
-        return (datetime.datetime.now() -  self._create_time).total_seconds()
-
     def get_rect(self):
         return self._sprite.get_rect()
 
@@ -1212,43 +1664,76 @@ class Crate(object):
     def get_effect_points(self):
         return self._effect_points
 
+    def get_state(self):
+        return {
+            "type": type(self).__name__,
+            "origin": list(self._origin),
+            "return_points": self._return_points,
+            "effect_points": self._effect_points
+        }
+
+    @classmethod
+    def from_state(cls, state):
+
+        """
+        Creates a crate from a state returned by get_state. The class is looked up by name and has to be a subclass
+        of the class this is called on.
+
+        :returns: Crate
+        """
+
+        return get_unit_class(state["type"], cls)(tuple(state["origin"]), state["return_points"],
+                                                  state["effect_points"])
+
     @classmethod
     def get_size(self):
-        image = pygame.image.load("./media/crate.png")
+        image = load_image("./media/crate.png")
         rect = image.get_rect()
         return rect[2], rect[3]
 
 class Repair_crate(Crate):
+    __slots__ = ()
+
     def __init__(self, origin, return_points, effect_points=100):
         Crate.__init__(self,origin, return_points, effect_points)
         self._sprite = sprite.Sprite("./media/crate_repair.png", origin[0], origin[1])
         self._type = 0
 
 class Armor_crate(Crate):
+    __slots__ = ()
+
     def __init__(self, origin, return_points, effect_points=100):
         Crate.__init__(self,origin, return_points, effect_points)
         self._sprite = sprite.Sprite("./media/crate_reinforcement.png", origin[0], origin[1])
         self._type = 1
 
 class Life_crate(Crate):
+    __slots__ = ()
+
     def __init__(self, origin, return_points, effect_points=100):
         Crate.__init__(self,origin, return_points, effect_points)
         self._sprite = sprite.Sprite("./media/crate_heart.png", origin[0], origin[1])
         self._type = 2
 
 class Bomb_crate(Crate):
+    __slots__ = ()
+
     def __init__(self, origin, return_points, effect_points=100):
         Crate.__init__(self,origin, return_points, effect_points)
         self._sprite = sprite.Sprite("./media/crate_bomb.png", origin[0], origin[1])
         self._type = 3
 
 class Mine_crate(Crate):
+    __slots__ = ()
+
     def __init__(self, origin, return_points, effect_points=100):
         Crate.__init__(self,origin, return_points, effect_points)
         self._sprite = sprite.Sprite("./media/crate_mine.png", origin[0], origin[1])
         self._type = 4
 
 class MG_crate(Crate):
+    __slots__ = ()
+
     def __init__(self, origin, return_points, effect_points=100):
         Crate.__init__(self,origin, return_points, effect_points)
         self._sprite = sprite.Sprite("./media/crate_mg.png", origin[0], origin[1])